@@ -4,13 +4,18 @@ Dependencias de autenticación para proteger endpoints.
 Proporciona:
 - get_current_user: Verifica token JWT y devuelve usuario actual
 - get_current_active_user: Usuario activo verificado
+- require_internal_access: Endpoints de diagnóstico (/health/status, /metrics)
 - Middleware de autenticación opcional
 """
 
+import hmac
+import ipaddress
+
 from fastapi import Depends, HTTPException, status
+from fastapi.requests import HTTPConnection
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
-from jose import JWTError, jwt
+from starlette.concurrency import run_in_threadpool
 
 from app.core.config import settings
 from app.core.security import verify_token
@@ -22,6 +27,7 @@ from app.schemas.user import UserRead
 security = HTTPBearer()
 
 async def get_current_user(
+    connection: HTTPConnection,
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db: Session = Depends(get_db)
 ) -> UserRead:
@@ -35,44 +41,61 @@ async def get_current_user(
         return {"message": f"Hola {current_user.nombre}"}
     ```
     """
+    # Dentro de POST /batch el token ya se verificó una vez para todo el lote
+    batch_user = connection.scope.get("state", {}).get("batch_user")
+    if batch_user is not None:
+        return batch_user
+
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="No se pudieron validar las credenciales",
         headers={"WWW-Authenticate": "Bearer"},
     )
     
-    try:
-        # Extraer token del header
-        token = credentials.credentials
-        
-        # Verificar y decodificar token
-        payload = verify_token(token)
-        if payload is None:
-            raise credentials_exception
-        
-        # Obtener email del token
-        email: str = payload.get("sub")
-        user_id: int = payload.get("user_id")
-        
-        if email is None or user_id is None:
-            raise credentials_exception
-            
-    except JWTError:
+    # Extraer token del header y verificarlo (verify_token devuelve None si es inválido)
+    token = credentials.credentials
+    payload = verify_token(token)
+    if payload is None:
+        raise credentials_exception
+    
+    # Obtener email del token
+    email: str = payload.get("sub")
+    user_id: int = payload.get("user_id")
+    
+    if email is None or user_id is None:
         raise credentials_exception
     
     # Buscar usuario en la base de datos
     try:
-        user = crud_user.search_user(db, user_id)
+        user = await run_in_threadpool(crud_user.search_user, db, user_id)
         if user is None:
             raise credentials_exception
         return user
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error al verificar usuario: {str(e)}"
         )
 
+async def get_token_payload(
+    credentials: HTTPAuthorizationCredentials = Depends(security)
+) -> dict:
+    """
+    Dependencia que devuelve el payload del token ya verificado (incluye jti, exp).
+    Útil para operaciones sobre el propio token, como el logout.
+    """
+    payload = verify_token(credentials.credentials)
+    if payload is None or payload.get("jti") is None or payload.get("user_id") is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="No se pudieron validar las credenciales",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return payload
+
 async def get_current_active_user(
     current_user: UserRead = Depends(get_current_user)
 ) -> UserRead:
@@ -90,6 +113,28 @@ async def get_current_active_user(
     
     return current_user
 
+# Endpoints internos: exponen detalles del pool, cachés y errores del arranque
+async def require_internal_access(
+    connection: HTTPConnection,
+    credentials: HTTPAuthorizationCredentials = Depends(HTTPBearer(auto_error=False))
+):
+    """
+    Con INTERNAL_ENDPOINTS_TOKEN definido exige ese Bearer; sin él, solo acepta
+    conexiones desde localhost (detrás de un proxy en el mismo host, definir el token).
+    """
+    token = settings.INTERNAL_ENDPOINTS_TOKEN
+    if token:
+        if credentials is not None and hmac.compare_digest(credentials.credentials.encode(), token.encode()):
+            return
+    else:
+        host = connection.client.host if connection.client else ""
+        try:
+            if ipaddress.ip_address(host).is_loopback:
+                return
+        except ValueError:
+            pass
+    raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Acceso solo interno")
+
 # Dependencia opcional para endpoints que pueden usar auth o no
 async def get_current_user_optional(
     credentials: HTTPAuthorizationCredentials = Depends(HTTPBearer(auto_error=False)),
@@ -114,7 +159,7 @@ async def get_current_user_optional(
         if user_id is None:
             return None
             
-        user = crud_user.search_user(db, user_id)
+        user = await run_in_threadpool(crud_user.search_user, db, user_id)
         return user
         
     except Exception:
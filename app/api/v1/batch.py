@@ -0,0 +1,141 @@
+import asyncio
+import json
+import logging
+from urllib.parse import urlsplit
+
+from fastapi import APIRouter, Depends, Request, Response
+from sqlalchemy.orm import Session
+
+from app.schemas.batch import BatchRequest, BatchItem, BatchResponse
+from app.schemas.user import UserRead
+from app.core.config import settings
+from app.db.session import get_db
+from app.api.dependencies import get_current_user
+
+logger = logging.getLogger(__name__)
+
+# Router para ejecutar varias peticiones en un solo viaje de red
+router = APIRouter()
+
+# Rutas que no se pueden ejecutar dentro de un lote: tokens, streaming y lotes anidados
+_BATCH_EXCLUDED_PREFIXES = ("/api/v1/auth/", "/api/v1/batch", "/api/v1/uploads", "/api/v1/events")
+
+async def _run_subrequest(request: Request, item: BatchItem, state: dict):
+    """Ejecuta la sub-petición contra la propia app (sin red) y devuelve (estado, cuerpo, content-type)."""
+    partes = urlsplit(item.Ruta)
+    if not partes.path.startswith("/api/v1/") or partes.path.startswith(_BATCH_EXCLUDED_PREFIXES) or partes.netloc:
+        mensaje = {"error": "Error 400", "message": "Ruta no permitida en un lote", "path": partes.path}
+        return 400, json.dumps(mensaje).encode(), "application/json"
+
+    body = b"" if item.Cuerpo is None else json.dumps(item.Cuerpo).encode()
+    headers = [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]
+    # Sin Idempotency-Key: la clave del cliente ya cubre el POST /batch completo; reenviarla
+    # haría que dos POST del lote a la misma ruta compartan la clave
+    for name in (b"authorization", b"host"):
+        value = request.headers.get(name.decode())
+        if value is not None:
+            headers.append((name, value.encode("latin-1")))
+
+    scope = {
+        "type": "http",
+        "asgi": request.scope.get("asgi", {"version": "3.0"}),
+        "http_version": request.scope.get("http_version", "1.1"),
+        "method": item.Metodo,
+        "scheme": request.scope.get("scheme", "http"),
+        "server": request.scope.get("server"),
+        "client": request.scope.get("client"),
+        "root_path": request.scope.get("root_path", ""),
+        "path": partes.path,
+        "raw_path": partes.path.encode(),
+        "query_string": partes.query.encode(),
+        "headers": headers,
+        "state": state,
+    }
+
+    body_sent = False
+
+    async def receive():
+        nonlocal body_sent
+        if not body_sent:
+            body_sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        await asyncio.Event().wait()   # Nunca hay desconexión dentro del proceso
+
+    status = 500
+    content_type = ""
+    chunks = []
+
+    async def send(message):
+        nonlocal status, content_type
+        if message["type"] == "http.response.start":
+            status = message["status"]
+            for name, value in message.get("headers", []):
+                if name.lower() == b"content-type":
+                    content_type = value.decode("latin-1")
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+
+    try:
+        await request.app(scope, receive, send)
+    except Exception:
+        # ServerErrorMiddleware envía su 500 y vuelve a lanzar la excepción: se registra
+        # como resultado de esta sub-petición y el lote sigue con las demás
+        # (lo ya enviado puede ser un cuerpo a medias: se reemplaza)
+        logger.exception(f" Error en sub-petición del lote: {item.Metodo} {partes.path}")
+        mensaje = {"error": "Error 500", "message": "Error interno del servidor", "path": partes.path}
+        return 500, json.dumps(mensaje).encode(), "application/json"
+    return status, b"".join(chunks), content_type
+
+def _result_json(item: BatchItem, status: int, body: bytes, content_type: str) -> bytes:
+    """Resultado ya serializado: el JSON de la sub-respuesta se inserta sin volver a parsearlo."""
+    if not body:
+        cuerpo = b"null"
+    elif content_type.startswith("application/json"):
+        cuerpo = body
+    else:
+        cuerpo = json.dumps(body.decode("utf-8", errors="replace")).encode()
+    return b'{"Id":%s,"Estado":%d,"Cuerpo":%s}' % (json.dumps(item.Id).encode(), status, cuerpo)
+
+@router.post("/batch", response_model=BatchResponse)
+async def run_batch(
+    batch: BatchRequest,
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user: UserRead = Depends(get_current_user)
+):
+    """
+    Ejecuta varias peticiones de la API en un solo viaje de red.
+
+    El token se verifica una vez para todo el lote. Las lecturas (GET) seguidas
+    se ejecutan a la vez; cada escritura espera a las anteriores y se ejecuta
+    en orden, compartiendo la sesión de BD del lote. Cada resultado trae su
+    propio código HTTP: un error en una sub-petición no cancela las demás.
+    """
+    resultados = [None] * len(batch.Peticiones)
+    limite = asyncio.Semaphore(settings.BATCH_MAX_CONCURRENCY)
+
+    async def run_read(index: int, item: BatchItem):
+        # Lecturas concurrentes: cada una usa su propia sesión (una sesión no es thread-safe)
+        async with limite:
+            status, body, content_type = await _run_subrequest(request, item, {"batch_user": current_user})
+        resultados[index] = _result_json(item, status, body, content_type)
+
+    lecturas = []
+    for index, item in enumerate(batch.Peticiones):
+        if item.Metodo == "GET":
+            lecturas.append(run_read(index, item))
+            continue
+        # Escritura: terminar las lecturas anteriores y ejecutarla sola, en orden
+        await asyncio.gather(*lecturas)
+        lecturas = []
+        status, body, content_type = await _run_subrequest(
+            request, item, {"batch_user": current_user, "batch_db": db}
+        )
+        db.rollback()   # Lo no confirmado por la sub-petición se descarta, como al cerrar la sesión
+        resultados[index] = _result_json(item, status, body, content_type)
+    await asyncio.gather(*lecturas)
+
+    return Response(
+        content=b'{"Resultados":[' + b",".join(resultados) + b"]}",
+        media_type="application/json"
+    )
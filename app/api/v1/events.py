@@ -0,0 +1,113 @@
+import asyncio
+import json
+
+from fastapi import APIRouter, Depends, Query, WebSocket, WebSocketDisconnect, status
+from fastapi.responses import StreamingResponse
+
+from app.core.config import settings
+from app.core.events import broker
+from app.core.security import token_still_valid, verify_token
+from app.api.dependencies import get_token_payload
+
+# Router del feed de cambios (productos y documentos del usuario)
+router = APIRouter()
+
+# Sin sesión de BD: el token se valida en memoria (firma, expiración y revocación),
+# así una conexión abierta durante horas no retiene una conexión del pool. Se vuelve
+# a validar con cada evento y heartbeat: logout, revocación o expiración cierran el feed
+
+_HEARTBEAT = object()
+
+def _sse(event: dict) -> bytes:
+    return f"id: {event['id']}\nevent: {event['tipo']}\ndata: {json.dumps(event)}\n\n".encode()
+
+@router.get("/events")
+async def stream_events(payload: dict = Depends(get_token_payload)):
+    """
+    Feed de cambios del usuario como Server-Sent Events.
+
+    Eventos: `producto` y `documento` con `accion` creado/actualizado/eliminado y
+    el `recurso` afectado. Un evento `overflow` indica que el cliente se atrasó:
+    debe reconectar y volver a leer los datos. Un evento `unauthorized` indica
+    que el token expiró o fue revocado: debe renovarlo antes de reconectar.
+    """
+    user_id = payload["user_id"]
+
+    async def event_stream():
+        subscription = broker.subscribe(user_id)
+        try:
+            yield b"retry: 5000\nevent: ready\ndata: {}\n\n"
+            while True:
+                try:
+                    event = await subscription.next_event(settings.EVENTS_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    event = _HEARTBEAT
+                if not token_still_valid(payload):
+                    yield b"event: unauthorized\ndata: {}\n\n"
+                    return
+                if event is _HEARTBEAT:
+                    yield b": ping\n\n"   # Mantiene la conexión viva a través de proxies
+                    continue
+                if event is None:
+                    yield b"event: overflow\ndata: {}\n\n"
+                    return
+                yield _sse(event)
+        finally:
+            broker.unsubscribe(subscription)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.websocket("/events/ws")
+async def websocket_events(websocket: WebSocket, token: str = Query(...)):
+    """Mismo feed por WebSocket (el token va en ?token= porque el navegador no envía headers)."""
+    payload = verify_token(token)
+    if payload is None or payload.get("user_id") is None:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    await websocket.accept()
+    subscription = broker.subscribe(payload["user_id"])
+
+    async def drain_incoming():
+        # Detecta el cierre del cliente (no se esperan mensajes entrantes)
+        while True:
+            await websocket.receive_text()
+
+    receiver = asyncio.create_task(drain_incoming())
+    try:
+        await websocket.send_json({"tipo": "ready"})
+        while True:
+            getter = asyncio.ensure_future(subscription.queue.get())
+            done, _ = await asyncio.wait(
+                {getter, receiver}, timeout=settings.EVENTS_HEARTBEAT_SECONDS,
+                return_when=asyncio.FIRST_COMPLETED
+            )
+            if getter not in done:
+                getter.cancel()
+                if receiver in done:
+                    return   # El cliente cerró la conexión
+                event = _HEARTBEAT
+            else:
+                event = getter.result()
+            if not token_still_valid(payload):
+                await websocket.send_json({"tipo": "unauthorized"})
+                await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+                return
+            if event is _HEARTBEAT:
+                await websocket.send_json({"tipo": "ping"})
+                continue
+            if event is None:
+                await websocket.send_json({"tipo": "overflow"})
+                await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER)
+                return
+            await websocket.send_json(event)
+    except (WebSocketDisconnect, RuntimeError, OSError):
+        pass  # El cliente se fue mientras se enviaba
+    finally:
+        receiver.cancel()
+        await asyncio.gather(receiver, return_exceptions=True)
+        broker.unsubscribe(subscription)
@@ -1,34 +1,183 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from pydantic import TypeAdapter
 from sqlalchemy.orm import Session
-from typing import List
+from starlette.concurrency import run_in_threadpool
+from typing import Callable, List, Literal, Optional, Tuple, Union
 
-from app.schemas.product import ProductRead, ProductCreate, ProductUpdate
+from app.schemas.product import (
+    ProductRead, ProductCreate, ProductUpdate, ProductSearchResult, ProductSuggestions, UserSummary,
+    ProductBatchRequest, ProductBatchResult, ProductSparse,
+    PRODUCT_FIELD_COLUMNS, PRODUCT_INCLUDES, product_partial_model, product_partial_adapter
+)
 from app.schemas.user import UserRead
 from app.crud import product as crud_product
-from app.db.session import get_db
+from app.core import suggestions
+from app.core.response_cache import response_cache
+from app.db.session import SessionLocal, get_db
 from app.api.dependencies import get_current_user
 
 # Router para endpoints de productos
 router = APIRouter()
 
+# Serializadores de las respuestas cacheadas (se guardan como bytes JSON)
+_PRODUCT_LIST = TypeAdapter(List[ProductRead])
+_PRODUCT = TypeAdapter(ProductRead)
+
+_FIELDS_DESCRIPTION = "Campos a devolver separados por coma (ej: NombreProducto,FechaCompra). ProductoID siempre se incluye."
+_INCLUDE_DESCRIPTION = "Relaciones a incluir separadas por coma: documentos, categorias."
+
+def _parse_sparse(fields: Optional[str], include: Optional[str]) -> Optional[Tuple[tuple, tuple]]:
+    """Normaliza fields/include en tuplas ordenadas; None si no se pidió ninguno."""
+    if fields is None and include is None:
+        return None
+
+    por_nombre = {f.lower(): f for f in PRODUCT_FIELD_COLUMNS}
+    if fields:
+        pedidos = {f.strip().lower() for f in fields.split(",") if f.strip()}
+        desconocidos = pedidos - por_nombre.keys()
+        if desconocidos:
+            raise HTTPException(status_code=400, detail=f"Campos no válidos: {', '.join(sorted(desconocidos))}")
+        pedidos.add("productoid")
+        campos = tuple(f for f in PRODUCT_FIELD_COLUMNS if f.lower() in pedidos)
+    else:
+        campos = tuple(PRODUCT_FIELD_COLUMNS)
+
+    relaciones = ()
+    if include:
+        pedidas = {r.strip().lower() for r in include.split(",") if r.strip()}
+        desconocidas = pedidas - set(PRODUCT_INCLUDES)
+        if desconocidas:
+            raise HTTPException(status_code=400, detail=f"Relaciones no válidas: {', '.join(sorted(desconocidas))}")
+        relaciones = tuple(r for r in PRODUCT_INCLUDES if r in pedidas)
+    return campos, relaciones
+
+def _with_own_session(func: Callable[[Session], bytes]) -> Callable[[], bytes]:
+    """
+    Envuelve el cálculo de una respuesta cacheada con su propia sesión. El cálculo
+    puede seguir corriendo después de que la petición que lo inició se cancela
+    (otras lo esperan), cuando get_db ya cerró la sesión de esa petición.
+    """
+    def _load() -> bytes:
+        db = SessionLocal()
+        try:
+            return func(db)
+        finally:
+            db.close()
+    return _load
+
 # ===== ENDPOINTS SIMPLIFICADOS =====
 
-@router.get("/products", response_model=List[ProductRead])
+@router.get("/products", response_model=Union[List[ProductRead], List[ProductSparse]])
 async def get_products(
+    fields: Optional[str] = Query(None, description=_FIELDS_DESCRIPTION),
+    include: Optional[str] = Query(None, description=_INCLUDE_DESCRIPTION),
+    current_user: UserRead = Depends(get_current_user)
+):
+    """Obtiene todos los productos del usuario autenticado (con fields/include, solo lo pedido)."""
+    user_id = current_user.idUsuario
+    sparse = _parse_sparse(fields, include)
+
+    if sparse is None:
+        key = "list"
+
+        def _load(db: Session) -> bytes:
+            productos = crud_product.get_products_by_user(db, user_id)
+            return _PRODUCT_LIST.dump_json(_PRODUCT_LIST.validate_python(productos, from_attributes=True))
+    else:
+        campos, relaciones = sparse
+        key = f"list:{','.join(campos)}:{','.join(relaciones)}"
+        adapter = product_partial_adapter(campos, relaciones)
+
+        def _load(db: Session) -> bytes:
+            productos = crud_product.get_products_sparse(db, user_id, campos, relaciones)
+            return adapter.dump_json(adapter.validate_python(productos))
+
+    body = await response_cache.get_or_compute(user_id, key, _with_own_session(_load))
+    return Response(content=body, media_type="application/json")
+
+@router.get("/me/summary", response_model=UserSummary)
+async def get_my_summary(
     db: Session = Depends(get_db),
     current_user: UserRead = Depends(get_current_user)
 ):
-    """Obtiene todos los productos del usuario autenticado."""
-    return crud_product.get_products_by_user(db, current_user.idUsuario)
+    """Totales del home: productos, garantías y conteos por tienda, marca y categoría."""
+    user_id = current_user.idUsuario
+    return await run_in_threadpool(
+        crud_product.summary_cache.get_or_compute, user_id, lambda: crud_product.get_user_summary(db, user_id)
+    )
 
-@router.get("/products/{product_id}", response_model=ProductRead)
+# Debe declararse antes de /products/{product_id}
+@router.get("/products/search", response_model=ProductSearchResult)
+async def search_products(
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    db: Session = Depends(get_db),
+    current_user: UserRead = Depends(get_current_user)
+):
+    """Busca en nombre, marca, modelo, tienda y notas de los productos del usuario."""
+    # Se pide un resultado extra para saber si hay más páginas sin hacer COUNT(*)
+    productos = await run_in_threadpool(crud_product.search_products, db, current_user.idUsuario, q, limit + 1, offset)
+    return ProductSearchResult(
+        Resultados=productos[:limit],
+        Limite=limit,
+        Desplazamiento=offset,
+        HayMas=len(productos) > limit
+    )
+
+@router.get("/products/suggest", response_model=ProductSuggestions)
+async def suggest_product_values(
+    field: Literal["marca", "tienda", "modelo"],
+    prefix: str = Query("", max_length=100),
+    limit: int = Query(8, ge=1, le=20),
+    db: Session = Depends(get_db),
+    current_user: UserRead = Depends(get_current_user)
+):
+    """Valores más usados por el usuario para el campo, que empiezan con el prefijo."""
+    user_id = current_user.idUsuario
+    valores = await run_in_threadpool(
+        suggestions.suggest, user_id, field, prefix, limit,
+        load_counts=lambda: crud_product.get_field_value_counts(db, user_id, field)
+    )
+    return ProductSuggestions(Campo=field, Prefijo=prefix, Sugerencias=valores)
+
+@router.get("/products/{product_id}", response_model=Union[ProductRead, ProductSparse])
 async def get_product(
     product_id: int, 
+    fields: Optional[str] = Query(None, description=_FIELDS_DESCRIPTION),
+    include: Optional[str] = Query(None, description=_INCLUDE_DESCRIPTION),
+    current_user: UserRead = Depends(get_current_user)
+):
+    """Obtiene un producto específico por ID (con fields/include, solo lo pedido)."""
+    user_id = current_user.idUsuario
+    sparse = _parse_sparse(fields, include)
+
+    if sparse is None:
+        key = f"id:{product_id}"
+
+        def _load(db: Session) -> bytes:
+            producto = crud_product.search_product_wrapper(db, product_id, user_id)
+            return _PRODUCT.dump_json(_PRODUCT.validate_python(producto, from_attributes=True))
+    else:
+        campos, relaciones = sparse
+        key = f"id:{product_id}:{','.join(campos)}:{','.join(relaciones)}"
+        modelo = product_partial_model(campos, relaciones)
+
+        def _load(db: Session) -> bytes:
+            producto = crud_product.get_products_sparse(db, user_id, campos, relaciones, product_id)[0]
+            return modelo.model_validate(producto).model_dump_json().encode()
+
+    body = await response_cache.get_or_compute(user_id, key, _with_own_session(_load))
+    return Response(content=body, media_type="application/json")
+
+@router.post("/products/batch-get", response_model=ProductBatchResult)
+async def get_products_batch(
+    request: ProductBatchRequest,
     db: Session = Depends(get_db),
     current_user: UserRead = Depends(get_current_user)
 ):
-    """Obtiene un producto específico por ID."""
-    return crud_product.search_product_wrapper(db, product_id, current_user.idUsuario)
+    """Obtiene varios productos del usuario por ID, con sus documentos y categorías."""
+    return await run_in_threadpool(crud_product.get_products_batch, db, request.IDs, current_user.idUsuario)
 
 @router.post("/products", response_model=ProductRead, status_code=201)
 async def create_product(
@@ -49,7 +198,7 @@ async def create_product(
         Notas=product_data.Notas or "",
         UsuarioID=current_user.idUsuario
     )
-    return crud_product.create_product_wrapper(db, product)
+    return await run_in_threadpool(crud_product.create_product_wrapper, db, product)
 
 @router.put("/products/{product_id}", response_model=ProductRead)
 async def update_product(
@@ -60,7 +209,7 @@ async def update_product(
 ):
     """Actualiza un producto existente del usuario autenticado."""
     # Obtener producto existente (con verificación de ownership)
-    existing_product = crud_product.search_product_wrapper(db, product_id, current_user.idUsuario)
+    existing_product = await run_in_threadpool(crud_product.search_product_wrapper, db, product_id, current_user.idUsuario)
     
     # Crear producto actualizado
     from app.schemas.product import Product
@@ -75,7 +224,7 @@ async def update_product(
         Notas=product_data.Notas or existing_product.Notas,
         UsuarioID=current_user.idUsuario
     )
-    return crud_product.update_product(db, updated_product)
+    return await run_in_threadpool(crud_product.update_product, db, updated_product)
 
 @router.delete("/products/{product_id}")
 async def delete_product(
@@ -84,4 +233,4 @@ async def delete_product(
     current_user: UserRead = Depends(get_current_user)
 ):
     """Elimina un producto del usuario autenticado."""
-    return crud_product.delete_product(db, product_id, current_user.idUsuario)
\ No newline at end of file
+    return await run_in_threadpool(crud_product.delete_product, db, product_id, current_user.idUsuario)
\ No newline at end of file
@@ -0,0 +1,123 @@
+from fastapi import APIRouter, Depends, HTTPException, Header, Query, Request, Response
+from fastapi.responses import FileResponse
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from app.schemas.upload import UploadCreate, UploadStatus
+from app.schemas.documento import DocumentoRead
+from app.schemas.user import UserRead
+from app.crud import upload as crud_upload
+from app.core import storage
+from app.core.config import settings
+from app.db.session import get_db
+from app.api.dependencies import get_current_user
+
+# Router para cargas reanudables de documentos (boletas, garantías)
+#
+# Protocolo:
+# 1. POST /uploads                 -> crea la sesión (declara tamaño total)
+# 2. PUT  /uploads/{id}            -> envía un fragmento con header Upload-Offset
+# 3. GET  /uploads/{id}            -> consulta el offset para reanudar tras un corte
+# 4. POST /uploads/{id}/complete   -> crea el Documento asociado al producto
+router = APIRouter()
+
+@router.post("/uploads", response_model=UploadStatus, status_code=201)
+async def create_upload(
+    upload_data: UploadCreate,
+    response: Response,
+    db: Session = Depends(get_db),
+    current_user: UserRead = Depends(get_current_user)
+):
+    """Inicia una carga reanudable para un producto del usuario."""
+    status = await run_in_threadpool(crud_upload.create_upload_session, db, upload_data, current_user.idUsuario)
+    response.headers["Upload-Offset"] = "0"
+    return status
+
+@router.get("/uploads/{sesion_id}", response_model=UploadStatus)
+async def get_upload(
+    sesion_id: str,
+    response: Response,
+    db: Session = Depends(get_db),
+    current_user: UserRead = Depends(get_current_user)
+):
+    """Devuelve el progreso de la carga (offset desde donde reanudar)."""
+    status = await run_in_threadpool(crud_upload.get_upload_status, db, sesion_id, current_user.idUsuario)
+    response.headers["Upload-Offset"] = str(status.BytesRecibidos)
+    return status
+
+@router.put("/uploads/{sesion_id}", response_model=UploadStatus)
+async def upload_chunk(
+    sesion_id: str,
+    request: Request,
+    response: Response,
+    upload_offset: int = Header(..., alias="Upload-Offset", ge=0),
+    db: Session = Depends(get_db),
+    current_user: UserRead = Depends(get_current_user)
+):
+    """Recibe un fragmento (cuerpo binario) y lo escribe en su posición."""
+    sesion = await run_in_threadpool(crud_upload.get_upload_session, db, sesion_id, current_user.idUsuario)
+    if upload_offset != sesion.bytesrecibidos:
+        raise HTTPException(
+            status_code=409,
+            detail=f"Offset incorrecto, se esperaba {sesion.bytesrecibidos}",
+            headers={"Upload-Offset": str(sesion.bytesrecibidos)}
+        )
+    tamano_total = sesion.tamanototal
+
+    # Reserva confirmada antes de leer el cuerpo: sin transacción ni bloqueo de fila
+    # mientras llega (puede tardar minutos) y una sola petición escribe en el archivo
+    reserva = await run_in_threadpool(
+        crud_upload.claim_chunk, db, sesion_id, current_user.idUsuario, upload_offset
+    )
+    try:
+        written, _ = await storage.write_stream_to_partial(
+            sesion_id, upload_offset, request.stream(), tamano_total
+        )
+    except ValueError as e:
+        await run_in_threadpool(crud_upload.release_chunk, db, sesion_id, reserva)
+        raise HTTPException(status_code=413, detail=str(e))
+    except Exception:
+        await run_in_threadpool(crud_upload.release_chunk, db, sesion_id, reserva)
+        raise
+
+    # Si el cliente se desconectó igual se guarda lo recibido para poder reanudar
+    status = await run_in_threadpool(
+        crud_upload.record_chunk, db, sesion_id, current_user.idUsuario, upload_offset, written, reserva
+    )
+    response.headers["Upload-Offset"] = str(status.BytesRecibidos)
+    return status
+
+@router.post("/uploads/{sesion_id}/complete", response_model=DocumentoRead, status_code=201)
+async def complete_upload(
+    sesion_id: str,
+    db: Session = Depends(get_db),
+    current_user: UserRead = Depends(get_current_user)
+):
+    """Finaliza la carga y registra el documento en el producto."""
+    return await run_in_threadpool(crud_upload.finalize_upload, db, sesion_id, current_user.idUsuario)
+
+@router.delete("/uploads/{sesion_id}")
+async def cancel_upload(
+    sesion_id: str,
+    db: Session = Depends(get_db),
+    current_user: UserRead = Depends(get_current_user)
+):
+    """Cancela una carga y libera la cuota reservada."""
+    return await run_in_threadpool(crud_upload.cancel_upload, db, sesion_id, current_user.idUsuario)
+
+@router.get("/documents/{documento_id}/preview", response_class=FileResponse)
+async def get_document_preview(
+    documento_id: int,
+    size: int = Query(None, description="Lado mayor en px (por defecto la miniatura más pequeña)"),
+    db: Session = Depends(get_db),
+    current_user: UserRead = Depends(get_current_user)
+):
+    """Devuelve la miniatura JPEG de un documento."""
+    size = size or min(settings.preview_sizes)
+    path = await run_in_threadpool(crud_upload.get_preview_path, db, documento_id, current_user.idUsuario, size)
+    # El nombre incluye el hash del contenido: se puede cachear indefinidamente
+    return FileResponse(
+        path,
+        media_type="image/jpeg",
+        headers={"Cache-Control": "private, max-age=31536000, immutable"}
+    )
@@ -1,12 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Request
 from sqlalchemy.orm import Session
-from typing import List
+from starlette.concurrency import run_in_threadpool
+from typing import List, Optional
 
-from app.schemas.user import UserRead, UserCreate, UserLogin, LoginResponse, PasswordChangeRequest, AccountDeleteRequest
+from app.schemas.user import UserRead, UserCreate, UserLogin, LoginResponse, PasswordChangeRequest, AccountDeleteRequest, RefreshRequest, RefreshResponse
 from app.crud import user as crud_user
+from app.crud import refresh_token as crud_refresh
+from app.crud import token_revocation as crud_revocation
 from app.db.session import get_db
-from app.api.dependencies import get_current_user
-from app.core.security import hash_password, verify_password, create_access_token
+from app.api.dependencies import get_current_user, get_token_payload
+from app.core.security import hash_password, verify_password, dummy_verify_password, password_needs_rehash, create_access_token
+from app.core.rate_limit import check_login_rate
 
 router = APIRouter()
 
@@ -14,7 +18,7 @@ router = APIRouter()
 @router.get("/users", response_model=List[UserRead])
 async def get_users(db: Session = Depends(get_db)):
     """Obtiene la lista completa de usuarios registrados."""
-    usuarios = crud_user.get_users_list(db)
+    usuarios = await run_in_threadpool(crud_user.get_users_list, db)
     if not usuarios:
         raise HTTPException(status_code=404, detail="No hay usuarios registrados")
     return usuarios
@@ -23,7 +27,7 @@ async def get_users(db: Session = Depends(get_db)):
 @router.get("/users/{user_id}", response_model=UserRead)
 async def get_user(user_id: int, db: Session = Depends(get_db)):
     """Obtiene la información de un usuario específico por ID."""
-    usuario = crud_user.search_user(db, user_id)
+    usuario = await run_in_threadpool(crud_user.search_user, db, user_id)
     if not usuario:
         raise HTTPException(status_code=404, detail="Usuario no encontrado")
     return usuario
@@ -32,27 +36,50 @@ async def get_user(user_id: int, db: Session = Depends(get_db)):
 @router.post("/users", response_model=UserRead, status_code=201)
 async def create_user(user: UserCreate, db: Session = Depends(get_db)):
     """Registra un nuevo usuario en el sistema."""
-    return crud_user.create_user(db, user)
+    return await run_in_threadpool(crud_user.create_user, db, user)
 
 # LOGIN - Autenticar usuario
 @router.post("/auth/login", response_model=LoginResponse)
-async def login(user_credentials: UserLogin, db: Session = Depends(get_db)):
+async def login(
+    user_credentials: UserLogin,
+    request: Request,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db)
+):
     """Autentica un usuario y genera un token de acceso."""
+    # Limitar intentos por IP y por email ANTES de consultar la BD o ejecutar bcrypt
+    # (detrás de un proxy, uvicorn debe usar --forwarded-allow-ips para ver la IP real)
+    check_login_rate(request.client.host if request.client else None, user_credentials.correo)
+
     try:
         # Buscar usuario por email
-        user_data = crud_user.get_user_for_login(db, user_credentials.correo)
+        user_data = await run_in_threadpool(crud_user.get_user_for_login, db, user_credentials.correo)
         
         if not user_data:
+            # Mismo costo que una contraseña incorrecta (no revela si el email existe)
+            await run_in_threadpool(dummy_verify_password, user_credentials.contrasena)
             raise HTTPException(status_code=401, detail="Credenciales incorrectas")
         
-        # Verificar contraseña
-        if not verify_password(user_credentials.contrasena, user_data["contrasenaHash"]):
+        # Verificar contraseña (bcrypt/argon2 en el threadpool: no frena al resto de peticiones)
+        if not await run_in_threadpool(verify_password, user_credentials.contrasena, user_data["contrasenaHash"]):
             raise HTTPException(status_code=401, detail="Credenciales incorrectas")
+
+        # Hash con esquema/costo antiguo: se actualiza después de responder
+        if password_needs_rehash(user_data["contrasenaHash"]):
+            background_tasks.add_task(
+                crud_user.rehash_user_password,
+                user_data["idUsuario"],
+                user_credentials.contrasena,
+                user_data["contrasenaHash"]
+            )
         
         # Crear token JWT
         access_token = create_access_token(
             data={"sub": user_data["correo"], "user_id": user_data["idUsuario"]}
         )
+
+        # Refresh token: permite renovar el access token sin volver a pasar por bcrypt
+        refresh_token = await run_in_threadpool(crud_refresh.issue_refresh_token, db, user_data["idUsuario"])
         
         # Crear respuesta con token y datos del usuario
         user_response = UserRead(
@@ -64,6 +91,7 @@ async def login(user_credentials: UserLogin, db: Session = Depends(get_db)):
         
         return LoginResponse(
             access_token=access_token,
+            refresh_token=refresh_token,
             token_type="bearer",
             user=user_response
         )
@@ -73,17 +101,55 @@ async def login(user_credentials: UserLogin, db: Session = Depends(get_db)):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error interno en el login: {str(e)}")
 
+# REFRESH - Renovar access token con un refresh token (rotativo)
+@router.post("/auth/refresh", response_model=RefreshResponse)
+async def refresh(refresh_data: RefreshRequest, db: Session = Depends(get_db)):
+    """Entrega un access token nuevo y rota el refresh token."""
+    new_refresh_token, user_data = await run_in_threadpool(crud_refresh.rotate_refresh_token, db, refresh_data.refresh_token)
+    access_token = create_access_token(
+        data={"sub": user_data["correo"], "user_id": user_data["idUsuario"]}
+    )
+    return RefreshResponse(
+        access_token=access_token,
+        refresh_token=new_refresh_token,
+        token_type="bearer"
+    )
+
+# LOGOUT - Revocar el access token actual (y la sesión del refresh token si se envía)
+@router.post("/auth/logout")
+async def logout(
+    logout_data: Optional[RefreshRequest] = None,
+    db: Session = Depends(get_db),
+    payload: dict = Depends(get_token_payload)
+):
+    """Cierra la sesión: el token deja de ser aceptado en todos los workers."""
+    def _logout():
+        crud_revocation.revoke_access_token(db, payload)
+        if logout_data is not None:
+            crud_refresh.revoke_refresh_family(db, logout_data.refresh_token)
+        db.commit()
+
+    try:
+        await run_in_threadpool(_logout)
+        return {"message": "Sesión cerrada"}
+    except HTTPException:
+        db.rollback()
+        raise
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=f"Error al cerrar sesión: {str(e)}")
+
 # Actualizar un usuario existente
 @router.put("/users/{user_id}", response_model=UserRead)
 async def update_user(user_id: int, user: UserCreate, db: Session = Depends(get_db)):
     """Actualiza la información de un usuario existente."""
-    return crud_user.update_user(db, user_id, user)
+    return await run_in_threadpool(crud_user.update_user, db, user_id, user)
 
 # Eliminar un usuario
 @router.delete("/users/{user_id}", status_code=204)
 async def delete_user(user_id: int, db: Session = Depends(get_db)):
     """Elimina un usuario del sistema."""
-    crud_user.delete_user(db, user_id)
+    await run_in_threadpool(crud_user.delete_user, db, user_id)
     return {"message": "Usuario eliminado"}
 
 # ===== ENDPOINTS ESENCIALES PARA GESTIÓN DE CUENTA =====
@@ -97,7 +163,8 @@ async def change_password(
 ):
     """Permite al usuario autenticado cambiar su contraseña."""
     try:
-        return crud_user.update_user_password(
+        return await run_in_threadpool(
+            crud_user.update_user_password,
             db, 
             current_user.idUsuario, 
             password_data.nueva_contrasena
@@ -122,7 +189,7 @@ async def delete_my_account(
         )
     
     try:
-        result = crud_user.delete_user_account(db, current_user.idUsuario)
+        result = await run_in_threadpool(crud_user.delete_user_account, db, current_user.idUsuario)
         return {
             "message": "Cuenta eliminada exitosamente",
             "detail": "Se han eliminado todos tus datos y productos asociados",
@@ -0,0 +1,41 @@
+"""
+Tareas periódicas en segundo plano.
+
+Se inician al levantar el servidor (limpieza de cargas abandonadas, etc.)
+y se cancelan al apagarlo.
+"""
+
+import asyncio
+import logging
+from typing import Callable, Dict
+
+from starlette.concurrency import run_in_threadpool
+
+logger = logging.getLogger(__name__)
+
+# Tareas activas por nombre
+_tasks: Dict[str, asyncio.Task] = {}
+
+async def _run_periodically(name: str, interval_seconds: float, func: Callable[[], object]):
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            # Las funciones son síncronas (acceso a BD), se ejecutan en el threadpool
+            await run_in_threadpool(func)
+        except Exception:
+            logger.exception(f"Error en tarea periódica '{name}'")
+
+def start_periodic_task(name: str, interval_seconds: float, func: Callable[[], object]):
+    """Programa `func` cada `interval_seconds` segundos (una sola instancia por nombre)."""
+    task = _tasks.get(name)
+    if task is not None and not task.done():
+        return
+    _tasks[name] = asyncio.create_task(_run_periodically(name, interval_seconds, func), name=name)
+    logger.info(f" Tarea periódica '{name}' iniciada cada {interval_seconds}s")
+
+async def stop_periodic_tasks():
+    """Cancela todas las tareas periódicas y espera a que terminen."""
+    for task in _tasks.values():
+        task.cancel()
+    await asyncio.gather(*_tasks.values(), return_exceptions=True)
+    _tasks.clear()
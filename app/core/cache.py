@@ -0,0 +1,69 @@
+"""
+Caché en memoria por usuario.
+
+Guarda valores calculados (ej: el resumen del home) con TTL y un máximo de
+usuarios (LRU). Las escrituras de productos invalidan la entrada del usuario.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Tuple
+
+class UserCache:
+    """Un valor por usuario con expiración y desalojo LRU."""
+
+    def __init__(self, ttl_seconds: float, max_users: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_users = max_users
+        self._lock = threading.Lock()
+        self._data: "OrderedDict[int, Tuple[float, Any]]" = OrderedDict()
+        # Cálculos en curso por usuario: [cálculos, generación]. Invalidar incrementa la
+        # generación y un cálculo que empezó antes no se guarda. La entrada se borra
+        # cuando termina el último cálculo: no crece con cada usuario invalidado
+        self._pending: Dict[int, List[int]] = {}
+
+    def get_or_compute(self, user_id: int, compute: Callable[[], Any]) -> Any:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(user_id)
+            if entry is not None and entry[0] > now:
+                self._data.move_to_end(user_id)
+                return entry[1]
+            pending = self._pending.setdefault(user_id, [0, 0])
+            pending[0] += 1
+            generation = pending[1]
+
+        try:
+            value = compute()
+        except BaseException:
+            with self._lock:
+                self._finish_locked(user_id)
+            raise
+
+        with self._lock:
+            if self._finish_locked(user_id) == generation:
+                self._data[user_id] = (time.monotonic() + self.ttl_seconds, value)
+                self._data.move_to_end(user_id)
+                while len(self._data) > self.max_users:
+                    self._data.popitem(last=False)
+        return value
+
+    def _finish_locked(self, user_id: int) -> int:
+        """Cierra un cálculo en curso y devuelve la generación vigente."""
+        pending = self._pending[user_id]
+        pending[0] -= 1
+        if pending[0] == 0:
+            del self._pending[user_id]
+        return pending[1]
+
+    def invalidate(self, user_id: int):
+        with self._lock:
+            pending = self._pending.get(user_id)
+            if pending is not None:
+                pending[1] += 1
+            self._data.pop(user_id, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"usuarios": len(self._data), "max_usuarios": self.max_users}
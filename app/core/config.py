@@ -16,17 +16,111 @@ class Settings(BaseSettings):
     DATABASE_URL: str                     # DESDE .ENV (Render la proporciona)
     EXTERNAL_DATABASE_URL: Optional[str] = None  # DESDE .ENV (opcional, para conexiones externas)
     ENV: str = "local"                # local
+    DB_SSLMODE: str = "require"       # "disable" para un PostgreSQL local sin SSL
+    DB_ECHO: bool = False             # Registrar cada SQL (logger sqlalchemy.engine; solo para depurar)
+    DB_POOL_WARM_CONNECTIONS: int = 3 # Conexiones que se abren en paralelo al arrancar (0 = ninguna)
+    DB_CONNECT_TIMEOUT_SECONDS: int = 5       # Espera máxima al abrir una conexión (PostgreSQL)
+    DB_STATEMENT_TIMEOUT_MS: int = 15000      # Sentencias más largas se cancelan (0 = sin límite)
+    DB_RETRY_ATTEMPTS: int = 3                # Intentos de una lectura ante errores de conexión
+    DB_RETRY_BASE_DELAY_MS: int = 50          # Espera base entre reintentos (exponencial con jitter)
+    DB_BREAKER_FAILURE_THRESHOLD: int = 5     # Errores de conexión seguidos que abren el circuito
+    DB_BREAKER_OPEN_SECONDS: float = 10       # Tiempo con el circuito abierto (503 inmediato) antes de probar
+
+    # === HEALTH CHECKS (/health/ready, /health/status) ===
+    HEALTH_DB_PING_TTL_SECONDS: float = 5     # Segundos que se reutiliza el último ping a la BD
+    HEALTH_DB_PING_TIMEOUT_SECONDS: float = 2 # Un ping más lento cuenta como caída
+    HEALTH_MAX_POOL_USAGE: float = 1.0        # Fracción del pool en uso desde la que el worker no está listo
+    INTERNAL_ENDPOINTS_TOKEN: str = ""        # Bearer para /health/status y /metrics (vacío: solo desde localhost)
+    SHUTDOWN_DRAIN_SECONDS: float = 25        # Plazo para terminar peticiones en curso al apagar (menor al del orquestador)
+
+    # === LOGGING (app/core/logs.py) ===
+    LOG_LEVEL: str = "INFO"                   # Nivel mínimo del logger raíz
+    LOG_FORMAT: str = "json"                  # "json" (una línea por registro) o "text" (desarrollo)
+    LOG_ASYNC: bool = True                    # Escribir desde un hilo (QueueListener), no desde el event loop
+    LOG_SAMPLE_RATES: str = ""                # Fracción que se guarda por nivel, ej. "INFO:0.1,DEBUG:0"
+    LOG_ROUTE_SAMPLE_RATES: str = "/health:0,/metrics:0"  # Por prefijo de ruta (solo bajo WARNING)
+
+    # === COMPRESIÓN Y FORMATO DE RESPUESTAS (app/core/encoding.py) ===
+    COMPRESSION_MIN_BYTES: int = 1024         # Cuerpos menores se envían sin comprimir (0 = desactiva la compresión)
+    COMPRESSION_GZIP_LEVEL: int = 5           # 1-9: más alto = algo más chico y bastante más CPU
+    COMPRESSION_BROTLI_QUALITY: int = 4       # 0-11: se usa si el cliente acepta br y está el paquete `brotli`
+    MSGPACK_ENABLED: bool = True              # Accept/Content-Type application/msgpack (requiere `msgpack`)
+    ENCODING_CACHE_MAX_MB: int = 16           # Cuerpos ya comprimidos/convertidos que se reutilizan (0 = sin caché)
 
     # === CONFIGURACIÓN DE SEGURIDAD ===
     SECRET_KEY: str                           # DESDE .ENV
     JWT_ALGORITHM: str = "HS256"              # Algoritmo JWT
     JWT_EXPIRE_MINUTES: int = 30              # Minutos de expiración del token
+    REFRESH_TOKEN_EXPIRE_DAYS: int = 30       # Días de validez del refresh token (rotativo)
+    REVOCATION_SYNC_SECONDS: int = 5          # Cada cuánto cada worker lee nuevas revocaciones
+
+    # === LIMITADOR DE LOGIN (token bucket por IP y por email) ===
+    LOGIN_RATE_IP_CAPACITY: int = 20             # Intentos seguidos permitidos por IP
+    LOGIN_RATE_IP_PER_MINUTE: float = 10         # Intentos que se recuperan por minuto por IP
+    LOGIN_RATE_EMAIL_CAPACITY: int = 5           # Intentos seguidos permitidos por email
+    LOGIN_RATE_EMAIL_PER_MINUTE: float = 2       # Intentos que se recuperan por minuto por email
+    LOGIN_RATE_MAX_KEYS: int = 100000            # Claves en memoria por worker (LRU)
+    RATE_LIMIT_REDIS_URL: Optional[str] = None   # Opcional: limitador compartido entre workers
+
+    # === HASH DE CONTRASEÑAS (calibrar con: python -m app.core.hash_calibration) ===
+    PASSWORD_HASH_SCHEME: str = "bcrypt"      # "bcrypt" o "argon2" (requiere argon2-cffi)
+    BCRYPT_ROUNDS: int = 12                   # Costo bcrypt (cada +1 duplica el tiempo)
+    ARGON2_TIME_COST: int = 3                 # Iteraciones argon2id
+    ARGON2_MEMORY_COST_KB: int = 65536        # Memoria por hash argon2id (KiB)
+    ARGON2_PARALLELISM: int = 1               # Hilos por hash argon2id
     
     # === CONFIGURACIÓN DE LA APP ===
     DEBUG: bool = True                    # Modo debug para desarrollo
     API_PREFIX: str = "/api"              # Prefijo para todas las rutas
     ALLOW_ORIGIN: str = "*"               # Orígenes permitidos para CORS
 
+    # === CONFIGURACIÓN DE ARCHIVOS (CARGAS REANUDABLES) ===
+    UPLOAD_DIR: str = "uploads"                    # Carpeta donde se guardan los documentos
+    UPLOAD_MAX_FILE_MB: int = 50                   # Tamaño máximo por archivo
+    UPLOAD_USER_QUOTA_MB: int = 500                # Cuota total por usuario (documentos + cargas activas)
+    UPLOAD_MAX_SESSIONS_PER_USER: int = 5          # Cargas simultáneas por usuario
+    UPLOAD_SESSION_TTL_MINUTES: int = 1440         # Una carga sin actividad expira tras este tiempo
+    UPLOAD_CHUNK_LEASE_SECONDS: int = 900          # Reserva de un fragmento en curso (si el worker muere, se libera al vencer)
+    UPLOAD_SWEEP_INTERVAL_SECONDS: int = 300       # Cada cuánto se limpian cargas abandonadas
+
+    # === CONFIGURACIÓN DE MINIATURAS / VISTAS PREVIAS ===
+    PREVIEW_SIZES: str = "160,640"                 # Lado mayor (px) de cada miniatura, separados por coma
+    PREVIEW_WORKERS: int = 2                       # Procesos dedicados a generar miniaturas
+    PREVIEW_MAX_PENDING: int = 16                  # Trabajos en cola como máximo (backpressure)
+    PREVIEW_RETRY_INTERVAL_SECONDS: int = 120      # Reintento de documentos que quedaron sin miniaturas
+
+    # === CONFIGURACIÓN DE SUGERENCIAS (AUTOCOMPLETADO) ===
+    SUGGEST_MAX_USERS: int = 5000                  # Usuarios con índice en memoria (LRU)
+    SUGGEST_MAX_VALUES_PER_FIELD: int = 500        # Valores más frecuentes que se guardan por campo
+    SUGGEST_IDLE_SECONDS: int = 900                # Un índice sin uso se libera tras este tiempo
+
+    # === CONFIGURACIÓN DEL RESUMEN (HOME) ===
+    SUMMARY_CACHE_TTL_SECONDS: int = 300           # Acota el desfase de conteos que dependen de la fecha
+    SUMMARY_CACHE_MAX_USERS: int = 10000           # Usuarios con resumen en caché (LRU)
+
+    # === CACHÉ DE RESPUESTAS (GET /products y /products/{id}) ===
+    RESPONSE_CACHE_MAX_MB: int = 64                # Presupuesto de memoria por worker (LRU por bytes)
+    RESPONSE_CACHE_TTL_SECONDS: int = 600          # Límite de vida aunque no haya escrituras
+    RESPONSE_CACHE_REDIS_URL: Optional[str] = None # Opcional: caché compartida entre workers
+
+    # === IDEMPOTENCIA (cabecera Idempotency-Key en POST) ===
+    IDEMPOTENCY_TTL_HOURS: int = 24                # Tiempo durante el que se puede repetir una clave
+    IDEMPOTENCY_WAIT_SECONDS: float = 10           # Espera máxima a que termine la petición original
+    IDEMPOTENCY_MAX_BODY_KB: int = 1024            # Respuestas más grandes no se guardan
+
+    # === LOTES (POST /batch) ===
+    BATCH_MAX_CONCURRENCY: int = 4                 # Lecturas del mismo lote ejecutadas a la vez
+
+    # === FEED DE CAMBIOS (GET /events, /events/ws) ===
+    EVENTS_BACKEND: str = "memory"                 # "memory" (un worker) o "postgres" (LISTEN/NOTIFY)
+    EVENTS_QUEUE_SIZE: int = 100                   # Eventos pendientes por conexión antes de cortarla
+    EVENTS_HEARTBEAT_SECONDS: int = 25             # Comentario SSE / ping para mantener viva la conexión
+
+    @property
+    def preview_sizes(self) -> list[int]:
+        """Tamaños de miniatura como lista de enteros."""
+        return [int(s) for s in self.PREVIEW_SIZES.split(",") if s.strip()]
+
     @property
     def SQLALCHEMY_DATABASE_URL(self) -> str:
         """
@@ -0,0 +1,286 @@
+"""
+Codificación de respuestas para clientes móviles: compresión y MessagePack.
+
+- CompressionMiddleware: comprime con brotli (paquete opcional `brotli`) o gzip
+  según Accept-Encoding los cuerpos JSON, MessagePack y texto desde
+  COMPRESSION_MIN_BYTES. Los niveles por defecto (gzip 5, brotli 4) están
+  elegidos por CPU: los más altos apenas achican una lista de productos y
+  cuestan varias veces más (python -m benchmarks.encoding --levels).
+- MsgPackMiddleware (paquete opcional `msgpack`): con
+  `Accept: application/msgpack` las respuestas JSON se envían en MessagePack, y
+  los cuerpos con `Content-Type: application/msgpack` se convierten a JSON
+  antes de llegar a los endpoints (la validación sigue siendo la de pydantic).
+
+Las respuestas en streaming (/events, descargas) pasan sin tocar: comprimirlas
+obligaría a retener los eventos hasta llenar un bloque.
+
+El resultado de comprimir o convertir un cuerpo grande se guarda en un LRU
+por bytes (ENCODING_CACHE_MAX_MB), con el cuerpo original como clave: un
+acierto de la caché de respuestas entrega siempre el mismo objeto bytes
+(su hash ya está calculado), así que la lista repetida no se vuelve a
+comprimir en cada petición.
+"""
+
+import gzip
+import json
+import logging
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Tuple
+
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .config import settings
+from .metrics import counter
+
+logger = logging.getLogger(__name__)
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+COMPRESSED_RESPONSES = counter(
+    "compressed_responses_total", "Respuestas comprimidas", ["encoding"]
+)
+ENCODING_CACHE_REQUESTS = counter(
+    "encoding_cache_requests_total", "Lecturas de la caché de cuerpos codificados", ["result"]
+)
+
+MSGPACK_TYPES = ("application/msgpack", "application/x-msgpack")
+_COMPRESSIBLE_TYPES = ("application/json", "text/", *MSGPACK_TYPES)
+_NOT_COMPRESSIBLE_TYPES = ("text/event-stream",)
+# Sobre este tamaño se comprime en el threadpool (zlib y brotli sueltan el GIL)
+_THREAD_MIN_BYTES = 256 * 1024
+# Cuerpos menores se codifican siempre: guardarlos no compensa
+_CACHE_MIN_BYTES = 16 * 1024
+
+def qvalues(header: str) -> Dict[str, float]:
+    """"br;q=1.0, gzip;q=0.8" -> {"br": 1.0, "gzip": 0.8} (claves en minúscula)."""
+    valores = {}
+    for parte in header.split(","):
+        nombre, _, parametros = parte.partition(";")
+        nombre = nombre.strip().lower()
+        if not nombre:
+            continue
+        q = 1.0
+        for parametro in parametros.split(";"):
+            clave, _, valor = parametro.strip().partition("=")
+            if clave == "q":
+                try:
+                    q = float(valor)
+                except ValueError:
+                    q = 0.0
+        valores[nombre] = q
+    return valores
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """Codificación preferida por el cliente entre las disponibles (brotli gana los empates)."""
+    aceptadas = qvalues(accept_encoding)
+    disponibles = ("br", "gzip") if brotli is not None else ("gzip",)
+    mejor, mejor_q = None, 0.0
+    for codificacion in disponibles:
+        q = aceptadas.get(codificacion, aceptadas.get("*", 0.0))
+        if q > mejor_q:
+            mejor, mejor_q = codificacion, q
+    return mejor
+
+def prefers_msgpack(accept: str) -> bool:
+    """El cliente pide MessagePack con al menos la misma preferencia que JSON."""
+    aceptados = qvalues(accept)
+    q_msgpack = max(aceptados.get(tipo, 0.0) for tipo in MSGPACK_TYPES)
+    return q_msgpack > 0 and q_msgpack >= aceptados.get("application/json", 0.0)
+
+class EncodedCache:
+    """LRU (codificación, cuerpo) -> cuerpo codificado, limitado por bytes."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.size_bytes = 0
+        self._lock = threading.Lock()
+        self._data: "OrderedDict[Tuple[str, bytes], bytes]" = OrderedDict()
+
+    async def encode(self, encoding: str, body: bytes, func: Callable[[bytes], bytes]) -> bytes:
+        if len(body) < _CACHE_MIN_BYTES or self.max_bytes <= 0:
+            return func(body)
+        clave = (encoding, body)
+        with self._lock:
+            valor = self._data.get(clave)
+            if valor is not None:
+                self._data.move_to_end(clave)
+        if valor is not None:
+            ENCODING_CACHE_REQUESTS.inc(result="hit")
+            return valor
+        ENCODING_CACHE_REQUESTS.inc(result="miss")
+        valor = await run_in_threadpool(func, body) if len(body) >= _THREAD_MIN_BYTES else func(body)
+        tamano = len(body) + len(valor)
+        if tamano > self.max_bytes:
+            return valor
+        with self._lock:
+            if clave not in self._data:
+                self._data[clave] = valor
+                self.size_bytes += tamano
+            while self.size_bytes > self.max_bytes:
+                (_, original), codificado = self._data.popitem(last=False)
+                self.size_bytes -= len(original) + len(codificado)
+        return valor
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entradas": len(self._data), "bytes": self.size_bytes, "max_bytes": self.max_bytes}
+
+encoded_cache = EncodedCache(settings.ENCODING_CACHE_MAX_MB * 1024 * 1024)
+
+def _add_vary(headers: MutableHeaders, value: str):
+    actual = headers.get("vary")
+    if actual is None:
+        headers["Vary"] = value
+    elif value.lower() not in actual.lower():
+        headers["Vary"] = f"{actual}, {value}"
+
+class CompressionMiddleware:
+    def __init__(self, app: ASGIApp, minimum_size: int = 1024, gzip_level: int = 5, brotli_quality: int = 4):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    def compress(self, body: bytes, encoding: str) -> bytes:
+        if encoding == "br":
+            return brotli.compress(body, quality=self.brotli_quality)
+        return gzip.compress(body, compresslevel=self.gzip_level, mtime=0)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        inicio: Optional[Message] = None
+        directo = False
+
+        async def send_compressed(message: Message):
+            nonlocal inicio, directo
+            if directo:
+                await send(message)
+                return
+            if message["type"] == "http.response.start":
+                inicio = message   # Se retiene hasta ver el cuerpo
+                return
+
+            headers = MutableHeaders(scope=inicio)
+            tipo = headers.get("content-type", "")
+            comprimible = tipo.startswith(_COMPRESSIBLE_TYPES) and not tipo.startswith(_NOT_COMPRESSIBLE_TYPES)
+            body = message.get("body", b"")
+            if comprimible:
+                _add_vary(headers, "Accept-Encoding")
+            if (not comprimible or message.get("more_body", False) or "content-encoding" in headers
+                    or len(body) < self.minimum_size):
+                directo = True
+                await send(inicio)
+                await send(message)
+                return
+
+            body = await encoded_cache.encode(encoding, body, lambda b: self.compress(b, encoding))
+            headers["Content-Encoding"] = encoding
+            headers["Content-Length"] = str(len(body))
+            etag = headers.get("etag")
+            if etag and not etag.startswith("W/"):
+                headers["ETag"] = f"W/{etag}"   # Otros bytes: el ETag fuerte ya no corresponde
+            COMPRESSED_RESPONSES.inc(encoding=encoding)
+            await send(inicio)
+            await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, send_compressed)
+
+def _json_to_msgpack(body: bytes) -> bytes:
+    return msgpack.packb(json.loads(body or b"null"))
+
+class MsgPackMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        headers = Headers(scope=scope)
+
+        if headers.get("content-type", "").startswith(MSGPACK_TYPES):
+            partes = []
+            while True:
+                message = await receive()
+                if message["type"] != "http.request":
+                    return   # El cliente se desconectó antes de enviar el cuerpo
+                partes.append(message.get("body", b""))
+                if not message.get("more_body", False):
+                    break
+            try:
+                body = json.dumps(msgpack.unpackb(b"".join(partes)), ensure_ascii=False).encode()
+            except (ValueError, TypeError) as e:
+                # Mismo formato que los manejadores de error_handlers.py
+                respuesta = JSONResponse(
+                    {"error": "Error 400", "message": f"Cuerpo MessagePack inválido: {e}", "path": scope["path"]},
+                    status_code=400,
+                )
+                await respuesta(scope, receive, send)
+                return
+            request_headers = MutableHeaders(scope=scope)
+            request_headers["content-type"] = "application/json"
+            request_headers["content-length"] = str(len(body))
+            receive = self._replay(body, receive)
+
+        if not prefers_msgpack(headers.get("accept", "")):
+            await self.app(scope, receive, send)
+            return
+
+        inicio: Optional[Message] = None
+        directo = False
+
+        async def send_msgpack(message: Message):
+            nonlocal inicio, directo
+            if directo:
+                await send(message)
+                return
+            if message["type"] == "http.response.start":
+                inicio = message
+                return
+            response_headers = MutableHeaders(scope=inicio)
+            if not response_headers.get("content-type", "").startswith("application/json") or message.get("more_body", False):
+                directo = True
+                await send(inicio)
+                await send(message)
+                return
+            body = await encoded_cache.encode("msgpack", message.get("body", b""), _json_to_msgpack)
+            response_headers["Content-Type"] = MSGPACK_TYPES[0]
+            response_headers["Content-Length"] = str(len(body))
+            _add_vary(response_headers, "Accept")
+            await send(inicio)
+            await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, send_msgpack)
+
+    @staticmethod
+    def _replay(body: bytes, receive: Receive) -> Receive:
+        """receive que entrega el cuerpo ya convertido y luego delega (desconexión)."""
+        entregado = False
+
+        async def wrapped() -> Message:
+            nonlocal entregado
+            if not entregado:
+                entregado = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        return wrapped
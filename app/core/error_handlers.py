@@ -4,41 +4,32 @@ estos manejadores atrapan el error y devuelven una respuesta HTTP amigable.
 
 from fastapi import FastAPI, Request, HTTPException
 from fastapi.responses import JSONResponse
-from sqlalchemy.exc import SQLAlchemyError, IntegrityError, OperationalError
+from sqlalchemy.exc import SQLAlchemyError, IntegrityError
 from pydantic import ValidationError
+from app.core.config import settings
+from app.db import errors
+from app.db.resilience import DatabaseUnavailable, is_connection_error
+from app.crud.exceptions import IntegrityViolation, from_db_error
 import logging
 
 logger = logging.getLogger(__name__)
 
 def handle_database_error(error: Exception) -> HTTPException:
+    """Traduce el error por su código de driver/SQLSTATE (app/db/errors.py), sin leer el mensaje."""
+    if is_connection_error(error):
+        # La base no responde (failover, reinicio): el cliente puede reintentar
+        return DatabaseUnavailable(retry_after=settings.DB_BREAKER_OPEN_SECONDS)
 
-    logger.error(f"Error de base de datos: {str(error)}")
-    
-    if isinstance(error, IntegrityError):
-        # Error de integridad (unique constraint, foreign key, etc.)
-        if "UNIQUE constraint failed" in str(error) or "duplicate key" in str(error).lower():
-            return HTTPException(status_code=409, detail="El recurso ya existe")
-        elif "foreign key" in str(error).lower():
-            return HTTPException(status_code=422, detail="Referencia inválida a otro recurso")
-        else:
-            return HTTPException(status_code=422, detail="Error de integridad de datos")
-    
-    elif isinstance(error, OperationalError):
-        # Error operacional (conexión, sintaxis, etc.)
-        if "no such table" in str(error).lower():
-            return HTTPException(status_code=500, detail="Tabla no encontrada en la base de datos")
-        elif "database is locked" in str(error).lower():
-            return HTTPException(status_code=500, detail="Base de datos temporalmente no disponible")
-        else:
-            return HTTPException(status_code=500, detail="Error de conexión a la base de datos")
-    
-    elif isinstance(error, SQLAlchemyError):
-        # Otros errores de SQLAlchemy
-        return HTTPException(status_code=500, detail="Error interno de base de datos")
-    
-    else:
-        # Error genérico
-        return HTTPException(status_code=500, detail="Error interno del servidor")
+    kind = errors.classify(error)
+    if kind == errors.UNDEFINED_OBJECT:
+        return HTTPException(status_code=500, detail="Tabla no encontrada en la base de datos")
+    if kind == errors.UNKNOWN and isinstance(error, IntegrityError):
+        # Driver sin códigos: restricción sin identificar
+        return IntegrityViolation()
+    if isinstance(error, SQLAlchemyError) or kind != errors.UNKNOWN:
+        return from_db_error(error)
+    # Error genérico
+    return HTTPException(status_code=500, detail="Error interno del servidor")
 
 def setup_exception_handlers(app: FastAPI):
 
@@ -60,7 +51,8 @@ def setup_exception_handlers(app: FastAPI):
                 "error": "Error de base de datos",
                 "message": http_exception.detail,
                 "path": url
-            }
+            },
+            headers=http_exception.headers  # Retry-After si la base no responde
         )
     
     @app.exception_handler(ValidationError) 
@@ -104,7 +96,8 @@ def setup_exception_handlers(app: FastAPI):
                 "error": f"Error {exc.status_code}",
                 "message": exc.detail,
                 "path": url
-            }
+            },
+            headers=exc.headers  # Ej: Upload-Offset, Retry-After
         )
     
     @app.exception_handler(Exception)
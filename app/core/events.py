@@ -0,0 +1,190 @@
+"""
+Feed de cambios por usuario (SSE en GET /events y WebSocket en /events/ws).
+
+- Las rutas de escritura de CRUD llaman a `publish(...)` tras confirmar.
+- `broker` reparte cada evento a las conexiones abiertas de ese usuario en
+  este worker. Cada conexión tiene una cola acotada (EVENTS_QUEUE_SIZE): si
+  el cliente no la vacía a tiempo se le desconecta con un evento "overflow"
+  (debe reconectar y volver a leer), así un cliente lento no acumula memoria.
+- Con EVENTS_BACKEND="postgres" los eventos viajan por LISTEN/NOTIFY y
+  llegan a todos los workers (incluido el que publica); con "memory" solo
+  se reparten dentro del worker.
+
+Una conexión inactiva cuesta una corrutina y una cola vacía: sin sesión de
+BD ni hilo, pensado para miles de conexiones por worker.
+"""
+
+import asyncio
+import itertools
+import json
+import logging
+from typing import Dict, Optional, Set
+
+from .config import settings
+from .metrics import counter, gauge
+
+logger = logging.getLogger(__name__)
+
+NOTIFY_CHANNEL = "misboletas_eventos"
+
+EVENTS_PUBLISHED = counter("events_published_total", "Eventos publicados", ["tipo"])
+EVENTS_DROPPED = counter("events_dropped_subscribers_total", "Conexiones cerradas por no consumir eventos")
+
+class Subscription:
+    """Cola acotada de eventos de una conexión."""
+
+    def __init__(self, user_id: int, queue_size: int):
+        self.user_id = user_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.overflowed = False
+
+    def offer(self, event: dict):
+        if self.overflowed:
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Cliente lento: se descarta lo pendiente y se le avisa que reconecte
+            EVENTS_DROPPED.inc()
+            self.close()
+
+    def close(self):
+        """Termina la conexión como un overflow: el cliente reconecta y vuelve a leer."""
+        if not self.overflowed:
+            self.overflowed = True
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(None)
+
+    async def next_event(self, timeout: float) -> Optional[dict]:
+        """Siguiente evento; None = overflow. Lanza TimeoutError si no hay nada (heartbeat)."""
+        return await asyncio.wait_for(self.queue.get(), timeout)
+
+class EventBroker:
+    """Fan-out en memoria del worker: usuario -> conexiones abiertas."""
+
+    def __init__(self, queue_size: int):
+        self.queue_size = queue_size
+        self._subscribers: Dict[int, Set[Subscription]] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._ids = itertools.count(1)
+
+    def subscribe(self, user_id: int) -> Subscription:
+        # Se llama desde el event loop: se recuerda para publicar desde otros hilos
+        self._loop = asyncio.get_running_loop()
+        subscription = Subscription(user_id, self.queue_size)
+        self._subscribers.setdefault(user_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        subs = self._subscribers.get(subscription.user_id)
+        if subs is not None:
+            subs.discard(subscription)
+            if not subs:
+                del self._subscribers[subscription.user_id]
+
+    def has_subscribers(self, user_id: int) -> bool:
+        return user_id in self._subscribers
+
+    def count(self) -> int:
+        return sum(len(s) for s in list(self._subscribers.values()))
+
+    def close_all(self):
+        """Pide a todas las conexiones que terminen (el cliente reconecta a otro worker)."""
+        for subs in list(self._subscribers.values()):
+            for subscription in list(subs):
+                subscription.close()
+
+    def dispatch(self, user_id: int, event: dict):
+        """Entrega local; debe ejecutarse en el event loop."""
+        event = {**event, "id": next(self._ids)}
+        for subscription in list(self._subscribers.get(user_id, ())):
+            subscription.offer(event)
+
+    def dispatch_threadsafe(self, user_id: int, event: dict):
+        """Entrega local desde cualquier hilo (endpoints, threadpool, callbacks)."""
+        loop = self._loop
+        if loop is None or loop.is_closed() or not self.has_subscribers(user_id):
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None  # Hilo del threadpool o callback de otro hilo
+        if running is loop:
+            self.dispatch(user_id, event)
+        else:
+            loop.call_soon_threadsafe(self.dispatch, user_id, event)
+
+broker = EventBroker(settings.EVENTS_QUEUE_SIZE)
+
+gauge("events_subscribers", "Conexiones SSE/WebSocket abiertas en el worker", func=broker.count)
+
+# ===== PUBLICACIÓN =====
+
+def publish(user_id: int, tipo: str, accion: str, recurso_id: int, **extra):
+    """
+    Publica un cambio ("producto"/"documento", "creado"/"actualizado"/"eliminado").
+    Nunca falla hacia quien llama: el feed es best-effort, la BD es la fuente de verdad.
+    """
+    event = {"tipo": tipo, "accion": accion, "recurso": recurso_id, **extra}
+    EVENTS_PUBLISHED.inc(tipo=tipo)
+    try:
+        if settings.EVENTS_BACKEND == "postgres":
+            _notify(user_id, event)
+        else:
+            broker.dispatch_threadsafe(user_id, event)
+    except Exception as e:
+        logger.warning(f" No se pudo publicar el evento {tipo}/{accion} del usuario {user_id}: {str(e)}")
+
+def _notify(user_id: int, event: dict):
+    from sqlalchemy import text
+    from app.db.session import engine
+
+    payload = json.dumps({"usuario": user_id, "evento": event})
+    with engine.begin() as conn:
+        conn.execute(text("SELECT pg_notify(:canal, :payload)"), {"canal": NOTIFY_CHANNEL, "payload": payload})
+
+# ===== LISTEN/NOTIFY (EVENTS_BACKEND=postgres) =====
+
+_listener_task: Optional[asyncio.Task] = None
+
+def _listener_conninfo() -> str:
+    from app.db.session import engine
+    return engine.url.set(drivername="postgresql").render_as_string(hide_password=False)
+
+async def _listen_forever():
+    import psycopg
+
+    espera = 1
+    while True:
+        try:
+            async with await psycopg.AsyncConnection.connect(_listener_conninfo(), autocommit=True) as conn:
+                await conn.execute(f"LISTEN {NOTIFY_CHANNEL}")
+                logger.info(" Escuchando eventos de otros workers (LISTEN/NOTIFY)")
+                espera = 1
+                async for notify in conn.notifies():
+                    try:
+                        data = json.loads(notify.payload)
+                        broker.dispatch(int(data["usuario"]), data["evento"])
+                    except Exception:
+                        logger.exception("Evento NOTIFY inválido")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f" Conexión LISTEN perdida, reintentando en {espera}s: {str(e)}")
+            await asyncio.sleep(espera)
+            espera = min(espera * 2, 30)
+
+async def start_event_listener():
+    """Inicia la escucha de NOTIFY si el backend es postgres."""
+    global _listener_task
+    broker._loop = asyncio.get_running_loop()
+    if settings.EVENTS_BACKEND == "postgres" and _listener_task is None:
+        _listener_task = asyncio.create_task(_listen_forever(), name="eventos-listen")
+
+async def stop_event_listener():
+    global _listener_task
+    if _listener_task is not None:
+        _listener_task.cancel()
+        await asyncio.gather(_listener_task, return_exceptions=True)
+        _listener_task = None
@@ -0,0 +1,107 @@
+"""
+Calibración del costo de hash de contraseñas.
+
+Mide cuánto tarda un hash en ESTA máquina para varios costos y recomienda
+el mayor que respeta el tiempo objetivo por login y el throughput deseado.
+
+Uso:
+    python -m app.core.hash_calibration --target-ms 50 --logins-per-second-per-core 15
+
+Solo mide: no se conecta a la base de datos ni cambia la configuración.
+"""
+
+import argparse
+import statistics
+import time
+
+from passlib.hash import bcrypt
+
+try:
+    from passlib.hash import argon2
+    argon2.get_backend()
+    ARGON2_DISPONIBLE = True
+except Exception:  # argon2-cffi no instalado
+    ARGON2_DISPONIBLE = False
+
+BCRYPT_ROUNDS = range(8, 15)
+ARGON2_GRID = [  # (time_cost, memory_cost_kb)
+    (2, 19456),
+    (2, 65536),
+    (3, 65536),
+    (4, 65536),
+    (3, 131072),
+]
+
+def _medir(handler, repeticiones: int) -> float:
+    """Mediana en milisegundos de hashear con el handler dado."""
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        handler.hash("contrasena-de-calibracion")
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    return statistics.median(tiempos)
+
+def calibrar(target_ms: float, logins_por_nucleo: float, repeticiones: int = 3):
+    """
+    Devuelve la lista de mediciones y la mejor opción por esquema.
+
+    Un costo es aceptable si cada hash tarda <= target_ms y un núcleo
+    alcanza para logins_por_nucleo logins por segundo (1000 / ms).
+    """
+    mediciones = []
+    for rounds in BCRYPT_ROUNDS:
+        ms = _medir(bcrypt.using(rounds=rounds), repeticiones)
+        mediciones.append({"esquema": "bcrypt", "env": {"BCRYPT_ROUNDS": rounds}, "ms": ms})
+    if ARGON2_DISPONIBLE:
+        for time_cost, memory_kb in ARGON2_GRID:
+            handler = argon2.using(type="ID", rounds=time_cost, memory_cost=memory_kb, parallelism=1)
+            ms = _medir(handler, repeticiones)
+            mediciones.append({
+                "esquema": "argon2",
+                "env": {"ARGON2_TIME_COST": time_cost, "ARGON2_MEMORY_COST_KB": memory_kb, "ARGON2_PARALLELISM": 1},
+                "ms": ms,
+            })
+
+    for m in mediciones:
+        m["logins_por_nucleo"] = 1000 / m["ms"]
+        m["aceptable"] = m["ms"] <= target_ms and m["logins_por_nucleo"] >= logins_por_nucleo
+
+    # Mejor opción = la más costosa (más lenta) que sigue siendo aceptable
+    mejores = {}
+    for m in mediciones:
+        if m["aceptable"] and m["ms"] > mejores.get(m["esquema"], {"ms": 0})["ms"]:
+            mejores[m["esquema"]] = m
+    return mediciones, mejores
+
+def main():
+    parser = argparse.ArgumentParser(description="Calibra el costo de hash de contraseñas")
+    parser.add_argument("--target-ms", type=float, default=50, help="Tiempo máximo por hash (ms)")
+    parser.add_argument("--logins-per-second-per-core", type=float, default=10,
+                        help="Logins por segundo que debe sostener cada núcleo")
+    parser.add_argument("--repeat", type=int, default=3, help="Repeticiones por medición")
+    args = parser.parse_args()
+
+    mediciones, mejores = calibrar(args.target_ms, args.logins_per_second_per_core, args.repeat)
+
+    print(f"{'esquema':8} {'parámetros':52} {'ms/hash':>8} {'login/s/núcleo':>14}  ok")
+    for m in mediciones:
+        params = " ".join(f"{k}={v}" for k, v in m["env"].items())
+        print(f"{m['esquema']:8} {params:52} {m['ms']:8.1f} {m['logins_por_nucleo']:14.1f}  {'sí' if m['aceptable'] else 'no'}")
+    if not ARGON2_DISPONIBLE:
+        print("\n(argon2-cffi no instalado: solo se midió bcrypt)")
+
+    if not mejores:
+        print("\nNingún costo cumple el objetivo: aumentar --target-ms o bajar --logins-per-second-per-core.")
+        return
+
+    # Preferir argon2id si está disponible (resistente a GPU por memoria)
+    esquema = "argon2" if "argon2" in mejores else "bcrypt"
+    elegido = mejores[esquema]
+    print("\nRecomendación (.env):")
+    print(f"PASSWORD_HASH_SCHEME={esquema}")
+    for k, v in elegido["env"].items():
+        print(f"{k}={v}")
+    print("\nLos hashes existentes se actualizan solos en el siguiente login de cada usuario.")
+
+if __name__ == "__main__":
+    main()
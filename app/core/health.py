@@ -0,0 +1,151 @@
+"""
+Health checks del worker.
+
+- Liveness (/health/live): sin I/O, solo confirma que el event loop responde.
+- Readiness (/health/ready): arranque completo (esquema creado, pool abierto,
+  revocaciones cargadas), ping a la BD y pool sin saturar.
+- Estado (/health/status): pool, cachés y ejecutores, para diagnóstico interno
+  (como /metrics, exige INTERNAL_ENDPOINTS_TOKEN o una conexión desde localhost).
+
+El ping a la BD se cachea HEALTH_DB_PING_TTL_SECONDS: con varios balanceadores
+consultando cada segundo, la base recibe a lo sumo un SELECT 1 por periodo y
+por worker (si varias sondas llegan con la caché vencida, comparten el mismo
+ping). En el camino cacheado la sonda no sale del event loop.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Optional
+
+from sqlalchemy import text
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+class DatabaseProbe:
+    """Último resultado de un SELECT 1, reutilizado durante `ttl_seconds`."""
+
+    def __init__(self, engine, ttl_seconds: float, timeout_seconds: float):
+        self.engine = engine
+        self.ttl_seconds = ttl_seconds
+        self.timeout_seconds = timeout_seconds
+        self._result: Optional[dict] = None
+        self._checked_at = 0.0
+        self._in_flight: Optional[asyncio.Task] = None
+
+    def _ping(self) -> float:
+        inicio = time.perf_counter()
+        with self.engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+        return time.perf_counter() - inicio
+
+    async def _refresh(self) -> dict:
+        try:
+            # Hilo propio: con el threadpool de la app ocupado la sonda igual responde
+            duracion = await asyncio.wait_for(asyncio.to_thread(self._ping), self.timeout_seconds)
+            resultado = {"ok": True, "latencia_ms": round(duracion * 1000, 2), "error": None}
+        except asyncio.TimeoutError:
+            resultado = {"ok": False, "latencia_ms": None, "error": f"sin respuesta en {self.timeout_seconds}s"}
+        except Exception as e:
+            # /health/ready es público: solo la clase, el texto del driver va al log
+            logger.warning(f" Ping a la BD falló: {str(e)}")
+            resultado = {"ok": False, "latencia_ms": None, "error": type(e).__name__}
+        self._result = resultado
+        self._checked_at = time.monotonic()
+        return resultado
+
+    async def check(self) -> dict:
+        edad = time.monotonic() - self._checked_at
+        if self._result is None or edad >= self.ttl_seconds:
+            # Single-flight: las sondas que llegan durante el ping esperan el mismo resultado
+            if self._in_flight is None or self._in_flight.done():
+                self._in_flight = asyncio.create_task(self._refresh())
+            await asyncio.shield(self._in_flight)
+            edad = time.monotonic() - self._checked_at
+        return {**self._result, "edad_s": round(edad, 3)}
+
+def pool_stats(engine) -> dict:
+    """Conexiones del pool; `uso` = en uso / máximo (tamaño + overflow)."""
+    pool = engine.pool
+    stats = {"tipo": type(pool).__name__}
+    if not hasattr(pool, "checkedout"):
+        return stats   # SingletonThreadPool/StaticPool (SQLite en memoria): sin límite que medir
+    en_uso = pool.checkedout()
+    maximo = pool.size() + max(getattr(pool, "_max_overflow", 0), 0)
+    stats.update({
+        "tamano": pool.size(),
+        "en_uso": en_uso,
+        "libres": pool.checkedin(),
+        "overflow": pool.overflow(),
+        "maximo": maximo,
+        "uso": round(en_uso / maximo, 3) if maximo else 0.0,
+    })
+    return stats
+
+def pool_saturated(stats: dict) -> bool:
+    return stats.get("uso", 0.0) >= settings.HEALTH_MAX_POOL_USAGE
+
+def threadpool_stats() -> dict:
+    """Hilos del threadpool de Starlette/anyio (endpoints síncronos y run_in_threadpool)."""
+    import anyio.to_thread
+
+    limitador = anyio.to_thread.current_default_thread_limiter()
+    return {"en_uso": limitador.borrowed_tokens, "maximo": int(limitador.total_tokens)}
+
+def _build_probe() -> DatabaseProbe:
+    from app.db.session import engine
+    return DatabaseProbe(engine, settings.HEALTH_DB_PING_TTL_SECONDS, settings.HEALTH_DB_PING_TIMEOUT_SECONDS)
+
+_probe: Optional[DatabaseProbe] = None
+
+def database_probe() -> DatabaseProbe:
+    global _probe
+    if _probe is None:
+        _probe = _build_probe()
+    return _probe
+
+async def readiness() -> tuple:
+    """(listo, detalle) para /health/ready."""
+    from . import startup
+
+    if not startup.state.ready:
+        return False, {"estado": "iniciando", "arranque": startup.state.report()}
+    probe = database_probe()
+    db = await probe.check()
+    pool = pool_stats(probe.engine)
+    listo = db["ok"] and not pool_saturated(pool)
+    if listo:
+        estado = "listo"
+    elif not db["ok"]:
+        estado = "sin_base_de_datos"
+    else:
+        estado = "pool_saturado"
+    return listo, {"estado": estado, "base_de_datos": db, "pool": pool}
+
+async def status() -> dict:
+    """Detalle interno para /health/status."""
+    from . import previews, startup
+    from .encoding import encoded_cache
+    from .events import broker
+    from .response_cache import response_cache
+    from app.crud.product import summary_cache
+    from app.db import resilience
+
+    listo, detalle = await readiness()
+    probe = database_probe()
+    return {
+        **detalle,
+        "listo": listo,
+        "arranque": startup.state.report(),
+        "pool": pool_stats(probe.engine),
+        "circuito_bd": {"estado": resilience.breaker.state, "fallas_seguidas": resilience.breaker.failures},
+        "caches": {
+            "respuestas": response_cache.stats(),
+            "resumen": summary_cache.stats(),
+            "codificacion": encoded_cache.stats(),
+        },
+        "ejecutores": {"threadpool": threadpool_stats(), "miniaturas": previews.stats()},
+        "eventos": {"suscriptores": broker.count()},
+    }
@@ -0,0 +1,220 @@
+"""
+Middleware de idempotencia para POST (cabecera Idempotency-Key).
+
+- La primera petición con una clave reserva una fila en clavesidempotencia,
+  se ejecuta normalmente y su respuesta (estado, cabeceras y cuerpo) queda
+  guardada durante IDEMPOTENCY_TTL_HOURS.
+- Los reintentos con la misma clave reciben esa respuesta sin volver a
+  ejecutar el endpoint (cabecera Idempotent-Replayed: true).
+- Un duplicado que llega mientras la original sigue en curso espera su
+  resultado: en el mismo worker con un future, entre workers consultando
+  la reserva, hasta IDEMPOTENCY_WAIT_SECONDS (luego 409).
+- La misma clave con otro cuerpo devuelve 422. Solo se guardan las
+  respuestas 2xx y los 4xx que no cambian al reintentar (400, 404, 422); el
+  resto (5xx, 401, 409 "carga incompleta", 429...) libera la clave y el
+  cliente puede reintentar con ella.
+
+Las claves se separan por usuario (según el token) y por ruta. No aplica a
+/auth/*: sus respuestas contienen tokens que no deben guardarse.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from typing import Dict, Optional, Tuple
+
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from .config import settings
+from .metrics import counter
+from .security import verify_token
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_REQUESTS = counter(
+    "idempotency_requests_total", "Peticiones POST con Idempotency-Key", ["result"]
+)
+
+_EXCLUDED_PREFIXES = ("/api/v1/auth/",)
+_REPLAYED_HEADERS = {b"content-type", b"location"}
+# Errores del cliente que se repetirían igual al reintentar: se guardan como un 2xx
+_STORED_CLIENT_ERRORS = {400, 404, 422}
+_POLL_SECONDS = 0.1
+
+async def _send_error(send: Send, scope: Scope, status: int, message: str, extra_headers: list = ()):
+    """Mismo formato que los manejadores de error_handlers.py."""
+    content = json.dumps({"error": f"Error {status}", "message": message, "path": scope["path"]}).encode()
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(content)).encode()), *extra_headers],
+    })
+    await send({"type": "http.response.body", "body": content})
+
+def _scope_owner(headers: Headers) -> str:
+    """Usuario del token (sin consultar la BD) o "anon" para el registro."""
+    authorization = headers.get("authorization", "")
+    if authorization.lower().startswith("bearer "):
+        payload = verify_token(authorization[7:])
+        if payload and payload.get("user_id") is not None:
+            return f"u{payload['user_id']}"
+    return "anon"
+
+class IdempotencyMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        # Peticiones originales en curso en este worker: (alcance, clave) -> future
+        self._in_flight: Dict[Tuple[str, str], asyncio.Future] = {}
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or scope["method"] != "POST" or scope["path"].startswith(_EXCLUDED_PREFIXES):
+            await self.app(scope, receive, send)
+            return
+        headers = Headers(scope=scope)
+        clave = headers.get("idempotency-key")
+        if clave is None:
+            await self.app(scope, receive, send)
+            return
+        if not 1 <= len(clave) <= 255:
+            await _send_error(send, scope, 400, "Idempotency-Key debe tener entre 1 y 255 caracteres")
+            return
+
+        # Leer el cuerpo completo (POST pequeños) para calcular su huella
+        chunks = []
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body", False):
+                break
+        body = b"".join(chunks)
+        huella = hashlib.sha256(body).hexdigest()
+        alcance = f"{_scope_owner(headers)} POST {scope['path']}"
+        key = (alcance, clave)
+
+        while True:
+            pending = self._in_flight.get(key)
+            if pending is None:
+                break
+            # Duplicado concurrente en este worker: esperar a la petición original
+            IDEMPOTENCY_REQUESTS.inc(result="waited")
+            try:
+                record = await asyncio.wait_for(asyncio.shield(pending), settings.IDEMPOTENCY_WAIT_SECONDS)
+            except asyncio.TimeoutError:
+                await self._send_in_progress(scope, send)
+                return
+            except Exception:
+                record = None
+            if record is not None:
+                await self._replay(scope, record, huella, send)
+                return
+            # La original no dejó respuesta guardada (5xx, 409, 429...): esta se ejecuta
+
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        try:
+            record = await self._execute(scope, receive, send, alcance, clave, huella, body)
+            future.set_result(record)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # Evita el aviso "exception was never retrieved"
+            raise
+        finally:
+            self._in_flight.pop(key, None)
+
+    async def _execute(self, scope, receive, send, alcance, clave, huella, body) -> Optional[dict]:
+        """Reserva la clave y ejecuta el endpoint, o repite la respuesta guardada."""
+        deadline = time.monotonic() + settings.IDEMPOTENCY_WAIT_SECONDS
+        existing = await run_in_threadpool(_crud().reserve_idempotency_key, alcance, clave, huella)
+        while existing is not None and existing["estado"] is None:
+            # En curso en otro worker
+            if time.monotonic() > deadline:
+                await self._send_in_progress(scope, send)
+                return None
+            await asyncio.sleep(_POLL_SECONDS)
+            existing = await run_in_threadpool(_crud().reserve_idempotency_key, alcance, clave, huella)
+        if existing is not None:
+            await self._replay(scope, existing, huella, send)
+            return existing
+
+        IDEMPOTENCY_REQUESTS.inc(result="new")
+        body_sent = False
+
+        async def replay_receive():
+            nonlocal body_sent
+            if not body_sent:
+                body_sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        status = 500
+        response_headers = []
+        response_chunks = []
+        response_size = 0
+        max_size = settings.IDEMPOTENCY_MAX_BODY_KB * 1024
+
+        async def capture_send(message):
+            nonlocal status, response_headers, response_size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                response_headers = [
+                    [k.decode("latin-1"), v.decode("latin-1")]
+                    for k, v in message.get("headers", []) if k.lower() in _REPLAYED_HEADERS
+                ]
+            elif message["type"] == "http.response.body":
+                response_size += len(message.get("body", b""))
+                if response_size <= max_size:
+                    response_chunks.append(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, replay_receive, capture_send)
+        except BaseException:
+            await run_in_threadpool(_crud().release_idempotency_key, alcance, clave)
+            raise
+
+        guardable = 200 <= status < 300 or status in _STORED_CLIENT_ERRORS
+        if not guardable or response_size > max_size:
+            await run_in_threadpool(_crud().release_idempotency_key, alcance, clave)
+            return None
+        record = {"huella": huella, "estado": status, "cabeceras": response_headers, "cuerpo": b"".join(response_chunks)}
+        try:
+            await run_in_threadpool(
+                _crud().complete_idempotency_key, alcance, clave, status, response_headers, record["cuerpo"]
+            )
+        except Exception as e:
+            # La respuesta ya se envió; sin guardarla, un reintento se ejecutaría de nuevo
+            logger.error(f" No se pudo guardar la respuesta idempotente ({alcance}): {str(e)}")
+        return record
+
+    async def _replay(self, scope: Scope, record: dict, huella: str, send: Send):
+        if record["huella"] != huella:
+            IDEMPOTENCY_REQUESTS.inc(result="mismatch")
+            await _send_error(send, scope, 422, "Idempotency-Key ya usada con otro cuerpo de petición")
+            return
+        IDEMPOTENCY_REQUESTS.inc(result="replayed")
+        cuerpo = record["cuerpo"]
+        headers = [(k.encode("latin-1"), v.encode("latin-1")) for k, v in record["cabeceras"]]
+        headers += [(b"content-length", str(len(cuerpo)).encode()), (b"idempotent-replayed", b"true")]
+        await send({"type": "http.response.start", "status": record["estado"], "headers": headers})
+        await send({"type": "http.response.body", "body": cuerpo})
+
+    async def _send_in_progress(self, scope: Scope, send: Send):
+        IDEMPOTENCY_REQUESTS.inc(result="conflict")
+        await _send_error(
+            send, scope, 409, "Hay una petición con la misma Idempotency-Key en curso, reintente",
+            [(b"retry-after", b"1")]
+        )
+
+def _crud():
+    # Import diferido: app.crud depende de la sesión de BD, este módulo solo de core
+    from app.crud import idempotency
+    return idempotency
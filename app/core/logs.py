@@ -0,0 +1,160 @@
+"""
+Logging de la app: una línea JSON por registro, sin escribir desde el event loop.
+
+- Los loggers solo encolan (QueueHandler); un hilo (QueueListener) da formato
+  y escribe en stdout. Una escritura lenta (pipe lleno, colector de logs
+  atrasado) ya no frena las peticiones.
+- request_id: el X-Request-ID del cliente/proxy o uno nuevo. Va en cada línea
+  escrita durante la petición (también desde el threadpool, vía contextvars)
+  y en la cabecera de la respuesta.
+- Muestreo: LOG_SAMPLE_RATES por nivel ("INFO:0.1") y LOG_ROUTE_SAMPLE_RATES
+  por prefijo de ruta ("/health:0", solo bajo WARNING). La decisión sale del
+  request_id: las líneas de una misma petición se guardan o descartan juntas.
+  El hash lleva una clave aleatoria por proceso: un cliente no puede elegir
+  un X-Request-ID que esquive el muestreo (o que siempre quede registrado).
+- LOG_FORMAT="text" da el formato clásico de una línea para desarrollo.
+"""
+
+import atexit
+import contextvars
+import hashlib
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+from .config import settings
+
+request_id_var: contextvars.ContextVar = contextvars.ContextVar("request_id", default=None)
+route_var: contextvars.ContextVar = contextvars.ContextVar("route", default=None)
+
+# Clave del hash de muestreo, distinta en cada proceso
+_SAMPLING_KEY = os.urandom(16)
+
+# Campos que el middleware pasa con extra={...} y se copian al JSON
+_EXTRA_FIELDS = ("method", "path", "status", "duration_ms", "client")
+
+def parse_rates(value: str) -> List[Tuple[str, float]]:
+    """"INFO:0.1,DEBUG:0" -> [("INFO", 0.1), ("DEBUG", 0.0)]."""
+    rates = []
+    for parte in value.split(","):
+        if parte.strip():
+            clave, fraccion = parte.rsplit(":", 1)
+            rates.append((clave.strip(), float(fraccion)))
+    return rates
+
+class ContextFilter(logging.Filter):
+    """Agrega request_id y ruta de la petición en curso a cada registro."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get()
+        record.route = route_var.get()
+        return True
+
+def _sample_point(request_id: str) -> float:
+    """Punto en [0, 1) para el request_id, impredecible sin la clave del proceso."""
+    digest = hashlib.blake2b(request_id.encode(), key=_SAMPLING_KEY, digest_size=8).digest()
+    return int.from_bytes(digest, "big") / 2 ** 64
+
+class SamplingFilter(logging.Filter):
+    """Deja pasar una fracción de los registros según nivel y ruta."""
+
+    def __init__(self, level_rates: Dict[str, float], route_rates: List[Tuple[str, float]]):
+        super().__init__()
+        self.level_rates = {nivel.upper(): fraccion for nivel, fraccion in level_rates.items()}
+        self.route_rates = route_rates
+
+    def rate(self, record: logging.LogRecord) -> float:
+        fraccion = self.level_rates.get(record.levelname, 1.0)
+        ruta = getattr(record, "route", None)
+        if ruta is not None and record.levelno < logging.WARNING:
+            for prefijo, fraccion_ruta in self.route_rates:
+                if ruta.startswith(prefijo):
+                    fraccion = min(fraccion, fraccion_ruta)
+                    break
+        return fraccion
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        fraccion = self.rate(record)
+        if fraccion >= 1:
+            return True
+        if fraccion <= 0:
+            return False
+        request_id = getattr(record, "request_id", None)
+        # Mismo request_id -> misma decisión para todas sus líneas
+        muestra = _sample_point(request_id) if request_id else random.random()
+        return muestra < fraccion
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage().strip(),
+        }
+        request_id = getattr(record, "request_id", None)
+        if request_id:
+            data["request_id"] = request_id
+        for campo in _EXTRA_FIELDS:
+            valor = getattr(record, campo, None)
+            if valor is not None:
+                data[campo] = valor
+        if record.exc_info:
+            data["exc"] = self.formatException(record.exc_info)
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Solo se resuelven los argumentos (pueden cambiar después); formato y traceback
+        # se arman en el hilo del listener
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+def setup_logging(stream=None):
+    """Instala el pipeline en el logger raíz (una sola vez por proceso)."""
+    global _listener
+    root = logging.getLogger()
+    if getattr(root, "_misboletas_logs", False):
+        return
+    salida = logging.StreamHandler(stream or sys.stdout)
+    if settings.LOG_FORMAT == "json":
+        salida.setFormatter(JsonFormatter())
+    else:
+        salida.setFormatter(logging.Formatter("%(levelname)s:%(name)s:%(message)s"))
+
+    if settings.LOG_ASYNC:
+        cola = queue.SimpleQueue()
+        handler = _QueueHandler(cola)
+        _listener = logging.handlers.QueueListener(cola, salida)
+        _listener.start()
+        atexit.register(stop_logging)
+    else:
+        handler = salida
+    handler.addFilter(ContextFilter())
+    handler.addFilter(SamplingFilter(
+        dict(parse_rates(settings.LOG_SAMPLE_RATES)), parse_rates(settings.LOG_ROUTE_SAMPLE_RATES)
+    ))
+    root.handlers = [handler]
+    root.setLevel(settings.LOG_LEVEL.upper())
+    root._misboletas_logs = True
+
+def flush_logs():
+    """Espera a que el hilo escriba lo encolado (el pipeline sigue activo)."""
+    if _listener is not None:
+        _listener.stop()
+        _listener.start()
+
+def stop_logging():
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
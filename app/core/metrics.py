@@ -0,0 +1,87 @@
+"""
+Métricas de la aplicación en formato de texto Prometheus.
+
+Registro mínimo en memoria (por worker) de contadores y gauges con etiquetas.
+Se exponen en GET /metrics.
+
+Uso:
+    from app.core.metrics import counter
+    LOGIN_DECISIONS = counter("login_rate_limit_total", "Decisiones del limitador", ["scope", "decision"])
+    LOGIN_DECISIONS.inc(scope="ip", decision="allowed")
+"""
+
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+
+_lock = threading.Lock()
+_metrics: Dict[str, "_Metric"] = {}
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: List[str]):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(label, "")) for label in self.labelnames)
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def samples(self) -> List[Tuple[Tuple[str, ...], float]]:
+        with _lock:
+            return list(self._values.items())
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with _lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: List[str], func: Optional[Callable[[], float]] = None):
+        super().__init__(name, documentation, labelnames)
+        self._func = func   # Gauge calculado al momento de exportar (ej: tamaño de una caché)
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with _lock:
+            self._values[key] = value
+
+    def samples(self):
+        if self._func is not None:
+            return [((), float(self._func()))]
+        return super().samples()
+
+def _register(metric_cls, name: str, documentation: str, labelnames: List[str], **kwargs):
+    with _lock:
+        if name not in _metrics:
+            _metrics[name] = metric_cls(name, documentation, labelnames, **kwargs)
+        return _metrics[name]
+
+def counter(name: str, documentation: str, labelnames: List[str] = ()) -> Counter:
+    return _register(Counter, name, documentation, list(labelnames))
+
+def gauge(name: str, documentation: str, labelnames: List[str] = (), func: Optional[Callable[[], float]] = None) -> Gauge:
+    return _register(Gauge, name, documentation, list(labelnames), func=func)
+
+def render_metrics() -> str:
+    """Todas las métricas en formato de exposición de Prometheus."""
+    lines = []
+    for metric in list(_metrics.values()):
+        lines.append(f"# HELP {metric.name} {metric.documentation}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        for key, value in metric.samples():
+            if metric.labelnames and key:
+                labels = ",".join(f'{n}="{v}"' for n, v in zip(metric.labelnames, key))
+                lines.append(f"{metric.name}{{{labels}}} {value}")
+            else:
+                lines.append(f"{metric.name} {value}")
+    return "\n".join(lines) + "\n"
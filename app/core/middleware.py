@@ -3,8 +3,9 @@ Middleware para la aplicación MisBoletas.
 
 Este archivo configura:
 1. CORS - Permite que el frontend React Native se conecte
-2. Logging - Registra todas las requests para debugging
+2. Logging - Una línea por request con su X-Request-ID (app/core/logs.py)
 3. Hosts confiables - Solo permite ciertos hosts por seguridad
+4. Compresión (gzip/brotli) y MessagePack - Menos bytes hacia la app móvil
 """
 
 from fastapi import FastAPI, Request
@@ -12,10 +13,12 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
 import time
 import logging
+import uuid
 from typing import Callable
 
-# Configurar logging básico
-logging.basicConfig(level=logging.INFO)
+from app.core import logs
+
+# El pipeline de logs (cola, JSON, muestreo) lo instala logs.setup_logging() en main.py
 logger = logging.getLogger(__name__)
 
 def add_cors_middleware(app: FastAPI):
@@ -27,47 +30,57 @@ def add_cors_middleware(app: FastAPI):
         allow_origins=["*"],           # Cambiar en producción
         allow_credentials=True,         # Permite cookies/auth
         allow_methods=["GET", "POST", "PUT", "DELETE"],  # Métodos HTTP permitidos
-        allow_headers=["*"],           # Headers permitidos
+        allow_headers=["*"],           # Headers permitidos (incluye Idempotency-Key)
+        expose_headers=["Upload-Offset", "Idempotent-Replayed", "X-Request-ID"],  # Cargas / repetidas / correlación
     )
     logger.info(" CORS configurado - Frontend puede conectarse")
 
 def add_logging_middleware(app: FastAPI):
     """
-    Registra todas las requests para debugging.
+    Registra una línea por request (al terminar) con su X-Request-ID.
     """
     
     @app.middleware("http")
     async def log_requests(request: Request, call_next: Callable):
-        # Registrar cuando llega el request
-        start_time = time.time()
-        client_ip = request.client.host if request.client else "unknown"
-        
-        logger.info(f" {request.method} {request.url.path} desde {client_ip}")
+        # Se respeta el ID del cliente o del proxy para seguir la request entre servicios
+        request_id = request.headers.get("x-request-id", "")[:128] or uuid.uuid4().hex
+        id_token = logs.request_id_var.set(request_id)
+        route_token = logs.route_var.set(request.url.path)
+        start_time = time.perf_counter()
+        datos = {
+            "method": request.method,
+            "path": request.url.path,
+            "client": request.client.host if request.client else "unknown",
+        }
         
         try:
             # Procesar el request
             response = await call_next(request)
             
             # Calcular cuánto tiempo tardó
-            duration = time.time() - start_time
+            duration = time.perf_counter() - start_time
             
-            # Registrar la respuesta
+            # Registrar la respuesta (el formato y la escritura ocurren en el hilo de logs)
             logger.info(
-                f" {request.method} {request.url.path} → "
-                f" Status {response.status_code} en {duration:.3f}s"
+                "%s %s → %s en %.3fs", request.method, request.url.path, response.status_code, duration,
+                extra={**datos, "status": response.status_code, "duration_ms": round(duration * 1000, 2)},
             )
             
-            # Agregar tiempo al header (útil para debugging)
+            # Agregar tiempo e ID al header (útil para debugging)
             response.headers["X-Process-Time"] = f"{duration:.3f}"
+            response.headers["X-Request-ID"] = request_id
             return response
             
         except Exception as error:
-            duration = time.time() - start_time
+            duration = time.perf_counter() - start_time
             logger.error(
-                f"{request.method} {request.url.path} → "
-                f"ERROR: {str(error)} en {duration:.3f}s"
+                "%s %s → ERROR: %s en %.3fs", request.method, request.url.path, error, duration,
+                extra={**datos, "duration_ms": round(duration * 1000, 2)},
             )
             raise  # Re-lanzar el error
+        finally:
+            logs.route_var.reset(route_token)
+            logs.request_id_var.reset(id_token)
 
 def add_security_middleware(app: FastAPI):
     """
@@ -83,12 +96,76 @@ def add_security_middleware(app: FastAPI):
     )
     logger.info(" Hosts de seguridad configurados")
 
+def add_idempotency_middleware(app: FastAPI):
+    """
+    Repite la respuesta guardada cuando un POST llega de nuevo con la misma Idempotency-Key.
+    """
+    from app.core.idempotency import IdempotencyMiddleware
+    app.add_middleware(IdempotencyMiddleware)
+    logger.info(" Idempotency-Key habilitado para POST")
+
+def add_msgpack_middleware(app: FastAPI):
+    """
+    Acepta y entrega MessagePack en vez de JSON cuando el cliente lo pide.
+    """
+    from app.core import encoding
+    from app.core.config import settings
+    if not settings.MSGPACK_ENABLED:
+        return
+    if encoding.msgpack is None:
+        logger.warning(" MSGPACK_ENABLED activo pero falta el paquete 'msgpack', se responde solo JSON")
+        return
+    app.add_middleware(encoding.MsgPackMiddleware)
+    logger.info(" MessagePack habilitado (application/msgpack)")
+
+def add_compression_middleware(app: FastAPI):
+    """
+    Comprime las respuestas grandes (brotli o gzip según Accept-Encoding).
+    """
+    from app.core import encoding
+    from app.core.config import settings
+    if settings.COMPRESSION_MIN_BYTES <= 0:
+        return
+    app.add_middleware(
+        encoding.CompressionMiddleware,
+        minimum_size=settings.COMPRESSION_MIN_BYTES,
+        gzip_level=settings.COMPRESSION_GZIP_LEVEL,
+        brotli_quality=settings.COMPRESSION_BROTLI_QUALITY,
+    )
+    logger.info(" Compresión configurada: %s", "br, gzip" if encoding.brotli is not None else "gzip")
+
+def add_startup_gate_middleware(app: FastAPI):
+    """
+    Rechaza con 503 las peticiones de la API mientras el worker arranca.
+    """
+    from app.core.startup import StartupGateMiddleware
+    app.add_middleware(StartupGateMiddleware)
+
+def add_drain_middleware(app: FastAPI):
+    """
+    Cuenta las peticiones en curso para esperarlas al apagar el worker.
+    """
+    from app.core.shutdown import DrainMiddleware
+    app.add_middleware(DrainMiddleware)
+
 def setup_middleware(app: FastAPI):
     """
     Función principal que configura TODO el middleware.
     """
     logger.info(" Configuramdo middleware...")
 
+    # 0. Idempotencia (la más interna, justo antes de los endpoints)
+    add_idempotency_middleware(app)
+
+    # 0.1 MessagePack (idempotencia guarda y compara siempre JSON)
+    add_msgpack_middleware(app)
+
+    # 0.2 Compresión (comprime tanto JSON como MessagePack)
+    add_compression_middleware(app)
+
+    # 0.3 Arranque (503 hasta estar listo; el rechazo igual pasa por logging y CORS)
+    add_startup_gate_middleware(app)
+
     # 1. Logging (se ejecuta al final, después de todo)
     add_logging_middleware(app)
     
@@ -97,6 +174,9 @@ def setup_middleware(app: FastAPI):
     
     # 3. Security (se ejecuta primero, antes que todo)
     add_security_middleware(app)
+
+    # 4. Peticiones en curso (envuelve todo: el apagado espera incluso a las rechazadas)
+    add_drain_middleware(app)
     
     logger.info(" Middleware configurado exitosamente")
     logger.info(" El frontend ya puede conectarse al backend")
\ No newline at end of file
@@ -0,0 +1,244 @@
+"""
+Generación de miniaturas y vistas previas de documentos.
+
+Después de finalizar una carga, el documento se envía a un ProcessPoolExecutor
+que genera miniaturas JPEG (imágenes) o de la primera página (PDF) en los
+tamaños de PREVIEW_SIZES, fuera del ciclo de la petición. Las miniaturas se
+guardan junto al original como <sha256>_<tamaño>.jpg, así que un mismo archivo
+subido dos veces no se procesa dos veces.
+
+La cola está acotada por PREVIEW_MAX_PENDING: si está llena el documento queda
+pendiente (hashcontenido NULL) y la tarea periódica lo reintenta más tarde.
+Si la generación falla el documento queda procesado sin miniaturas (con su
+hash si el archivo se puede leer): un archivo que no se puede procesar no se
+reintenta para siempre.
+"""
+
+import hashlib
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import List, Optional, Tuple
+
+from .config import settings
+from . import storage
+
+logger = logging.getLogger(__name__)
+
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_lock = threading.Lock()
+_slots = threading.BoundedSemaphore(settings.PREVIEW_MAX_PENDING)
+_in_flight: set = set()   # documentos encolados, para no duplicarlos en el reintento
+# Un hilo guarda los resultados en orden, fuera del hilo de gestión del pool
+_results = ThreadPoolExecutor(max_workers=1, thread_name_prefix="miniaturas-resultados")
+
+_IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".webp", ".heic", ".bmp", ".gif", ".tif", ".tiff"}
+
+# ===== TRABAJO EJECUTADO EN LOS PROCESOS HIJOS =====
+
+def _file_sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for bloque in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(bloque)
+    return h.hexdigest()
+
+def _open_first_page(path: str):
+    """Abre la imagen (o la primera página del PDF) como imagen de Pillow, o None."""
+    from PIL import Image
+
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".pdf":
+        try:
+            import fitz  # PyMuPDF, opcional
+        except ImportError:
+            return None
+        with fitz.open(path) as pdf:
+            if pdf.page_count == 0:
+                return None
+            pixmap = pdf[0].get_pixmap(dpi=72)
+            return Image.frombytes("RGB", (pixmap.width, pixmap.height), pixmap.samples)
+
+    if extension not in _IMAGE_EXTENSIONS:
+        return None
+    image = Image.open(path)
+    # Decodifica JPEG directamente a menor resolución: menos CPU y memoria por trabajo
+    mayor = max(settings.preview_sizes or [0])
+    image.draft("RGB", (mayor, mayor))
+    return image
+
+def generate_previews(path: str, sizes: List[int]) -> Tuple[str, List[int]]:
+    """
+    Calcula el hash del archivo y genera sus miniaturas.
+    Devuelve (sha256, tamaños generados). Se ejecuta en un proceso del pool.
+    """
+    content_hash = _file_sha256(path)
+    try:
+        from PIL import ImageOps
+        image = _open_first_page(path)
+    except ImportError:
+        return content_hash, []
+    if image is None:
+        return content_hash, []
+
+    generados = []
+    with image:
+        image = ImageOps.exif_transpose(image).convert("RGB")
+        for size in sorted(sizes, reverse=True):
+            destino = os.path.join(os.path.dirname(path), f"{content_hash}_{size}.jpg")
+            if not os.path.exists(destino):
+                # Se reduce en cascada desde el tamaño mayor ya calculado
+                image.thumbnail((size, size))
+                image.save(destino, "JPEG", quality=80, optimize=True)
+            generados.append(size)
+    return content_hash, sorted(generados)
+
+# ===== PROCESO PRINCIPAL =====
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            # spawn: no se hereda el estado (hilos, conexiones) del servidor
+            _executor = ProcessPoolExecutor(
+                max_workers=settings.PREVIEW_WORKERS,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return _executor
+
+def _discard_executor(only: Optional[ProcessPoolExecutor] = None):
+    """Detiene el pool actual (o solo si sigue siendo `only`, para no tumbar uno ya reemplazado)."""
+    global _executor
+    with _executor_lock:
+        if _executor is not None and (only is None or _executor is only):
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
+
+def _hash_or_empty(documento_id: int) -> str:
+    """Hash del original para un documento cuya generación falló ('' si no se puede leer)."""
+    from app.db.session import SessionLocal
+    from app.models.documento import Documento
+
+    db = SessionLocal()
+    try:
+        ruta = db.query(Documento.rutaarchivo).filter(Documento.documentoid == documento_id).scalar()
+        return _file_sha256(storage.absolute_path(ruta)) if ruta else ""
+    except Exception:
+        return ""
+    finally:
+        db.close()
+
+def _on_done(documento_id: int, future: Future, executor: Optional[ProcessPoolExecutor] = None):
+    """
+    Callback del pool: corre en su hilo de gestión, que también recoge los
+    resultados de los demás trabajos. Solo libera el cupo y deja el guardado
+    (hash, BD, cachés, eventos) al hilo de resultados.
+    """
+    _in_flight.discard(documento_id)
+    _slots.release()
+    if future.cancelled():
+        return
+    try:
+        resultado = future.result()
+    except Exception as e:
+        logger.exception(f"Error generando miniaturas del documento {documento_id}")
+        if isinstance(e, BrokenProcessPool):
+            _discard_executor(executor)   # Un hijo murió (ej: archivo malicioso): los siguientes usan un pool nuevo
+        resultado = None
+    try:
+        _results.submit(_store_result, documento_id, resultado)
+    except RuntimeError:
+        # Intérprete cerrándose: el documento queda pendiente para el reintento
+        logger.warning(f" Miniaturas del documento {documento_id} no guardadas")
+
+def _store_result(documento_id: int, resultado: Optional[Tuple[str, List[int]]]):
+    """Guarda hash y miniaturas (None si la generación falló) y avisa al propietario."""
+    content_hash, sizes = resultado if resultado is not None else (_hash_or_empty(documento_id), [])
+
+    from app.db.session import SessionLocal
+    from app.models.documento import Documento
+    from app.models.producto import Producto
+    from .response_cache import response_cache
+    from . import events
+
+    db = SessionLocal()
+    try:
+        db.query(Documento).filter(Documento.documentoid == documento_id).update(
+            {"hashcontenido": content_hash, "miniaturas": ",".join(str(s) for s in sizes)}
+        )
+        db.commit()
+        # Las miniaturas aparecen en las respuestas con include=documentos
+        propietario = (
+            db.query(Producto.usuarioid)
+            .join(Documento, Documento.productoid == Producto.productoid)
+            .filter(Documento.documentoid == documento_id)
+            .scalar()
+        )
+        if propietario is not None:
+            response_cache.invalidate_user(propietario)
+            events.publish(propietario, "documento", "actualizado", documento_id)
+    except Exception:
+        db.rollback()
+        logger.exception(f"Error guardando miniaturas del documento {documento_id}")
+    finally:
+        db.close()
+
+def schedule_previews(documento_id: int, ruta_relativa: str) -> bool:
+    """
+    Encola la generación de miniaturas sin bloquear la petición.
+    Devuelve False si la cola está llena (se reintentará en segundo plano).
+    """
+    if documento_id in _in_flight:
+        return True
+    if not _slots.acquire(blocking=False):
+        logger.warning(f" Cola de miniaturas llena, documento {documento_id} queda pendiente")
+        return False
+    _in_flight.add(documento_id)
+    try:
+        executor = _get_executor()
+        future = executor.submit(
+            generate_previews, storage.absolute_path(ruta_relativa), settings.preview_sizes
+        )
+    except Exception:
+        _in_flight.discard(documento_id)
+        _slots.release()
+        logger.exception(f"No se pudo encolar el documento {documento_id}")
+        return False
+    future.add_done_callback(lambda f: _on_done(documento_id, f, executor))
+    return True
+
+def retry_pending_previews() -> int:
+    """Encola documentos sin procesar mientras haya espacio en la cola."""
+    from app.db.session import SessionLocal
+    from app.models.documento import Documento
+
+    db = SessionLocal()
+    try:
+        pendientes = (
+            db.query(Documento.documentoid, Documento.rutaarchivo)
+            .filter(Documento.hashcontenido.is_(None), Documento.rutaarchivo.isnot(None))
+            .limit(settings.PREVIEW_MAX_PENDING)
+            .all()
+        )
+    finally:
+        db.close()
+
+    encolados = 0
+    for documento_id, ruta in pendientes:
+        if not os.path.exists(storage.absolute_path(ruta)):
+            continue
+        if not schedule_previews(documento_id, ruta):
+            break
+        encolados += 1
+    return encolados
+
+def stats() -> dict:
+    return {"procesos": settings.PREVIEW_WORKERS, "pendientes": len(_in_flight),
+            "max_pendientes": settings.PREVIEW_MAX_PENDING, "iniciado": _executor is not None}
+
+def shutdown_previews():
+    """Detiene el pool sin esperar trabajos pendientes (quedan para el reintento)."""
+    _discard_executor()
@@ -0,0 +1,143 @@
+"""
+Limitador de intentos de login (token bucket).
+
+Cada IP y cada email tienen un "balde" con LOGIN_RATE_*_CAPACITY fichas que
+se recargan a LOGIN_RATE_*_PER_MINUTE. Cada intento consume una ficha; sin
+fichas se responde 429 con Retry-After antes de tocar la BD o bcrypt.
+
+Por defecto los baldes viven en memoria de cada worker (acotados con LRU).
+Si se define RATE_LIMIT_REDIS_URL (requiere el paquete `redis`) se comparten
+entre workers; si Redis falla se vuelve al limitador en memoria.
+"""
+
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Optional, Tuple
+
+from fastapi import HTTPException
+
+from .config import settings
+from .metrics import counter
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMIT_DECISIONS = counter(
+    "login_rate_limit_decisions_total",
+    "Decisiones del limitador de login",
+    ["scope", "decision"]
+)
+
+class InMemoryRateLimiter:
+    """Token bucket en memoria con un máximo de claves (LRU)."""
+
+    def __init__(self, capacity: float, per_minute: float, max_keys: int, clock: Callable[[], float] = time.monotonic):
+        self.capacity = float(capacity)
+        self.rate = per_minute / 60.0           # fichas por segundo
+        self.max_keys = max_keys
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()   # clave -> (fichas, instante)
+
+    def hit(self, key: str) -> Tuple[bool, float]:
+        """Consume una ficha. Devuelve (permitido, segundos hasta la próxima ficha)."""
+        now = self.clock()
+        with self._lock:
+            tokens, last = self._buckets.get(key, (self.capacity, now))
+            tokens = min(self.capacity, tokens + (now - last) * self.rate)
+            if tokens >= 1:
+                allowed, retry_after = True, 0.0
+                tokens -= 1
+            else:
+                allowed, retry_after = False, (1 - tokens) / self.rate
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return allowed, retry_after
+
+# Script atómico: el mismo algoritmo ejecutado dentro de Redis
+_REDIS_TOKEN_BUCKET = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local data = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(data[1]) or capacity
+local ts = tonumber(data[2]) or now
+tokens = math.min(capacity, tokens + (now - ts) * rate)
+local allowed = 0
+local retry = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+else
+    retry = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+return {allowed, tostring(retry)}
+"""
+
+class RedisRateLimiter:
+    """Token bucket compartido entre workers; si Redis falla usa `fallback`."""
+
+    def __init__(self, client, prefix: str, capacity: float, per_minute: float, fallback: InMemoryRateLimiter):
+        self.client = client
+        self.prefix = prefix
+        self.capacity = float(capacity)
+        self.rate = per_minute / 60.0
+        self.fallback = fallback
+        self._script = client.register_script(_REDIS_TOKEN_BUCKET)
+
+    def hit(self, key: str) -> Tuple[bool, float]:
+        try:
+            allowed, retry = self._script(
+                keys=[f"{self.prefix}:{key}"],
+                args=[self.capacity, self.rate, time.time()]
+            )
+            return bool(int(allowed)), float(retry)
+        except Exception as e:
+            logger.warning(f" Redis no disponible para el limitador, usando memoria: {str(e)}")
+            return self.fallback.hit(key)
+
+def _build_limiter(scope: str, capacity: float, per_minute: float):
+    local = InMemoryRateLimiter(capacity, per_minute, settings.LOGIN_RATE_MAX_KEYS)
+    if not settings.RATE_LIMIT_REDIS_URL:
+        return local
+    try:
+        import redis
+    except ImportError:
+        logger.error(" RATE_LIMIT_REDIS_URL definido pero falta el paquete 'redis', se usa memoria")
+        return local
+    client = redis.Redis.from_url(settings.RATE_LIMIT_REDIS_URL, socket_timeout=0.05)
+    return RedisRateLimiter(client, f"misboletas:login:{scope}", capacity, per_minute, local)
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+def _get_limiter(scope: str):
+    with _limiters_lock:
+        if scope not in _limiters:
+            if scope == "ip":
+                _limiters[scope] = _build_limiter(scope, settings.LOGIN_RATE_IP_CAPACITY, settings.LOGIN_RATE_IP_PER_MINUTE)
+            else:
+                _limiters[scope] = _build_limiter(scope, settings.LOGIN_RATE_EMAIL_CAPACITY, settings.LOGIN_RATE_EMAIL_PER_MINUTE)
+        return _limiters[scope]
+
+def check_login_rate(client_ip: Optional[str], email: str):
+    """
+    Lanza 429 si la IP o el email superaron su límite de intentos.
+    Se llama antes de cualquier consulta o verificación de contraseña.
+    """
+    checks = (("ip", client_ip or "unknown"), ("email", email.strip().lower()))
+    for scope, key in checks:
+        allowed, retry_after = _get_limiter(scope).hit(key)
+        RATE_LIMIT_DECISIONS.inc(scope=scope, decision="allowed" if allowed else "rejected")
+        if not allowed:
+            raise HTTPException(
+                status_code=429,
+                detail="Demasiados intentos de inicio de sesión, intenta más tarde",
+                headers={"Retry-After": str(max(1, math.ceil(retry_after)))}
+            )
@@ -0,0 +1,243 @@
+"""
+Caché de respuestas por usuario (bytes JSON ya serializados).
+
+- Clave: (usuario, consulta), ej: (7, "list") o (7, "id:42").
+- Memoria: LRU limitado por BYTES (RESPONSE_CACHE_MAX_MB), no por entradas.
+- Invalidación: cada usuario tiene una generación; crear/editar/eliminar un
+  producto la incrementa y todas sus respuestas quedan obsoletas al instante.
+- Single-flight: si varias peticiones fallan la caché a la vez para la misma
+  clave, solo una consulta la BD y las demás esperan su resultado. El cálculo
+  corre en una tarea propia: si la petición que lo inició se cancela (cliente
+  desconectado), las que esperan igual reciben el resultado.
+- Compartida: si se define RESPONSE_CACHE_REDIS_URL (requiere `redis`) los
+  workers comparten datos y generaciones; si Redis falla se consulta la BD
+  directamente (nunca se sirve una respuesta que pudo quedar obsoleta).
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Set, Tuple
+
+from starlette.concurrency import run_in_threadpool
+
+from .config import settings
+from .metrics import counter, gauge
+
+logger = logging.getLogger(__name__)
+
+CACHE_REQUESTS = counter(
+    "response_cache_requests_total", "Lecturas de la caché de respuestas", ["result"]
+)
+
+# Bytes estimados por entrada además del contenido (clave, tupla, nodos del dict)
+_ENTRY_OVERHEAD = 200
+
+# Generaciones por usuario que se toleran antes de podar las de usuarios sin entradas
+_MIN_GENERATIONS = 1024
+
+class MemoryBackend:
+    """LRU en memoria del worker, limitado por bytes."""
+
+    blocking = False   # Solo un lock: se consulta desde el event loop
+
+    def __init__(self, max_bytes: int, ttl_seconds: float):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.size_bytes = 0
+        self._lock = threading.Lock()
+        self._data: "OrderedDict[Tuple[int, str], Tuple[float, int, bytes]]" = OrderedDict()
+        self._keys_by_user: Dict[int, Set[str]] = {}
+        # Generaciones de un reloj global; los usuarios sin entrada usan la base.
+        # Al podar se sube la base: un cálculo en curso de esos usuarios no se
+        # guarda (una falla de caché de más, nunca una respuesta obsoleta)
+        self._generations: Dict[int, int] = {}
+        self._clock = 0
+        self._base_generation = 0
+
+    def generation(self, user_id: int) -> int:
+        with self._lock:
+            return self._generations.get(user_id, self._base_generation)
+
+    def get(self, user_id: int, generation: int, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._data.get((user_id, key))
+            if entry is None:
+                return None
+            expires, entry_generation, value = entry
+            if entry_generation != generation or expires <= time.monotonic():
+                self._remove((user_id, key))
+                return None
+            self._data.move_to_end((user_id, key))
+            return value
+
+    def set(self, user_id: int, generation: int, key: str, value: bytes):
+        size = len(value) + _ENTRY_OVERHEAD
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            # Un cálculo que empezó antes de invalidar no se guarda
+            if self._generations.get(user_id, self._base_generation) != generation:
+                return
+            self._remove((user_id, key))
+            self._data[(user_id, key)] = (time.monotonic() + self.ttl_seconds, generation, value)
+            self._keys_by_user.setdefault(user_id, set()).add(key)
+            self.size_bytes += size
+            while self.size_bytes > self.max_bytes:
+                oldest = next(iter(self._data))
+                self._remove(oldest)
+
+    def invalidate(self, user_id: int):
+        with self._lock:
+            self._clock += 1
+            self._generations[user_id] = self._clock
+            for key in list(self._keys_by_user.get(user_id, ())):
+                self._remove((user_id, key))
+            if len(self._generations) > max(_MIN_GENERATIONS, 2 * len(self._keys_by_user)):
+                self._prune_generations()
+
+    def _prune_generations(self):
+        """Olvida las generaciones de usuarios sin respuestas guardadas."""
+        self._generations = {
+            user_id: self._generations.get(user_id, self._base_generation)
+            for user_id in self._keys_by_user
+        }
+        self._base_generation = self._clock
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"backend": "memoria", "entradas": len(self._data),
+                    "bytes": self.size_bytes, "max_bytes": self.max_bytes}
+
+    def _remove(self, data_key: Tuple[int, str]):
+        entry = self._data.pop(data_key, None)
+        if entry is None:
+            return
+        self.size_bytes -= len(entry[2]) + _ENTRY_OVERHEAD
+        user_id, key = data_key
+        keys = self._keys_by_user.get(user_id)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_user[user_id]
+
+class RedisBackend:
+    """Datos y generaciones en Redis, coherentes entre workers."""
+
+    blocking = True   # Cliente síncrono: las lecturas van al threadpool
+
+    def __init__(self, client, prefix: str, ttl_seconds: float):
+        self.client = client
+        self.prefix = prefix
+        self.ttl_seconds = ttl_seconds
+
+    def generation(self, user_id: int) -> int:
+        # La generación no expira: si volviera a 0 podría reaparecer una clave vieja
+        return int(self.client.get(f"{self.prefix}:gen:{user_id}") or 0)
+
+    def get(self, user_id: int, generation: int, key: str) -> Optional[bytes]:
+        return self.client.get(f"{self.prefix}:{user_id}:{generation}:{key}")
+
+    def set(self, user_id: int, generation: int, key: str, value: bytes):
+        self.client.set(f"{self.prefix}:{user_id}:{generation}:{key}", value, ex=int(self.ttl_seconds))
+
+    def stats(self) -> dict:
+        return {"backend": "redis"}   # Compartida: el tamaño no es de este worker
+
+    def invalidate(self, user_id: int):
+        self.client.incr(f"{self.prefix}:gen:{user_id}")
+
+class ResponseCache:
+    """Caché de respuestas con single-flight sobre un backend (memoria o Redis)."""
+
+    def __init__(self, backend):
+        self.backend = backend
+        self._in_flight: Dict[Tuple[int, int, str], asyncio.Future] = {}
+
+    async def get_or_compute(self, user_id: int, key: str, compute: Callable[[], bytes]) -> bytes:
+        """
+        Devuelve los bytes cacheados o ejecuta `compute` (en el threadpool) una
+        sola vez por clave aunque lleguen varias peticiones a la vez.
+        """
+        try:
+            if self.backend.blocking:
+                # Redis es una ida y vuelta de red (hasta el timeout si está degradado): fuera del event loop
+                generation, cached = await run_in_threadpool(self._lookup, user_id, key)
+            else:
+                generation, cached = self._lookup(user_id, key)
+        except Exception as e:
+            logger.warning(f" Caché de respuestas no disponible, se consulta la BD: {str(e)}")
+            CACHE_REQUESTS.inc(result="error")
+            return await run_in_threadpool(compute)
+
+        if cached is not None:
+            CACHE_REQUESTS.inc(result="hit")
+            return cached
+
+        flight_key = (user_id, generation, key)
+        pending = self._in_flight.get(flight_key)
+        if pending is not None:
+            CACHE_REQUESTS.inc(result="coalesced")
+            return await asyncio.shield(pending)
+
+        CACHE_REQUESTS.inc(result="miss")
+        task = asyncio.ensure_future(self._compute_and_store(flight_key, compute))
+        # Evita el aviso "exception was never retrieved" si nadie queda esperando
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        self._in_flight[flight_key] = task
+        # Todas las peticiones (también la que inició el cálculo) esperan protegidas:
+        # cancelar una no cancela el cálculo de las demás
+        return await asyncio.shield(task)
+
+    def _lookup(self, user_id: int, key: str) -> Tuple[int, Optional[bytes]]:
+        generation = self.backend.generation(user_id)
+        return generation, self.backend.get(user_id, generation, key)
+
+    def _compute_then_store(self, flight_key: Tuple[int, int, str], compute: Callable[[], bytes]) -> bytes:
+        """Corre en el threadpool: el guardado (Redis) tampoco bloquea el event loop."""
+        user_id, generation, key = flight_key
+        value = compute()
+        try:
+            self.backend.set(user_id, generation, key, value)
+        except Exception as e:
+            logger.warning(f" No se pudo guardar en la caché de respuestas: {str(e)}")
+        return value
+
+    async def _compute_and_store(self, flight_key: Tuple[int, int, str], compute: Callable[[], bytes]) -> bytes:
+        try:
+            # Si falla, las peticiones en espera reciben el mismo error (ej: 404)
+            return await run_in_threadpool(self._compute_then_store, flight_key, compute)
+        finally:
+            self._in_flight.pop(flight_key, None)
+
+    def stats(self) -> dict:
+        return {**self.backend.stats(), "calculando": len(self._in_flight)}
+
+    def invalidate_user(self, user_id: int):
+        try:
+            self.backend.invalidate(user_id)
+        except Exception as e:
+            # Sin invalidar, las lecturas podrían quedar obsoletas hasta el TTL
+            logger.error(f" No se pudo invalidar la caché del usuario {user_id}: {str(e)}")
+
+def _build_response_cache() -> ResponseCache:
+    ttl = settings.RESPONSE_CACHE_TTL_SECONDS
+    if settings.RESPONSE_CACHE_REDIS_URL:
+        try:
+            import redis
+        except ImportError:
+            logger.error(" RESPONSE_CACHE_REDIS_URL definido pero falta el paquete 'redis', se usa memoria")
+        else:
+            client = redis.Redis.from_url(settings.RESPONSE_CACHE_REDIS_URL, socket_timeout=0.05)
+            return ResponseCache(RedisBackend(client, "misboletas:respuestas", ttl))
+    return ResponseCache(MemoryBackend(settings.RESPONSE_CACHE_MAX_MB * 1024 * 1024, ttl))
+
+# Instancia global usada por los endpoints de productos
+response_cache = _build_response_cache()
+
+gauge(
+    "response_cache_bytes", "Bytes ocupados por la caché de respuestas en memoria",
+    func=lambda: getattr(response_cache.backend, "size_bytes", 0)
+)
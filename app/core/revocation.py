@@ -0,0 +1,80 @@
+"""
+Lista de revocación de access tokens en memoria.
+
+verify_token consulta esta lista en cada petición sin ir a la BD:
+- `jti` revocados (logout): diccionario jti -> expiración.
+- Cortes por usuario (cambio de contraseña, cuenta eliminada): se rechazan
+  los tokens del usuario con `iat` anterior al corte.
+
+Las entradas se descartan solas cuando los tokens afectados habrían expirado.
+Cada worker se sincroniza leyendo por deltas la tabla tokensrevocados
+(id > último id visto) cada REVOCATION_SYNC_SECONDS; el worker que revoca
+lo aplica de inmediato.
+"""
+
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, Optional, Tuple
+
+def _epoch(value: datetime) -> float:
+    # SQLite devuelve fechas sin zona horaria: se guardan en UTC
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+class RevocationList:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._jtis: Dict[str, float] = {}                          # jti -> expiración (epoch)
+        self._user_cutoffs: Dict[int, Tuple[float, float]] = {}    # usuario -> (corte, expiración)
+        self.last_id = 0
+
+    def is_revoked(self, payload: dict) -> bool:
+        """Chequeo O(1) con el payload ya decodificado del JWT."""
+        jti = payload.get("jti")
+        if jti is not None and jti in self._jtis:
+            return True
+        cutoff = self._user_cutoffs.get(payload.get("user_id"))
+        if cutoff is not None:
+            # iat tiene resolución de segundos; tokens sin iat (antiguos) se consideran revocados
+            return int(payload.get("iat", 0)) < int(cutoff[0])
+        return False
+
+    def revoke_jti(self, jti: str, expires_at: float):
+        with self._lock:
+            self._jtis[jti] = expires_at
+
+    def revoke_user(self, user_id: int, issued_before: float, expires_at: float):
+        with self._lock:
+            actual = self._user_cutoffs.get(user_id)
+            if actual is None or actual[0] < issued_before:
+                self._user_cutoffs[user_id] = (issued_before, expires_at)
+
+    def apply(self, row_id: int, jti: Optional[str], user_id: int,
+              issued_before: Optional[datetime], expires_at: datetime):
+        """Aplica una fila de tokensrevocados."""
+        if jti is not None:
+            self.revoke_jti(jti, _epoch(expires_at))
+        elif issued_before is not None:
+            self.revoke_user(user_id, _epoch(issued_before), _epoch(expires_at))
+        with self._lock:
+            self.last_id = max(self.last_id, row_id)
+
+    def prune(self, now: Optional[float] = None) -> int:
+        """Elimina entradas cuyos tokens ya expiraron."""
+        now = now or time.time()
+        with self._lock:
+            jtis = [j for j, exp in self._jtis.items() if exp <= now]
+            for j in jtis:
+                del self._jtis[j]
+            users = [u for u, (_, exp) in self._user_cutoffs.items() if exp <= now]
+            for u in users:
+                del self._user_cutoffs[u]
+        return len(jtis) + len(users)
+
+    def __len__(self):
+        return len(self._jtis) + len(self._user_cutoffs)
+
+# Instancia global por worker
+revocation_list = RevocationList()
@@ -1,13 +1,39 @@
-from passlib.context import CryptContext
-from jose import JWTError, jwt
 from datetime import datetime, timedelta
-from typing import Optional
+from functools import lru_cache
+from typing import Optional, Tuple
+import hashlib
+import secrets
+import time
+import uuid
 from .config import settings
+from .revocation import revocation_list
 
 # === CONFIGURACIÓN DE SEGURIDAD ===
 
-# Configuración para hash de contraseñas (bcrypt es muy seguro)
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Configuración para hash de contraseñas (esquema y costo desde Settings).
+# Los hashes con otro esquema o costo quedan marcados para actualizarse
+# (needs_update) y se rehashean de forma transparente en el siguiente login.
+# passlib y jose se importan al primer uso: no retrasan el arranque del worker.
+@lru_cache(maxsize=1)
+def pwd_context():
+    from passlib.context import CryptContext
+
+    schemes = [settings.PASSWORD_HASH_SCHEME] + [
+        s for s in ("argon2", "bcrypt") if s != settings.PASSWORD_HASH_SCHEME
+    ]
+    return CryptContext(
+        schemes=schemes,
+        deprecated="auto",
+        bcrypt__default_rounds=settings.BCRYPT_ROUNDS,
+        bcrypt__min_rounds=settings.BCRYPT_ROUNDS,
+        bcrypt__max_rounds=settings.BCRYPT_ROUNDS,
+        argon2__type="ID",
+        argon2__default_rounds=settings.ARGON2_TIME_COST,
+        argon2__min_rounds=settings.ARGON2_TIME_COST,
+        argon2__max_rounds=settings.ARGON2_TIME_COST,
+        argon2__memory_cost=settings.ARGON2_MEMORY_COST_KB,
+        argon2__parallelism=settings.ARGON2_PARALLELISM,
+    )
 
 # Configuración para tokens JWT - AHORA DESDE CONFIG
 ALGORITHM = settings.JWT_ALGORITHM
@@ -19,13 +45,34 @@ def hash_password(password: str) -> str:
     """
     Convierte una contraseña normal en un hash seguro.
     """
-    return pwd_context.hash(password)
+    return pwd_context().hash(password)
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """
     Verifica si una contraseña es correcta comparándola con su hash.
     """
-    return pwd_context.verify(plain_password, hashed_password)
+    return pwd_context().verify(plain_password, hashed_password)
+
+def password_needs_rehash(hashed_password: str) -> bool:
+    """
+    Indica si el hash usa un esquema o costo distinto al configurado.
+    """
+    return pwd_context().needs_update(hashed_password)
+
+# Hash de referencia para emails que no existen (se calcula una sola vez)
+_dummy_hash: Optional[str] = None
+
+def dummy_verify_password(plain_password: str) -> bool:
+    """
+    Ejecuta una verificación bcrypt contra un hash ficticio.
+    Así un login con email inexistente tarda lo mismo que uno real
+    y no se puede averiguar qué emails están registrados.
+    """
+    global _dummy_hash
+    if _dummy_hash is None:
+        _dummy_hash = pwd_context().hash("misboletas-usuario-inexistente")
+    pwd_context().verify(plain_password, _dummy_hash)
+    return False
 
 # === FUNCIONES DE TOKENS JWT (para autenticación futura) ===
 
@@ -42,21 +89,50 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     else:
         expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     
-    # Agregar tiempo de expiración al token
-    to_encode.update({"exp": expire})
+    # Agregar tiempo de expiración, emisión e identificador único (para poder revocarlo)
+    to_encode.update({"exp": expire, "iat": datetime.utcnow(), "jti": uuid.uuid4().hex})
     
     # Crear y devolver el token encriptado
+    from jose import jwt
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
+# === FUNCIONES DE REFRESH TOKENS ===
+
+def hash_refresh_token(token: str) -> str:
+    """
+    Hash SHA-256 del refresh token (es aleatorio y largo, no necesita bcrypt).
+    Solo el hash se guarda en la base de datos.
+    """
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+def generate_refresh_token() -> Tuple[str, str]:
+    """
+    Genera un refresh token opaco. Devuelve (token, hash).
+    """
+    token = secrets.token_urlsafe(32)
+    return token, hash_refresh_token(token)
+
 def verify_token(token: str):
     """
     Verifica si un token JWT es válido.
     """
+    from jose import JWTError, jwt
     try:
         # Intentar decodificar el token
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[ALGORITHM])
-        return payload
     except JWTError:
         # Token inválido (expirado, modificado, etc.)
         return None
+
+    # Token revocado (logout, cambio de contraseña): chequeo en memoria, sin BD
+    if revocation_list.is_revoked(payload):
+        return None
+    return payload
+
+def token_still_valid(payload: dict) -> bool:
+    """
+    Para conexiones largas (feed de eventos): el token ya verificado sigue sin
+    expirar ni estar revocado. Sin decodificar de nuevo ni ir a la BD.
+    """
+    return payload.get("exp", 0) > time.time() and not revocation_list.is_revoked(payload)
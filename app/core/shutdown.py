@@ -0,0 +1,195 @@
+"""
+Apagado ordenado del worker (deploys, SIGTERM del orquestador).
+
+Al recibir SIGTERM/SIGINT (o al empezar el shutdown del lifespan si el
+servidor no lo avisó antes):
+1. El worker deja de estar listo (/health/ready -> 503) y las respuestas
+   llevan `Connection: close`; uvicorn además cierra el socket de escucha.
+2. Las conexiones de larga duración (SSE / WebSocket de /events) se cierran
+   para que el cliente reconecte a otro worker.
+3. Las peticiones en curso terminan normalmente, con plazo
+   SHUTDOWN_DRAIN_SECONDS; las que siguen después se cancelan (su
+   transacción se revierte al cerrar la sesión, como en cualquier error).
+   El plazo lo vigila un timer que arranca en begin_drain: uvicorn espera
+   las peticiones en curso sin límite antes del shutdown del lifespan, así
+   que el plazo no puede depender de drain().
+
+Luego el lifespan detiene tareas periódicas y ejecutores, vacía los logs y
+cierra el pool (engine.dispose()) para que PostgreSQL no espere el timeout
+de conexiones abandonadas.
+"""
+
+import asyncio
+import logging
+import signal
+import time
+from typing import Dict, Optional, Set
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from .config import settings
+from .metrics import counter
+
+logger = logging.getLogger(__name__)
+
+REQUESTS_CANCELLED = counter(
+    "shutdown_cancelled_requests_total", "Peticiones canceladas por vencer el plazo de apagado"
+)
+
+_SIGNALS = (signal.SIGTERM, signal.SIGINT)
+
+class DrainState:
+    """Peticiones en curso y si el worker se está apagando."""
+
+    def __init__(self):
+        self.draining = False
+        self.started_at: Optional[float] = None
+        # Una entrada por llamada (no por tarea): las subpeticiones de /batch vuelven a
+        # pasar por el middleware en la misma tarea que la petición que las contiene
+        self.requests: Dict[object, asyncio.Task] = {}
+        self.cancelled: Set[asyncio.Task] = set()
+        self._idle: Optional[asyncio.Event] = None
+        self._deadline: Optional[asyncio.TimerHandle] = None
+
+    def _event(self) -> asyncio.Event:
+        if self._idle is None:
+            self._idle = asyncio.Event()
+            if not self.requests:
+                self._idle.set()
+        return self._idle
+
+    def enter(self, task: asyncio.Task) -> object:
+        """Registra una llamada en curso y devuelve su identificador para leave()."""
+        token = object()
+        self.requests[token] = task
+        self._event().clear()
+        return token
+
+    def leave(self, token: object):
+        self.requests.pop(token, None)
+        if not self.requests:
+            self._event().set()
+
+    def reset(self):
+        """Vuelve al estado inicial (nuevo arranque del lifespan en el mismo proceso)."""
+        if self._deadline is not None:
+            self._deadline.cancel()
+        self.draining = False
+        self.started_at = None
+        self.cancelled = set()
+        self._idle = None
+        self._deadline = None
+
+state = DrainState()
+
+class DrainMiddleware:
+    """Registra cada petición en curso y cierra keep-alive durante el apagado."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] not in ("http", "websocket"):
+            await self.app(scope, receive, send)
+            return
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and state.draining:
+                headers = [h for h in message.get("headers", []) if h[0].lower() != b"connection"]
+                message = {**message, "headers": [*headers, (b"connection", b"close")]}
+            await send(message)
+
+        token = state.enter(asyncio.current_task())
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            state.leave(token)
+
+def begin_drain(reason: str = "shutdown", timeout: Optional[float] = None):
+    """
+    Marca el worker como no listo, cierra los streams de eventos y arranca el
+    timer del plazo de apagado (idempotente). Debe llamarse desde el event loop.
+    """
+    from . import startup
+    from .events import broker
+
+    if state.draining:
+        return
+    state.draining = True
+    state.started_at = time.monotonic()
+    timeout = settings.SHUTDOWN_DRAIN_SECONDS if timeout is None else timeout
+    state._deadline = asyncio.get_running_loop().call_later(timeout, cancel_pending)
+    startup.state.mark_not_ready()
+    broker.close_all()
+    logger.info(f" Apagado iniciado ({reason}): {len(state.requests)} peticiones en curso")
+
+def cancel_pending() -> int:
+    """Cancela las peticiones que siguen en curso al vencer el plazo. Devuelve cuántas."""
+    pendientes = [t for t in set(state.requests.values()) if not t.done() and t not in state.cancelled]
+    if pendientes:
+        logger.warning(f" Plazo de apagado vencido, se cancelan {len(pendientes)} peticiones")
+    for task in pendientes:
+        task.cancel()
+        state.cancelled.add(task)
+    REQUESTS_CANCELLED.inc(len(pendientes))
+    return len(pendientes)
+
+async def drain(timeout: float) -> int:
+    """
+    Espera a que terminen las peticiones en curso; al vencer el plazo (contado
+    desde begin_drain) cancela las restantes. Devuelve cuántas se cancelaron
+    en total, incluidas las que ya canceló el timer mientras esperaba uvicorn.
+    """
+    begin_drain(timeout=timeout)
+    restante = max(0.0, timeout - (time.monotonic() - state.started_at))
+    try:
+        await asyncio.wait_for(state._event().wait(), restante)
+    except asyncio.TimeoutError:
+        cancel_pending()
+        await asyncio.gather(*state.cancelled, return_exceptions=True)
+    return len(state.cancelled)
+
+# ===== SEÑALES =====
+
+_previous_handlers: dict = {}
+
+def install_signal_handlers():
+    """
+    Encadena SIGTERM/SIGINT: primero begin_drain (en el event loop), luego el
+    manejador que ya estaba (el de uvicorn cierra el socket y espera las
+    peticiones antes del shutdown del lifespan; las que vencen el plazo las
+    cancela el timer de begin_drain).
+    """
+    import threading
+
+    if threading.current_thread() is not threading.main_thread():
+        return   # Solo el hilo principal puede instalar manejadores
+    loop = asyncio.get_running_loop()
+
+    def handler(sig, frame):
+        loop.call_soon_threadsafe(begin_drain, signal.Signals(sig).name)
+        _previous_handlers[sig](sig, frame)
+
+    for sig in _SIGNALS:
+        previous = signal.getsignal(sig)
+        # Sin un servidor que maneje la señal (SIG_DFL) no hay nada que drenar
+        if callable(previous) and previous is not signal.default_int_handler:
+            _previous_handlers[sig] = previous
+            signal.signal(sig, handler)
+
+def restore_signal_handlers():
+    for sig, previous in _previous_handlers.items():
+        signal.signal(sig, previous)
+    _previous_handlers.clear()
+
+def flush_logs():
+    """Escribe lo encolado y vacía los handlers (los de archivo o red pueden tener buffer)."""
+    from . import logs
+
+    logs.flush_logs()
+    for logger_ in [logging.getLogger(), *logging.Logger.manager.loggerDict.values()]:
+        for handler in getattr(logger_, "handlers", []):
+            try:
+                handler.flush()
+            except Exception:
+                pass
@@ -0,0 +1,234 @@
+"""
+Arranque del worker: pasos en paralelo, estado de readiness y perfil de tiempos.
+
+El worker queda "vivo" (acepta conexiones, /health/live responde) apenas
+termina de importarse. El trabajo con la base de datos (crear tablas,
+abrir conexiones del pool, cargar revocaciones) corre en segundo plano y
+en paralelo; cuando termina el worker pasa a "listo" (/health/ready) y el
+balanceador empieza a enviarle tráfico. Si la base no responde se reintenta
+con espera creciente, sin tumbar el proceso.
+
+Perfil completo (imports por módulo + cada paso):
+    python -m app.core.startup
+"""
+
+import asyncio
+import json
+import logging
+import re
+import subprocess
+import sys
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+logger = logging.getLogger(__name__)
+
+class StartupState:
+    """Readiness del worker y duración de cada paso del arranque."""
+
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self.ready = False
+        self.ready_after: Optional[float] = None   # Segundos desde el import hasta quedar listo
+        self.timings: Dict[str, float] = {}
+        self.last_error: Optional[str] = None
+        self._ready_event: Optional[asyncio.Event] = None
+
+    def _event(self) -> asyncio.Event:
+        if self._ready_event is None:
+            self._ready_event = asyncio.Event()
+        return self._ready_event
+
+    def mark_ready(self):
+        self.ready = True
+        self.ready_after = time.perf_counter() - self.started_at
+        self._event().set()
+
+    def mark_not_ready(self):
+        self.ready = False
+        self._ready_event = None   # El próximo arranque puede correr en otro event loop
+
+    async def wait_ready(self, timeout: float = None):
+        if not self.ready:
+            await asyncio.wait_for(self._event().wait(), timeout)
+
+    def report(self) -> dict:
+        return {
+            "listo": self.ready,
+            "listo_en_segundos": round(self.ready_after, 3) if self.ready_after is not None else None,
+            "pasos_ms": {k: round(v * 1000, 1) for k, v in self.timings.items()},
+            "ultimo_error": self.last_error,
+        }
+
+state = StartupState()
+
+async def timed_step(nombre: str, func: Callable[[], object]):
+    """Ejecuta un paso síncrono en un hilo y guarda cuánto tardó."""
+    inicio = time.perf_counter()
+    try:
+        await asyncio.to_thread(func)
+    finally:
+        state.timings[nombre] = time.perf_counter() - inicio
+
+async def run_startup(parallel_steps: Dict[str, Callable[[], object]],
+                      after_ready: List[Callable[[], object]], max_backoff: float = 30):
+    """
+    Corre `parallel_steps` (síncronos, en hilos y a la vez) hasta que todos
+    terminen bien, luego `after_ready` en orden (funciones o corrutinas, en el
+    event loop) y marca el worker listo.
+    """
+    espera = 1
+    while True:
+        try:
+            await asyncio.gather(*(timed_step(n, f) for n, f in parallel_steps.items()))
+            break
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            state.last_error = type(e).__name__   # El detalle (texto del driver) queda solo en el log
+            logger.error(f" Arranque incompleto, reintentando en {espera}s: {str(e)}")
+            await asyncio.sleep(espera)
+            espera = min(espera * 2, max_backoff)
+
+    state.last_error = None
+    # Un hook que falla (tareas de fondo, listener) no deja al worker sin arrancar:
+    # queda en el log y en /health/status
+    for func in after_ready:
+        nombre = getattr(func, "__name__", repr(func))
+        try:
+            resultado = func()
+            if asyncio.iscoroutine(resultado):
+                await resultado
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            state.last_error = f"{nombre}: {type(e).__name__}"
+            logger.error(f" Falló {nombre} al arrancar: {str(e)}")
+    state.mark_ready()
+    pasos = ", ".join(f"{k} {v * 1000:.0f}ms" for k, v in state.timings.items())
+    logger.info(f" Worker listo en {state.ready_after:.2f}s ({pasos})")
+
+class StartupGateMiddleware:
+    """
+    503 con Retry-After para todo lo que no sea /health o /metrics hasta que el
+    arranque termine la primera vez: antes de eso faltan las revocaciones
+    (un token revocado pasaría) y quizás las tablas. Durante el apagado no
+    rechaza nada: las peticiones aceptadas se terminan (app/core/shutdown.py).
+    """
+
+    _EXEMPT_PREFIXES = ("/health/", "/metrics")
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if (
+            state.ready_after is not None
+            or scope["type"] not in ("http", "websocket")
+            or scope["path"].startswith(self._EXEMPT_PREFIXES)
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        if scope["type"] == "websocket":
+            await send({"type": "websocket.close", "code": 1013})   # Try again later
+            return
+        body = json.dumps({
+            "error": "Error 503",
+            "message": "El servidor está iniciando, intenta nuevamente",
+            "path": scope["path"],
+        }).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", b"1"),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+def warm_pool(engine, connections: int):
+    """Abre `connections` conexiones del pool a la vez (cada una espera a las demás antes de devolverse)."""
+    from sqlalchemy import text
+
+    if connections <= 0:
+        return
+    barrera = threading.Barrier(connections)
+    errores = []
+
+    def abrir():
+        try:
+            with engine.connect() as conn:
+                conn.execute(text("SELECT 1"))
+                barrera.wait(timeout=30)
+        except threading.BrokenBarrierError:
+            pass
+        except Exception as e:
+            errores.append(e)
+            barrera.abort()
+
+    hilos = [threading.Thread(target=abrir, name=f"warm-pool-{i}") for i in range(connections)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    if errores:
+        raise errores[0]
+
+def warm_imports():
+    """Importa en segundo plano lo que el primer login o request autenticado necesitaría."""
+    from app.core.security import pwd_context
+    import jose.jwt  # noqa: F401
+    pwd_context()
+
+# ===== PERFIL (CLI) =====
+
+_IMPORTTIME_RE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)")
+
+def import_profile(module: str = "app.main", top: int = 25) -> List[dict]:
+    """Tiempo de import por módulo (python -X importtime en un proceso nuevo)."""
+    salida = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True
+    ).stderr
+    filas = []
+    for match in _IMPORTTIME_RE.finditer(salida):
+        propio, acumulado, sangria, nombre = match.groups()
+        filas.append({
+            "modulo": nombre, "propio_ms": int(propio) / 1000,
+            "acumulado_ms": int(acumulado) / 1000, "nivel": len(sangria) // 2,
+        })
+    # Módulos de la app + los de primer nivel (dependencias directas): ahí está lo accionable
+    relevantes = [f for f in filas if f["modulo"].startswith("app.") or f["nivel"] <= 1]
+    return sorted(relevantes, key=lambda f: -f["acumulado_ms"])[:top]
+
+def main():
+    print("== Imports (acumulado, ms) ==")
+    for fila in import_profile():
+        print(f"  {fila['acumulado_ms']:9.1f}  {fila['propio_ms']:8.1f}  {fila['modulo']}")
+
+    inicio = time.perf_counter()
+    import app.main
+    print(f"\n== import app.main en este proceso: {(time.perf_counter() - inicio) * 1000:.0f} ms ==")
+    # Como script este archivo es __main__: el estado real es el del módulo importado por la app
+    from app.core.startup import state as app_state
+    logging.getLogger("sqlalchemy.engine").setLevel(logging.WARNING)   # El log de cada SQL distorsiona los tiempos
+
+    async def arrancar():
+        async with app.main.app.router.lifespan_context(app.main.app):
+            await app_state.wait_ready(timeout=120)
+
+    asyncio.run(arrancar())
+    print("== Pasos del arranque ==")
+    for nombre, ms in app_state.report()["pasos_ms"].items():
+        print(f"  {ms:9.1f}  {nombre}")
+    print(f"  Listo {app_state.ready_after:.2f}s después de importar app.core.startup")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
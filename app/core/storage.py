@@ -0,0 +1,107 @@
+"""
+Almacenamiento de documentos en disco.
+
+Define dónde viven los archivos parciales de las cargas reanudables y los
+documentos finales referenciados por Documento.rutaarchivo (ruta relativa
+a UPLOAD_DIR).
+"""
+
+import os
+import re
+from typing import AsyncIterator, Tuple
+
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import ClientDisconnect
+
+from .config import settings
+
+_CARACTERES_INSEGUROS = re.compile(r"[^A-Za-z0-9._-]+")
+
+def upload_root() -> str:
+    """Carpeta raíz de los documentos."""
+    return os.path.abspath(settings.UPLOAD_DIR)
+
+def absolute_path(ruta_relativa: str) -> str:
+    """Convierte una rutaarchivo guardada en BD a ruta absoluta."""
+    return os.path.join(upload_root(), ruta_relativa)
+
+def partial_path(sesion_id: str) -> str:
+    """Archivo donde se van escribiendo los fragmentos de una carga."""
+    return os.path.join(upload_root(), ".parciales", f"{sesion_id}.part")
+
+def safe_filename(nombre: str) -> str:
+    """Limpia el nombre enviado por el cliente (sin rutas ni caracteres raros)."""
+    base = os.path.basename(nombre.replace("\\", "/"))
+    limpio = _CARACTERES_INSEGUROS.sub("_", base).strip("._")
+    return (limpio or "archivo")[:150]
+
+def final_relative_path(user_id: int, sesion_id: str, nombre: str) -> str:
+    """Ruta relativa definitiva del documento: <usuario>/<sesion>_<nombre>."""
+    return os.path.join(str(user_id), f"{sesion_id}_{safe_filename(nombre)}")
+
+def preview_relative_path(ruta_original: str, content_hash: str, size: int) -> str:
+    """Miniatura junto al original, identificada por el hash del contenido."""
+    return os.path.join(os.path.dirname(ruta_original), f"{content_hash}_{size}.jpg")
+
+def create_partial_file(sesion_id: str) -> None:
+    """Crea el archivo parcial vacío de una carga nueva."""
+    path = partial_path(sesion_id)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    open(path, "wb").close()
+
+def remove_file(path: str) -> None:
+    """Elimina un archivo si existe."""
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+def remove_session_files(sesion_id: str) -> None:
+    """Archivo parcial de una carga (cancelada o expirada)."""
+    remove_file(partial_path(sesion_id))
+
+def promote_partial(sesion_id: str, ruta_relativa: str) -> str:
+    """
+    Mueve el archivo parcial completo a su ruta definitiva.
+    Es un rename: los fragmentos ya están en su posición y no se vuelven a leer.
+    """
+    destino = absolute_path(ruta_relativa)
+    os.makedirs(os.path.dirname(destino), exist_ok=True)
+    os.replace(partial_path(sesion_id), destino)
+    return destino
+
+def demote_final(sesion_id: str, ruta_relativa: str) -> None:
+    """Deshace promote_partial (por ejemplo si falla el commit en BD)."""
+    os.replace(absolute_path(ruta_relativa), partial_path(sesion_id))
+
+async def write_stream_to_partial(
+    sesion_id: str,
+    offset: int,
+    stream: AsyncIterator[bytes],
+    limit: int
+) -> Tuple[int, bool]:
+    """
+    Escribe el cuerpo de la petición directo en el archivo parcial, desde `offset`.
+
+    Solo se llama con el fragmento ya reservado en BD (crud.upload.claim_chunk):
+    dos peticiones nunca escriben a la vez en la misma carga. Devuelve
+    (bytes_escritos, completo). Si el cliente se desconecta a mitad del
+    fragmento se devuelve lo recibido hasta ese momento para que la carga pueda
+    reanudarse desde ahí. Lanza ValueError si se supera `limit`. La escritura
+    en disco va al threadpool.
+    """
+    escritos = 0
+    f = await run_in_threadpool(open, partial_path(sesion_id), "r+b")
+    try:
+        await run_in_threadpool(f.seek, offset)
+        try:
+            async for pieza in stream:
+                if offset + escritos + len(pieza) > limit:
+                    raise ValueError("El fragmento excede el tamaño declarado")
+                await run_in_threadpool(f.write, pieza)
+                escritos += len(pieza)
+        except ClientDisconnect:
+            return escritos, False
+    finally:
+        await run_in_threadpool(f.close)
+    return escritos, True
@@ -0,0 +1,169 @@
+"""
+Índice en memoria para autocompletar marca, tienda y modelo.
+
+Por cada usuario y campo se guardan los valores que ya usó, ordenados por su
+forma normalizada (minúsculas, sin tildes), así la búsqueda por prefijo es un
+bisect sobre una lista ordenada. Distintas escrituras del mismo valor
+("Samsung", "samsung ") se agrupan y se sugiere la más usada.
+
+- Se construye de forma perezosa con un GROUP BY sobre productos.
+- Al crear productos se actualiza de forma incremental; al editar o eliminar
+  se descarta y se reconstruye en la siguiente consulta.
+- Memoria acotada: SUGGEST_MAX_VALUES_PER_FIELD valores por campo,
+  SUGGEST_MAX_USERS usuarios (LRU) y liberación tras SUGGEST_IDLE_SECONDS sin uso
+  (se revisa en cada consulta). La generación por usuario solo existe mientras
+  hay una carga desde BD en curso.
+"""
+
+import bisect
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional
+
+from .config import settings
+
+SUGGEST_FIELDS = ("marca", "tienda", "modelo")
+
+def normalize(value: str) -> str:
+    """Clave de comparación: minúsculas, sin tildes ni espacios sobrantes."""
+    sin_tildes = unicodedata.normalize("NFKD", value)
+    sin_tildes = "".join(c for c in sin_tildes if not unicodedata.combining(c))
+    return " ".join(sin_tildes.lower().split())
+
+class _FieldIndex:
+    """Valores de un campo, ordenados por clave normalizada."""
+
+    __slots__ = ("keys", "spellings")
+
+    def __init__(self, counts: Dict[str, int]):
+        self.keys: List[str] = []
+        self.spellings: Dict[str, Dict[str, int]] = {}
+        for value, count in counts.items():
+            self.add(value, count)
+
+    def add(self, value: str, delta: int = 1):
+        value = value.strip()
+        key = normalize(value)
+        if not key:
+            return
+        if key not in self.spellings:
+            if len(self.keys) >= settings.SUGGEST_MAX_VALUES_PER_FIELD:
+                return
+            bisect.insort(self.keys, key)
+            self.spellings[key] = {}
+        variantes = self.spellings[key]
+        variantes[value] = variantes.get(value, 0) + delta
+
+    def search(self, prefix: str, limit: int) -> List[str]:
+        p = normalize(prefix)
+        inicio = bisect.bisect_left(self.keys, p)
+        fin = bisect.bisect_left(self.keys, p + "\uffff")
+        candidatos = []
+        for key in self.keys[inicio:fin]:
+            variantes = self.spellings[key]
+            total = sum(variantes.values())
+            mejor = max(variantes.items(), key=lambda kv: kv[1])[0]
+            candidatos.append((-total, key, mejor))
+        candidatos.sort()
+        return [mejor for _, _, mejor in candidatos[:limit]]
+
+class _UserIndex:
+    __slots__ = ("fields", "last_access")
+
+    def __init__(self):
+        self.fields: Dict[str, _FieldIndex] = {}
+        self.last_access = time.monotonic()
+
+_lock = threading.Lock()
+_users: "OrderedDict[int, _UserIndex]" = OrderedDict()
+# Cargas desde BD en curso: usuario -> [cargas, generación]. Cada escritura incrementa la
+# generación, así no se guarda un índice construido con datos viejos
+_pending: Dict[int, List[int]] = {}
+
+def _evict_locked(now: float):
+    while _users:
+        user_id, index = next(iter(_users.items()))
+        if len(_users) > settings.SUGGEST_MAX_USERS or now - index.last_access > settings.SUGGEST_IDLE_SECONDS:
+            _users.popitem(last=False)
+        else:
+            break
+
+def _get_field_locked(user_id: int, field: str, now: float) -> Optional[_FieldIndex]:
+    index = _users.get(user_id)
+    if index is None:
+        return None
+    index.last_access = now
+    _users.move_to_end(user_id)
+    return index.fields.get(field)
+
+def _finish_load_locked(user_id: int, generation: int) -> bool:
+    """Cierra una carga en curso; True si no hubo escrituras mientras tanto."""
+    pendiente = _pending[user_id]
+    pendiente[0] -= 1
+    if pendiente[0] == 0:
+        del _pending[user_id]
+    return pendiente[1] == generation
+
+def _bump_generation_locked(user_id: int):
+    pendiente = _pending.get(user_id)
+    if pendiente is not None:
+        pendiente[1] += 1
+
+def suggest(
+    user_id: int,
+    field: str,
+    prefix: str,
+    limit: int,
+    load_counts: Callable[[], Dict[str, int]]
+) -> List[str]:
+    """
+    Sugerencias del usuario para `field` que empiezan con `prefix`.
+    `load_counts` obtiene {valor: frecuencia} desde la BD si el índice no existe.
+    """
+    with _lock:
+        now = time.monotonic()
+        field_index = _get_field_locked(user_id, field, now)
+        _evict_locked(now)
+        if field_index is None:
+            pendiente = _pending.setdefault(user_id, [0, 0])
+            pendiente[0] += 1
+            generation = pendiente[1]
+    if field_index is None:
+        # La consulta a BD se hace fuera del lock
+        try:
+            field_index = _FieldIndex(load_counts())
+        except BaseException:
+            with _lock:
+                _finish_load_locked(user_id, generation)
+            raise
+        with _lock:
+            now = time.monotonic()
+            if _finish_load_locked(user_id, generation):
+                index = _users.get(user_id) or _UserIndex()
+                index.fields[field] = field_index
+                index.last_access = now
+                _users[user_id] = index
+                _users.move_to_end(user_id)
+            _evict_locked(now)
+    with _lock:
+        return field_index.search(prefix, limit)
+
+def record_product(user_id: int, values: Dict[str, Optional[str]]):
+    """Suma los valores de un producto nuevo a los índices ya construidos."""
+    with _lock:
+        _bump_generation_locked(user_id)
+        index = _users.get(user_id)
+        if index is None:
+            return
+        for field, value in values.items():
+            field_index = index.fields.get(field)
+            if field_index is not None and value:
+                field_index.add(value)
+
+def invalidate_user(user_id: int):
+    """Descarta el índice del usuario (se reconstruye en la próxima consulta)."""
+    with _lock:
+        _bump_generation_locked(user_id)
+        _users.pop(user_id, None)
@@ -0,0 +1,69 @@
+"""
+Excepciones de dominio que lanza la capa CRUD.
+
+Son HTTPException con estado y mensaje fijos: atraviesan el
+`except HTTPException: raise` de los CRUD y los endpoints sin reformatear
+el error del driver. `from_db_error` traduce un error de la base ya
+clasificado (app/db/errors.py) a la excepción que corresponde.
+"""
+
+from typing import Optional
+
+from fastapi import HTTPException
+
+from app.db import errors
+
+class DomainError(HTTPException):
+    """Error de negocio con respuesta fija."""
+
+    status_code = 500
+    detail = "Error interno de base de datos"
+
+    def __init__(self, detail: Optional[str] = None):
+        super().__init__(status_code=self.status_code, detail=detail or self.detail)
+
+class EmailAlreadyRegistered(DomainError):
+    status_code = 400
+    detail = "El email ya está registrado"
+
+class UserNotFound(DomainError):
+    status_code = 404
+    detail = "Usuario no encontrado"
+
+class ResourceAlreadyExists(DomainError):
+    status_code = 409
+    detail = "El recurso ya existe"
+
+class InvalidReference(DomainError):
+    status_code = 422
+    detail = "Referencia inválida a otro recurso"
+
+class IntegrityViolation(DomainError):
+    status_code = 422
+    detail = "Error de integridad de datos"
+
+class ConcurrentUpdate(DomainError):
+    status_code = 409
+    detail = "Conflicto con otra operación simultánea, intenta nuevamente"
+
+class QueryTimeout(DomainError):
+    status_code = 503
+    detail = "La consulta tardó demasiado, intenta nuevamente"
+
+# Categoría del error de la base -> excepción de dominio (las demás: 500 genérico)
+_BY_KIND = {
+    errors.EMAIL_TAKEN: EmailAlreadyRegistered,
+    errors.USER_NOT_FOUND: UserNotFound,
+    errors.UNIQUE_VIOLATION: ResourceAlreadyExists,
+    errors.FOREIGN_KEY_VIOLATION: InvalidReference,
+    errors.NOT_NULL_VIOLATION: IntegrityViolation,
+    errors.CHECK_VIOLATION: IntegrityViolation,
+    errors.INTEGRITY: IntegrityViolation,
+    errors.SERIALIZATION: ConcurrentUpdate,
+    errors.DEADLOCK: ConcurrentUpdate,
+    errors.LOCKED: ConcurrentUpdate,
+    errors.TIMEOUT: QueryTimeout,
+}
+
+def from_db_error(error: Exception) -> DomainError:
+    return _BY_KIND.get(errors.classify(error), DomainError)()
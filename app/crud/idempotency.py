@@ -0,0 +1,125 @@
+from app.core.config import settings
+from app.db.session import SessionLocal
+from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError
+from datetime import datetime, timedelta, timezone
+import json
+
+# Una reserva sin completar (el worker murió a mitad de la petición) caduca
+# pronto para no bloquear la clave durante todo el TTL
+PENDING_LEASE = timedelta(minutes=5)
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+def _row_to_record(row) -> dict:
+    return {
+        "huella": row.huellapeticion,
+        "estado": row.estado,
+        "cabeceras": json.loads(row.cabeceras) if row.cabeceras else [],
+        "cuerpo": bytes(row.cuerpo) if row.cuerpo is not None else b"",
+    }
+
+# ===== FUNCIONES USADAS POR EL MIDDLEWARE =====
+
+# Reservar la clave para esta petición. Devuelve None si quedó reservada, o el
+# registro existente (en curso: estado None; terminado: estado y respuesta)
+def reserve_idempotency_key(alcance: str, clave: str, huella: str):
+    db = SessionLocal()
+    try:
+        for _ in range(2):
+            try:
+                db.execute(
+                    text("""
+                        INSERT INTO clavesidempotencia (alcance, clave, huellapeticion, fechaexpiracion)
+                        VALUES (:alcance, :clave, :huella, :expira)
+                    """),
+                    {"alcance": alcance, "clave": clave, "huella": huella, "expira": _now() + PENDING_LEASE}
+                )
+                db.commit()
+                return None
+            except IntegrityError:
+                db.rollback()
+
+            row = db.execute(
+                text("""
+                    SELECT huellapeticion, estado, cabeceras, cuerpo,
+                           CASE WHEN fechaexpiracion > :ahora THEN 1 ELSE 0 END AS vigente
+                    FROM clavesidempotencia
+                    WHERE alcance = :alcance AND clave = :clave
+                """),
+                {"alcance": alcance, "clave": clave, "ahora": _now()}
+            ).fetchone()
+            if row is None:
+                continue   # Se borró entre el INSERT y el SELECT: reintentar
+            if row.vigente:
+                return _row_to_record(row)
+
+            # Clave vencida (o reserva abandonada): se libera y se reintenta
+            db.execute(
+                text("DELETE FROM clavesidempotencia WHERE alcance = :alcance AND clave = :clave AND fechaexpiracion <= :ahora"),
+                {"alcance": alcance, "clave": clave, "ahora": _now()}
+            )
+            db.commit()
+        return {"huella": huella, "estado": None, "cabeceras": [], "cuerpo": b""}
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+# Guardar la respuesta de la petición original
+def complete_idempotency_key(alcance: str, clave: str, estado: int, cabeceras: list, cuerpo: bytes):
+    db = SessionLocal()
+    try:
+        db.execute(
+            text("""
+                UPDATE clavesidempotencia
+                SET estado = :estado, cabeceras = :cabeceras, cuerpo = :cuerpo, fechaexpiracion = :expira
+                WHERE alcance = :alcance AND clave = :clave
+            """),
+            {
+                "alcance": alcance, "clave": clave, "estado": estado,
+                "cabeceras": json.dumps(cabeceras), "cuerpo": cuerpo,
+                "expira": _now() + timedelta(hours=settings.IDEMPOTENCY_TTL_HOURS)
+            }
+        )
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+# Liberar la reserva (error 5xx o respuesta no guardable): el cliente puede reintentar
+def release_idempotency_key(alcance: str, clave: str):
+    db = SessionLocal()
+    try:
+        db.execute(
+            text("DELETE FROM clavesidempotencia WHERE alcance = :alcance AND clave = :clave AND estado IS NULL"),
+            {"alcance": alcance, "clave": clave}
+        )
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+# ===== TAREAS PERIÓDICAS =====
+
+# Eliminar claves vencidas (la tabla solo crece hasta el TTL)
+def purge_expired_idempotency_keys() -> int:
+    db = SessionLocal()
+    try:
+        result = db.execute(
+            text("DELETE FROM clavesidempotencia WHERE fechaexpiracion <= :ahora"),
+            {"ahora": _now()}
+        )
+        db.commit()
+        return result.rowcount
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
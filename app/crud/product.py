@@ -1,9 +1,22 @@
-from app.schemas.product import Product, ProductRead
+from app.schemas.product import (
+    Product, ProductRead, ProductCountByValue, UserSummary, ProductWithRelations, ProductBatchResult,
+    PRODUCT_FIELD_COLUMNS
+)
 from app.models.producto import Producto
+from app.db import search
+from app.crud.upload import convert_to_documento_schema
+from app.core import suggestions, events
+from app.core.config import settings
+from app.core.cache import UserCache
+from app.core.response_cache import response_cache
 from sqlalchemy.orm import Session
-from sqlalchemy import text
+from sqlalchemy import text, bindparam
 from fastapi import HTTPException
 from datetime import date
+from collections import defaultdict
+
+# Resumen del home por usuario, se invalida en cada escritura de productos
+summary_cache = UserCache(settings.SUMMARY_CACHE_TTL_SECONDS, settings.SUMMARY_CACHE_MAX_USERS)
 
 # ===== FUNCIÓN HELPER PARA ELIMINAR REPETICIÓN =====
 def _convert_to_product_schema(row) -> Product:
@@ -20,6 +33,18 @@ def _convert_to_product_schema(row) -> Product:
         UsuarioID=row.UsuarioID
     )
 
+def _after_product_write(user_id: int, accion: str, product_id: int, created: Product = None):
+    """Mantiene coherentes los índices y cachés en memoria tras crear/editar/eliminar y avisa al feed."""
+    summary_cache.invalidate(user_id)
+    response_cache.invalidate_user(user_id)
+    events.publish(user_id, "producto", accion, product_id)
+    if created is not None:
+        suggestions.record_product(user_id, {
+            "marca": created.Marca, "tienda": created.Tienda, "modelo": created.Modelo
+        })
+    else:
+        suggestions.invalidate_user(user_id)
+
 def check_product_ownership(product: Product, user_id: int):
     """Verifica que el producto pertenezca al usuario"""
     if product.UsuarioID != user_id:
@@ -56,6 +81,291 @@ def get_products_by_user(db: Session, user_id: int):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error al obtener productos del usuario: {str(e)}")
 
+# Columnas de productos con los alias que espera _convert_to_product_schema
+_PRODUCT_COLUMNS = """
+    p.productoid AS "ProductoID", p.nombreproducto AS "NombreProducto",
+    p.fechacompra AS "FechaCompra", p.duraciongarantia AS "DuracionGarantia",
+    p.marca AS "Marca", p.modelo AS "Modelo", p.tienda AS "Tienda",
+    p.notas AS "Notas", p.usuarioid AS "UsuarioID"
+"""
+
+def _ids_filter(db: Session, column: str, param: str = "ids"):
+    """Filtro por lista de IDs: ANY(array) en PostgreSQL (un solo plan), IN expandido en otros."""
+    if db.get_bind().dialect.name == "postgresql":
+        return f"{column} = ANY(:{param})", []
+    return f"{column} IN :{param}", [bindparam(param, expanding=True)]
+
+def _documents_by_product(db: Session, product_ids: list) -> dict:
+    """Documentos de varios productos en una sola consulta: {productoid: [DocumentoRead]}."""
+    condicion, params = _ids_filter(db, "productoid")
+    rows = db.execute(
+        text(f"""
+            SELECT documentoid, productoid, nombrearchivo, rutaarchivo,
+                   tamanobytes, hashcontenido, miniaturas
+            FROM documentos
+            WHERE {condicion}
+            ORDER BY documentoid
+        """).bindparams(*params),
+        {"ids": product_ids}
+    ).fetchall()
+    documentos = defaultdict(list)
+    for d in rows:
+        documentos[d.productoid].append(convert_to_documento_schema(d))
+    return documentos
+
+def _categories_by_product(db: Session, product_ids: list) -> dict:
+    """Categorías de varios productos en una sola consulta: {productoid: [str]}."""
+    condicion, params = _ids_filter(db, "productoid")
+    rows = db.execute(
+        text(f"""
+            SELECT productoid, categoria FROM productocategorias
+            WHERE {condicion}
+            ORDER BY id
+        """).bindparams(*params),
+        {"ids": product_ids}
+    ).fetchall()
+    categorias = defaultdict(list)
+    for c in rows:
+        categorias[c.productoid].append(c.categoria)
+    return categorias
+
+# Obtener varios productos por ID con sus documentos y categorías (3 consultas en total)
+def get_products_batch(db: Session, product_ids: list, user_id: int) -> ProductBatchResult:
+    ids = list(dict.fromkeys(product_ids))   # Sin duplicados, conservando el orden
+    try:
+        condicion, params = _ids_filter(db, "p.productoid")
+        rows = db.execute(
+            text(f"""
+                SELECT {_PRODUCT_COLUMNS}
+                FROM productos p
+                WHERE {condicion} AND p.usuarioid = :user_id
+            """).bindparams(*params),
+            {"ids": ids, "user_id": user_id}
+        ).fetchall()
+        productos = {
+            r.ProductoID: ProductWithRelations(**_convert_to_product_schema(r).model_dump())
+            for r in rows
+        }
+
+        if productos:
+            encontrados = list(productos)
+            documentos = _documents_by_product(db, encontrados)
+            categorias = _categories_by_product(db, encontrados)
+            for producto_id, producto in productos.items():
+                producto.Documentos = documentos.get(producto_id, [])
+                producto.Categorias = categorias.get(producto_id, [])
+
+        return ProductBatchResult(
+            Productos=[productos[i] for i in ids if i in productos],
+            NoEncontrados=[i for i in ids if i not in productos]
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error al obtener productos: {str(e)}")
+
+# Productos con solo los campos pedidos (fields=) y relaciones opcionales (include=).
+# Sin product_id devuelve todos los del usuario; con product_id, una lista de uno.
+def get_products_sparse(db: Session, user_id: int, fields: tuple, include: tuple, product_id: int = None):
+    columnas = ", ".join(f'p.{PRODUCT_FIELD_COLUMNS[f]} AS "{f}"' for f in fields)
+    try:
+        if product_id is None:
+            rows = db.execute(
+                text(f"SELECT {columnas} FROM productos p WHERE p.usuarioid = :user_id ORDER BY p.productoid"),
+                {"user_id": user_id}
+            ).fetchall()
+        else:
+            rows = db.execute(
+                text(f'SELECT {columnas}, p.usuarioid AS "_propietario" FROM productos p WHERE p.productoid = :product_id'),
+                {"product_id": product_id}
+            ).fetchall()
+            if not rows:
+                raise HTTPException(status_code=404, detail="Producto no encontrado")
+            if rows[0]._propietario != user_id:
+                raise HTTPException(status_code=403, detail="No tienes permiso para acceder a este producto")
+
+        productos = [{f: row._mapping[f] for f in fields} for row in rows]
+        if productos and include:
+            ids = [p["ProductoID"] for p in productos]
+            if "documentos" in include:
+                documentos = _documents_by_product(db, ids)
+                for p in productos:
+                    p["Documentos"] = documentos.get(p["ProductoID"], [])
+            if "categorias" in include:
+                categorias = _categories_by_product(db, ids)
+                for p in productos:
+                    p["Categorias"] = categorias.get(p["ProductoID"], [])
+        return productos
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error al obtener productos: {str(e)}")
+
+# Búsqueda de texto completo en los productos del usuario (ordenada por relevancia)
+def search_products(db: Session, user_id: int, query: str, limit: int, offset: int):
+    terms = search.search_terms(query)
+    if not terms:
+        return []
+    try:
+        dialect = db.get_bind().dialect.name
+        if dialect == "postgresql":
+            # El CTE materializado obliga a partir del índice por usuario (pocas filas)
+            # en vez de combinarlo con el GIN, que devuelve coincidencias de todos los usuarios
+            result = db.execute(
+                text(f"""
+                    WITH p AS MATERIALIZED (
+                        SELECT * FROM productos WHERE usuarioid = :user_id
+                    )
+                    SELECT {_PRODUCT_COLUMNS}
+                    FROM p
+                    WHERE p.busqueda @@ to_tsquery('spanish', :consulta)
+                    ORDER BY ts_rank(p.busqueda, to_tsquery('spanish', :consulta)) DESC, p.productoid DESC
+                    LIMIT :limit OFFSET :offset
+                """),
+                {"user_id": user_id, "consulta": search.postgres_tsquery(terms), "limit": limit, "offset": offset}
+            )
+        else:
+            # Alternativa SQLite FTS5 (pruebas y benchmarks locales)
+            result = db.execute(
+                text(f"""
+                    SELECT {_PRODUCT_COLUMNS}
+                    FROM productos_fts f
+                    JOIN productos p ON p.productoid = f.rowid
+                    WHERE productos_fts MATCH :consulta
+                      AND p.usuarioid = :user_id
+                    ORDER BY bm25(productos_fts, 10.0, 5.0, 5.0, 2.0, 1.0), p.productoid DESC
+                    LIMIT :limit OFFSET :offset
+                """),
+                {"user_id": user_id, "consulta": search.sqlite_match(terms), "limit": limit, "offset": offset}
+            )
+        return [_convert_to_product_schema(p) for p in result.fetchall()]
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error al buscar productos: {str(e)}")
+
+# Frecuencia de cada valor de un campo (marca/tienda/modelo) en los productos del usuario
+def get_field_value_counts(db: Session, user_id: int, field: str):
+    if field not in suggestions.SUGGEST_FIELDS:
+        raise HTTPException(status_code=400, detail="Campo no válido para sugerencias")
+    try:
+        result = db.execute(
+            text(f"""
+                SELECT {field} AS valor, COUNT(*) AS total
+                FROM productos
+                WHERE usuarioid = :user_id AND {field} IS NOT NULL AND {field} <> ''
+                GROUP BY {field}
+                ORDER BY total DESC
+                LIMIT :limit
+            """),
+            {"user_id": user_id, "limit": settings.SUGGEST_MAX_VALUES_PER_FIELD}
+        )
+        return {row.valor: row.total for row in result.fetchall()}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error al obtener sugerencias: {str(e)}")
+
+# Conteos del resumen en SQLite (sin FILTER ni GROUPING SETS): se repiten por cada agrupación
+_SQLITE_SUMMARY_COUNTS = """
+    COUNT(DISTINCT productoid) AS total,
+    COUNT(DISTINCT CASE WHEN vence >= date('now') THEN productoid END) AS activas,
+    COUNT(DISTINCT CASE WHEN vence < date('now') THEN productoid END) AS vencidas,
+    COUNT(DISTINCT CASE
+        WHEN vence >= date('now') AND vence < date('now', 'start of month', '+1 month') THEN productoid
+    END) AS vencen_este_mes
+"""
+
+# Resumen del home en una sola pasada (FILTER + GROUPING SETS en PostgreSQL)
+def get_user_summary(db: Session, user_id: int) -> UserSummary:
+    try:
+        if db.get_bind().dialect.name == "postgresql":
+            result = db.execute(
+                text("""
+                    WITH base AS (
+                        SELECT
+                            p.productoid,
+                            NULLIF(p.tienda, '') AS tienda,
+                            NULLIF(p.marca, '') AS marca,
+                            c.categoria,
+                            (p.fechacompra + make_interval(months => p.duraciongarantia))::date AS vence
+                        FROM productos p
+                        LEFT JOIN productocategorias c ON c.productoid = p.productoid
+                        WHERE p.usuarioid = :user_id
+                    )
+                    SELECT
+                        GROUPING(tienda) AS g_tienda,
+                        GROUPING(marca) AS g_marca,
+                        GROUPING(categoria) AS g_categoria,
+                        tienda, marca, categoria,
+                        COUNT(DISTINCT productoid) AS total,
+                        COUNT(DISTINCT productoid) FILTER (WHERE vence >= CURRENT_DATE) AS activas,
+                        COUNT(DISTINCT productoid) FILTER (WHERE vence < CURRENT_DATE) AS vencidas,
+                        COUNT(DISTINCT productoid) FILTER (
+                            WHERE vence >= CURRENT_DATE
+                              AND vence < date_trunc('month', CURRENT_DATE) + interval '1 month'
+                        ) AS vencen_este_mes
+                    FROM base
+                    GROUP BY GROUPING SETS ((), (tienda), (marca), (categoria))
+                """),
+                {"user_id": user_id}
+            )
+        else:
+            # Alternativa SQLite (pruebas y benchmarks locales): un UNION ALL por agrupación
+            result = db.execute(
+                text(f"""
+                    WITH base AS (
+                        SELECT
+                            p.productoid,
+                            NULLIF(p.tienda, '') AS tienda,
+                            NULLIF(p.marca, '') AS marca,
+                            c.categoria,
+                            date(p.fechacompra, '+' || p.duraciongarantia || ' months') AS vence
+                        FROM productos p
+                        LEFT JOIN productocategorias c ON c.productoid = p.productoid
+                        WHERE p.usuarioid = :user_id
+                    )
+                    SELECT 1 AS g_tienda, 1 AS g_marca, 1 AS g_categoria,
+                           NULL AS tienda, NULL AS marca, NULL AS categoria, {_SQLITE_SUMMARY_COUNTS}
+                    FROM base
+                    UNION ALL
+                    SELECT 0, 1, 1, tienda, NULL, NULL, {_SQLITE_SUMMARY_COUNTS}
+                    FROM base GROUP BY tienda
+                    UNION ALL
+                    SELECT 1, 0, 1, NULL, marca, NULL, {_SQLITE_SUMMARY_COUNTS}
+                    FROM base GROUP BY marca
+                    UNION ALL
+                    SELECT 1, 1, 0, NULL, NULL, categoria, {_SQLITE_SUMMARY_COUNTS}
+                    FROM base GROUP BY categoria
+                """),
+                {"user_id": user_id}
+            )
+        rows = result.fetchall()
+
+        # Fila del grupo () = totales; el resto son conteos por tienda/marca/categoría
+        totales = next((r for r in rows if r.g_tienda and r.g_marca and r.g_categoria), None)
+        por_tienda, por_marca, por_categoria = [], [], []
+        for r in rows:
+            if not r.g_tienda:
+                por_tienda.append(ProductCountByValue(Valor=r.tienda, Cantidad=r.total))
+            elif not r.g_marca:
+                por_marca.append(ProductCountByValue(Valor=r.marca, Cantidad=r.total))
+            elif not r.g_categoria:
+                por_categoria.append(ProductCountByValue(Valor=r.categoria, Cantidad=r.total))
+
+        def _ordenar(conteos):
+            return sorted(conteos, key=lambda c: (-c.Cantidad, c.Valor or ""))
+
+        total = totales.total if totales else 0
+        activas = totales.activas if totales else 0
+        vencidas = totales.vencidas if totales else 0
+        return UserSummary(
+            TotalProductos=total,
+            GarantiasActivas=activas,
+            GarantiasVencidas=vencidas,
+            VencenEsteMes=totales.vencen_este_mes if totales else 0,
+            SinGarantia=total - activas - vencidas,
+            PorTienda=_ordenar(por_tienda),
+            PorMarca=_ordenar(por_marca),
+            PorCategoria=_ordenar(por_categoria)
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error al obtener resumen: {str(e)}")
+
 # Crear producto usando SP
 def create_product_wrapper(db: Session, product: Product):
     try:
@@ -89,7 +399,9 @@ def create_product_wrapper(db: Session, product: Product):
         if not created_product:
             raise HTTPException(status_code=400, detail="Error al crear producto")
             
-        return _convert_to_product_schema(created_product)
+        created = _convert_to_product_schema(created_product)
+        _after_product_write(created.UsuarioID, "creado", created.ProductoID, created)
+        return created
         
     except Exception as e:
         db.rollback()
@@ -130,6 +442,7 @@ def update_product(db: Session, product: Product):
         if not updated_product:
             raise HTTPException(status_code=404, detail="Producto no encontrado o sin permisos")
             
+        _after_product_write(product.UsuarioID, "actualizado", product.ProductoID)
         return _convert_to_product_schema(updated_product)
         
     except Exception as e:
@@ -157,6 +470,7 @@ def delete_product(db: Session, product_id: int, user_id: int):
         if not message:
             raise HTTPException(status_code=404, detail="Producto no encontrado o sin permisos")
             
+        _after_product_write(user_id, "eliminado", product_id)
         return {"message": message[0]}
         
     except Exception as e:
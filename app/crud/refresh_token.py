@@ -0,0 +1,140 @@
+from app.core.config import settings
+from app.core.security import generate_refresh_token, hash_refresh_token
+from app.db.session import SessionLocal
+from sqlalchemy.orm import Session
+from sqlalchemy import DateTime, text
+from fastapi import HTTPException
+from datetime import datetime, timedelta, timezone
+import uuid
+import logging
+
+logger = logging.getLogger(__name__)
+
+# ===== FUNCIÓN HELPER =====
+
+def _insert_refresh_token(db: Session, user_id: int, familia: str) -> str:
+    """Inserta un token nuevo (sin commit) y devuelve el valor en claro."""
+    token, token_hash = generate_refresh_token()
+    db.execute(
+        text("""
+            INSERT INTO refreshtokens (usuarioid, tokenhash, familia, revocado, fechaexpiracion)
+            VALUES (:user_id, :token_hash, :familia, false, :expira)
+        """),
+        {
+            "user_id": user_id,
+            "token_hash": token_hash,
+            "familia": familia,
+            "expira": datetime.now(timezone.utc) + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
+        }
+    )
+    return token
+
+# ===== FUNCIONES USADAS EN LA API =====
+
+# Emitir refresh token al hacer login (inicia una familia nueva)
+def issue_refresh_token(db: Session, user_id: int) -> str:
+    try:
+        token = _insert_refresh_token(db, user_id, uuid.uuid4().hex)
+        db.commit()
+        return token
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=f"Error al emitir refresh token: {str(e)}")
+
+# Rotar refresh token: una búsqueda indexada por hash, sin bcrypt
+def rotate_refresh_token(db: Session, token: str):
+    credenciales_invalidas = HTTPException(status_code=401, detail="Refresh token inválido o expirado")
+    try:
+        result = db.execute(
+            text("""
+                SELECT r.id, r.usuarioid, r.familia, r.revocado, r.fechaexpiracion,
+                       u.nombreusuario, u.email, u.fecharegistro
+                FROM refreshtokens r
+                JOIN usuarios u ON u.usuarioid = r.usuarioid
+                WHERE r.tokenhash = :token_hash
+            """).columns(fechaexpiracion=DateTime(timezone=True)),   # SQLite devuelve texto sin el tipo
+            {"token_hash": hash_refresh_token(token)}
+        )
+        row = result.fetchone()
+        if not row:
+            raise credenciales_invalidas
+
+        if row.revocado:
+            # Familia sin tokens vigentes: la sesión ya se cerró (logout, cambio de contraseña)
+            vigente = db.execute(
+                text("SELECT 1 FROM refreshtokens WHERE familia = :familia AND revocado = false"),
+                {"familia": row.familia}
+            ).first()
+            if vigente is None:
+                raise credenciales_invalidas
+            # Reutilización de un token ya rotado en una sesión activa: posible robo, se corta la sesión
+            logger.warning(f" Refresh token reutilizado (usuario {row.usuarioid}), familia revocada")
+            db.execute(
+                text("UPDATE refreshtokens SET revocado = true WHERE familia = :familia"),
+                {"familia": row.familia}
+            )
+            db.commit()
+            raise credenciales_invalidas
+
+        expira = row.fechaexpiracion
+        if expira.tzinfo is None:
+            expira = expira.replace(tzinfo=timezone.utc)
+        if expira <= datetime.now(timezone.utc):
+            raise credenciales_invalidas
+
+        # Update condicional: si dos peticiones usan el mismo token solo una gana
+        rotated = db.execute(
+            text("UPDATE refreshtokens SET revocado = true WHERE id = :id AND revocado = false"),
+            {"id": row.id}
+        )
+        if rotated.rowcount == 0:
+            db.rollback()
+            raise credenciales_invalidas
+
+        new_token = _insert_refresh_token(db, row.usuarioid, row.familia)
+        db.commit()
+
+        return new_token, {
+            "idUsuario": row.usuarioid,
+            "nombre": row.nombreusuario,
+            "correo": row.email,
+            "fechaRegistro": row.fecharegistro
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=f"Error al renovar sesión: {str(e)}")
+
+# Revocar todos los refresh tokens del usuario (sin commit, lo hace quien llama)
+def revoke_user_refresh_tokens(db: Session, user_id: int):
+    db.execute(
+        text("UPDATE refreshtokens SET revocado = true WHERE usuarioid = :user_id AND revocado = false"),
+        {"user_id": user_id}
+    )
+
+# Revocar la familia (sesión) a la que pertenece un refresh token (logout). Sin commit
+def revoke_refresh_family(db: Session, token: str):
+    db.execute(
+        text("""
+            UPDATE refreshtokens SET revocado = true
+            WHERE familia = (SELECT familia FROM refreshtokens WHERE tokenhash = :token_hash)
+        """),
+        {"token_hash": hash_refresh_token(token)}
+    )
+
+# Eliminar tokens expirados (tarea periódica)
+def purge_expired_refresh_tokens() -> int:
+    db = SessionLocal()
+    try:
+        result = db.execute(
+            text("DELETE FROM refreshtokens WHERE fechaexpiracion <= :ahora"),
+            {"ahora": datetime.now(timezone.utc)}
+        )
+        db.commit()
+        return result.rowcount
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
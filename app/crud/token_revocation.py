@@ -0,0 +1,83 @@
+from app.core.config import settings
+from app.core.revocation import revocation_list
+from app.db.session import SessionLocal
+from sqlalchemy.orm import Session
+from sqlalchemy import text
+from datetime import datetime, timedelta, timezone
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Se releen algunas filas anteriores al último id: un INSERT con id menor
+# puede confirmarse después de uno con id mayor
+SYNC_OVERLAP_IDS = 100
+
+# ===== FUNCIONES USADAS EN LA API =====
+
+# Revocar un access token puntual (logout). Sin commit, lo hace quien llama
+def revoke_access_token(db: Session, payload: dict):
+    expira = datetime.fromtimestamp(payload["exp"], tz=timezone.utc)
+    db.execute(
+        text("""
+            INSERT INTO tokensrevocados (jti, usuarioid, fechaexpiracion)
+            VALUES (:jti, :user_id, :expira)
+        """),
+        {"jti": payload["jti"], "user_id": payload["user_id"], "expira": expira}
+    )
+    # Efecto inmediato en este worker; los demás lo ven en la próxima sincronización
+    revocation_list.revoke_jti(payload["jti"], expira.timestamp())
+
+# Revocar todos los access tokens emitidos hasta ahora (sin commit)
+def revoke_all_user_tokens(db: Session, user_id: int):
+    ahora = datetime.now(timezone.utc)
+    expira = ahora + timedelta(minutes=settings.JWT_EXPIRE_MINUTES)
+    db.execute(
+        text("""
+            INSERT INTO tokensrevocados (usuarioid, emitidosantesde, fechaexpiracion)
+            VALUES (:user_id, :corte, :expira)
+        """),
+        {"user_id": user_id, "corte": ahora, "expira": expira}
+    )
+    revocation_list.revoke_user(user_id, ahora.timestamp(), expira.timestamp())
+
+# ===== TAREAS PERIÓDICAS =====
+
+# Traer revocaciones nuevas de otros workers (consulta por delta sobre la PK)
+def sync_revocations() -> int:
+    db = SessionLocal()
+    try:
+        result = db.execute(
+            text("""
+                SELECT id, jti, usuarioid, emitidosantesde, fechaexpiracion
+                FROM tokensrevocados
+                WHERE id > :desde AND fechaexpiracion > :ahora
+                ORDER BY id
+            """),
+            {
+                "desde": max(0, revocation_list.last_id - SYNC_OVERLAP_IDS),
+                "ahora": datetime.now(timezone.utc)
+            }
+        )
+        rows = result.fetchall()
+        for row in rows:
+            revocation_list.apply(row.id, row.jti, row.usuarioid, row.emitidosantesde, row.fechaexpiracion)
+        revocation_list.prune()
+        return len(rows)
+    finally:
+        db.close()
+
+# Eliminar filas cuyos tokens ya expiraron
+def purge_expired_revocations() -> int:
+    db = SessionLocal()
+    try:
+        result = db.execute(
+            text("DELETE FROM tokensrevocados WHERE fechaexpiracion <= :ahora"),
+            {"ahora": datetime.now(timezone.utc)}
+        )
+        db.commit()
+        return result.rowcount
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
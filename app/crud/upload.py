@@ -0,0 +1,293 @@
+from app.models.sesion_carga import SesionCarga
+from app.models.documento import Documento
+from app.models.producto import Producto
+from app.schemas.upload import UploadCreate, UploadStatus
+from app.schemas.documento import DocumentoRead
+from app.core.config import settings
+from app.core import storage, previews, events
+from app.core.response_cache import response_cache
+from app.db.session import SessionLocal
+from sqlalchemy.orm import Session
+from sqlalchemy import func, or_, update
+from fastapi import HTTPException
+from datetime import datetime, timedelta, timezone
+import uuid
+import logging
+
+logger = logging.getLogger(__name__)
+
+MB = 1024 * 1024
+
+# ===== FUNCIONES HELPER =====
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+def _new_expiration() -> datetime:
+    """Cada fragmento recibido extiende la vida de la carga."""
+    return _now() + timedelta(minutes=settings.UPLOAD_SESSION_TTL_MINUTES)
+
+def _convert_to_status(sesion: SesionCarga) -> UploadStatus:
+    return UploadStatus(
+        SesionID=sesion.sesionid,
+        ProductoID=sesion.productoid,
+        NombreArchivo=sesion.nombrearchivo,
+        TamanoTotal=sesion.tamanototal,
+        BytesRecibidos=sesion.bytesrecibidos,
+        FechaExpiracion=sesion.fechaexpiracion
+    )
+
+# Público: crud.product lo usa para los documentos de cada producto
+def convert_to_documento_schema(doc: Documento) -> DocumentoRead:
+    return DocumentoRead(
+        DocumentoID=doc.documentoid,
+        ProductoID=doc.productoid,
+        NombreArchivo=doc.nombrearchivo,
+        RutaArchivo=doc.rutaarchivo,
+        TamanoBytes=doc.tamanobytes,
+        HashContenido=doc.hashcontenido,
+        Miniaturas=[int(s) for s in (doc.miniaturas or "").split(",") if s]
+    )
+
+def _used_bytes(db: Session, user_id: int) -> int:
+    """Bytes ocupados por el usuario: documentos guardados + cargas activas reservadas."""
+    documentos = (
+        db.query(func.coalesce(func.sum(Documento.tamanobytes), 0))
+        .join(Producto, Producto.productoid == Documento.productoid)
+        .filter(Producto.usuarioid == user_id)
+        .scalar()
+    )
+    reservados = (
+        db.query(func.coalesce(func.sum(SesionCarga.tamanototal), 0))
+        .filter(SesionCarga.usuarioid == user_id)
+        .scalar()
+    )
+    return int(documentos) + int(reservados)
+
+# ===== FUNCIONES USADAS EN LA API =====
+
+# Obtener una carga activa del usuario
+def get_upload_session(db: Session, sesion_id: str, user_id: int) -> SesionCarga:
+    sesion = (
+        db.query(SesionCarga)
+        .filter(
+            SesionCarga.sesionid == sesion_id,
+            SesionCarga.usuarioid == user_id,
+            SesionCarga.fechaexpiracion > _now()
+        )
+        .first()
+    )
+    if not sesion:
+        raise HTTPException(status_code=404, detail="Carga no encontrada o expirada")
+    return sesion
+
+# Progreso de una carga
+def get_upload_status(db: Session, sesion_id: str, user_id: int) -> UploadStatus:
+    return _convert_to_status(get_upload_session(db, sesion_id, user_id))
+
+# Iniciar una carga reanudable (valida ownership del producto y cuotas)
+def create_upload_session(db: Session, data: UploadCreate, user_id: int) -> UploadStatus:
+    try:
+        if data.TamanoTotal > settings.UPLOAD_MAX_FILE_MB * MB:
+            raise HTTPException(status_code=413, detail="El archivo excede el tamaño máximo permitido")
+
+        producto = (
+            db.query(Producto.productoid)
+            .filter(Producto.productoid == data.ProductoID, Producto.usuarioid == user_id)
+            .first()
+        )
+        if not producto:
+            raise HTTPException(status_code=404, detail="Producto no encontrado")
+
+        activas = db.query(func.count(SesionCarga.sesionid)).filter(SesionCarga.usuarioid == user_id).scalar()
+        if activas >= settings.UPLOAD_MAX_SESSIONS_PER_USER:
+            raise HTTPException(status_code=429, detail="Demasiadas cargas activas, finaliza o cancela alguna")
+
+        if _used_bytes(db, user_id) + data.TamanoTotal > settings.UPLOAD_USER_QUOTA_MB * MB:
+            raise HTTPException(status_code=413, detail="Cuota de almacenamiento excedida")
+
+        sesion = SesionCarga(
+            sesionid=uuid.uuid4().hex,
+            usuarioid=user_id,
+            productoid=data.ProductoID,
+            nombrearchivo=data.NombreArchivo,
+            tamanototal=data.TamanoTotal,
+            bytesrecibidos=0,
+            fechaexpiracion=_new_expiration()
+        )
+        storage.create_partial_file(sesion.sesionid)
+        db.add(sesion)
+        db.commit()
+        return _convert_to_status(sesion)
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=f"Error al crear carga: {str(e)}")
+
+# Reservar el fragmento: update condicional sobre el offset, confirmado antes de
+# recibir el cuerpo (la petición perdedora recibe 409 y nunca escribe en el archivo)
+def claim_chunk(db: Session, sesion_id: str, user_id: int, offset: int) -> str:
+    reserva = uuid.uuid4().hex
+    ahora = _now()
+    try:
+        result = db.execute(
+            update(SesionCarga)
+            .where(
+                SesionCarga.sesionid == sesion_id,
+                SesionCarga.usuarioid == user_id,
+                SesionCarga.bytesrecibidos == offset,
+                # Una reserva vencida es de un worker que murió a mitad del fragmento
+                or_(SesionCarga.reservahasta.is_(None), SesionCarga.reservahasta < ahora)
+            )
+            .values(
+                reservafragmento=reserva,
+                reservahasta=ahora + timedelta(seconds=settings.UPLOAD_CHUNK_LEASE_SECONDS),
+                fechaexpiracion=_new_expiration()
+            )
+            # La comparación de fechas la resuelve la BD (SQLite devuelve fechas sin zona)
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount == 0:
+            db.rollback()
+            raise HTTPException(status_code=409, detail="La carga fue modificada por otra petición")
+        db.commit()
+        return reserva
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=f"Error al reservar fragmento: {str(e)}")
+
+# Registrar un fragmento ya escrito en el archivo parcial: avanza el offset y libera la reserva
+def record_chunk(db: Session, sesion_id: str, user_id: int, offset: int, written: int, reserva: str) -> UploadStatus:
+    try:
+        result = db.execute(
+            update(SesionCarga)
+            .where(
+                SesionCarga.sesionid == sesion_id,
+                SesionCarga.usuarioid == user_id,
+                SesionCarga.reservafragmento == reserva
+            )
+            .values(
+                bytesrecibidos=offset + written,
+                reservafragmento=None,
+                reservahasta=None,
+                fechaexpiracion=_new_expiration()
+            )
+        )
+        if result.rowcount == 0:
+            # Reserva vencida y tomada por otra petición, o carga cancelada
+            db.rollback()
+            raise HTTPException(status_code=409, detail="La carga fue modificada por otra petición")
+        db.commit()
+        return get_upload_status(db, sesion_id, user_id)
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=f"Error al registrar fragmento: {str(e)}")
+
+# Liberar la reserva de un fragmento que no se registrará (si falla, la reserva vence sola)
+def release_chunk(db: Session, sesion_id: str, reserva: str) -> None:
+    try:
+        db.execute(
+            update(SesionCarga)
+            .where(SesionCarga.sesionid == sesion_id, SesionCarga.reservafragmento == reserva)
+            .values(reservafragmento=None, reservahasta=None)
+        )
+        db.commit()
+    except Exception:
+        db.rollback()
+        logger.warning(f" No se pudo liberar la reserva de la carga {sesion_id}", exc_info=True)
+
+# Finalizar una carga: crea el Documento y mueve el archivo a su ruta definitiva
+def finalize_upload(db: Session, sesion_id: str, user_id: int) -> DocumentoRead:
+    sesion = get_upload_session(db, sesion_id, user_id)
+    if sesion.bytesrecibidos != sesion.tamanototal:
+        raise HTTPException(
+            status_code=409,
+            detail=f"Carga incompleta: {sesion.bytesrecibidos} de {sesion.tamanototal} bytes"
+        )
+
+    ruta_relativa = storage.final_relative_path(user_id, sesion.sesionid, sesion.nombrearchivo)
+    movido = False
+    try:
+        documento = Documento(
+            productoid=sesion.productoid,
+            nombrearchivo=sesion.nombrearchivo,
+            rutaarchivo=ruta_relativa,
+            tamanobytes=sesion.tamanototal
+        )
+        db.add(documento)
+        db.delete(sesion)
+        db.flush()
+
+        storage.promote_partial(sesion_id, ruta_relativa)
+        movido = True
+        db.commit()
+
+        # Las respuestas con include=documentos de este usuario quedan obsoletas
+        response_cache.invalidate_user(user_id)
+        events.publish(user_id, "documento", "creado", documento.documentoid, producto=documento.productoid)
+
+        # Miniaturas fuera del ciclo de la petición
+        previews.schedule_previews(documento.documentoid, ruta_relativa)
+        return convert_to_documento_schema(documento)
+
+    except Exception as e:
+        db.rollback()
+        if movido:
+            # Devolver el archivo a su lugar para poder reintentar la finalización
+            storage.demote_final(sesion_id, ruta_relativa)
+        raise HTTPException(status_code=500, detail=f"Error al finalizar carga: {str(e)}")
+
+# Cancelar una carga y liberar su cuota
+def cancel_upload(db: Session, sesion_id: str, user_id: int):
+    sesion = get_upload_session(db, sesion_id, user_id)
+    try:
+        db.delete(sesion)
+        db.commit()
+        storage.remove_session_files(sesion_id)
+        return {"message": "Carga cancelada"}
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=f"Error al cancelar carga: {str(e)}")
+
+# Ruta de la miniatura de un documento del usuario (None si no está disponible)
+def get_preview_path(db: Session, documento_id: int, user_id: int, size: int) -> str:
+    documento = (
+        db.query(Documento)
+        .join(Producto, Producto.productoid == Documento.productoid)
+        .filter(Documento.documentoid == documento_id, Producto.usuarioid == user_id)
+        .first()
+    )
+    if not documento:
+        raise HTTPException(status_code=404, detail="Documento no encontrado")
+    disponibles = [int(s) for s in (documento.miniaturas or "").split(",") if s]
+    if size not in disponibles:
+        raise HTTPException(status_code=404, detail="Vista previa no disponible")
+    return storage.absolute_path(
+        storage.preview_relative_path(documento.rutaarchivo, documento.hashcontenido, size)
+    )
+
+# Limpiar cargas abandonadas (se ejecuta periódicamente en segundo plano)
+def sweep_expired_uploads() -> int:
+    db = SessionLocal()
+    try:
+        expiradas = db.query(SesionCarga).filter(SesionCarga.fechaexpiracion <= _now()).all()
+        for sesion in expiradas:
+            storage.remove_session_files(sesion.sesionid)
+            db.delete(sesion)
+        db.commit()
+        if expiradas:
+            logger.info(f" {len(expiradas)} cargas expiradas eliminadas")
+        return len(expiradas)
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
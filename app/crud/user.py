@@ -3,15 +3,32 @@ from app.schemas.user import UserCreate, UserRead
 from sqlalchemy.orm import Session
 from sqlalchemy import text
 from fastapi import HTTPException
-from sqlalchemy.exc import IntegrityError
+from sqlalchemy.exc import DBAPIError
 from datetime import datetime
 from app.core.security import hash_password
+from app.crud.refresh_token import revoke_user_refresh_tokens
+from app.crud.token_revocation import revoke_all_user_tokens
+from app.db.session import SessionLocal
+from app.db import errors
+from app.crud.exceptions import EmailAlreadyRegistered, UserNotFound, from_db_error
+import logging
+
+logger = logging.getLogger(__name__)
 
 # ===== FUNCIONES ESENCIALES PARA LOGIN/REGISTER =====
 
 # Crear usuario usando función PostgreSQL (para REGISTER)
 def create_user(db: Session, user: UserCreate):
     try:
+        # Email repetido: se rechaza antes de pagar el hash (bcrypt es caro a propósito).
+        # La función de la BD sigue siendo la que garantiza la unicidad ante registros simultáneos;
+        # misma normalización que fn_createuser (guarda lower(trim(email)))
+        existente = db.execute(
+            text("SELECT 1 FROM usuarios WHERE email = lower(trim(:email))"), {"email": user.correo}
+        ).first()
+        if existente:
+            raise EmailAlreadyRegistered()
+
         # Hash de la contraseña
         hashed_password = hash_password(user.contrasena)
         
@@ -47,12 +64,22 @@ def create_user(db: Session, user: UserCreate):
             fechaRegistro=created_user.fecharegistro
         )
         
+    except HTTPException:
+        db.rollback()
+        raise
+    except DBAPIError as e:
+        db.rollback()
+        # fn_createuser avisa el email repetido con ERRCODE MB001 (from_db_error); sin la función,
+        # el UNIQUE de la tabla
+        if errors.classify(e) == errors.UNIQUE_VIOLATION:
+            raise EmailAlreadyRegistered() from e
+        # fn_createuser anterior: RAISE sin ERRCODE propio
+        if errors.is_raise_with(e, "ya está registrado"):
+            raise EmailAlreadyRegistered() from e
+        raise from_db_error(e) from e
     except Exception as e:
         db.rollback()
-        error_message = str(e)
-        if "ya está registrado" in error_message:
-            raise HTTPException(status_code=400, detail="El email ya está registrado")
-        raise HTTPException(status_code=500, detail=f"Error al crear usuario: {error_message}")
+        raise HTTPException(status_code=500, detail=f"Error al crear usuario: {str(e)}")
 
 # Buscar usuario para login usando función PostgreSQL
 def get_user_for_login(db: Session, email: str):
@@ -78,6 +105,25 @@ def get_user_for_login(db: Session, email: str):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error en autenticación: {str(e)}")
 
+# Rehashear la contraseña con el esquema/costo actual (tarea en segundo plano tras el login)
+def rehash_user_password(user_id: int, plain_password: str, old_hash: str):
+    db = SessionLocal()
+    try:
+        # Solo si el hash no cambió mientras tanto (ej: cambio de contraseña concurrente)
+        db.execute(
+            text("""
+                UPDATE usuarios SET contrasenahash = :nuevo
+                WHERE usuarioid = :user_id AND contrasenahash = :anterior
+            """),
+            {"nuevo": hash_password(plain_password), "user_id": user_id, "anterior": old_hash}
+        )
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Error al actualizar hash de contraseña del usuario {user_id}: {str(e)}")
+    finally:
+        db.close()
+
 # Cambiar contraseña usando función PostgreSQL
 def update_user_password(db: Session, user_id: int, new_password: str):
     try:
@@ -99,10 +145,15 @@ def update_user_password(db: Session, user_id: int, new_password: str):
         )
         
         updated_user = result.fetchone()
-        db.commit()
         
         if not updated_user:
-            raise HTTPException(status_code=404, detail="Usuario no encontrado")
+            db.rollback()
+            raise UserNotFound()
+
+        # Cerrar las sesiones: los refresh y access tokens emitidos dejan de servir
+        revoke_user_refresh_tokens(db, user_id)
+        revoke_all_user_tokens(db, user_id)
+        db.commit()
             
         return UserRead(
             idUsuario=updated_user.usuarioid,
@@ -111,12 +162,18 @@ def update_user_password(db: Session, user_id: int, new_password: str):
             fechaRegistro=updated_user.fecharegistro
         )
         
+    except HTTPException:
+        raise
+    except DBAPIError as e:
+        db.rollback()
+        # fn_updateuserpassword avisa el usuario inexistente con ERRCODE MB002 -> UserNotFound;
+        # la versión anterior, con RAISE sin ERRCODE propio
+        if errors.is_raise_with(e, "no encontrado"):
+            raise UserNotFound() from e
+        raise from_db_error(e) from e
     except Exception as e:
         db.rollback()
-        error_message = str(e)
-        if "no encontrado" in error_message:
-            raise HTTPException(status_code=404, detail="Usuario no encontrado")
-        raise HTTPException(status_code=500, detail=f"Error al actualizar contraseña: {error_message}")
+        raise HTTPException(status_code=500, detail=f"Error al actualizar contraseña: {str(e)}")
 
 # Eliminar usuario y sus datos relacionados
 def delete_user(db: Session, user_id: int):
@@ -127,12 +184,29 @@ def delete_user(db: Session, user_id: int):
             raise HTTPException(status_code=404, detail="Usuario no encontrado")
         
         # Eliminar el usuario y todos sus datos relacionados (cascada)
+        db.execute(text("DELETE FROM refreshtokens WHERE usuarioid = :user_id"), {"user_id": user_id})
+        revoke_all_user_tokens(db, user_id)
         db.delete(user)
         db.commit()
         
+    except HTTPException:
+        raise
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=f"Error al eliminar usuario: {str(e)}")
+
+# Eliminar la cuenta del usuario autenticado (devuelve un resumen de lo eliminado)
+def delete_user_account(db: Session, user_id: int):
+    try:
+        productos = db.execute(
+            text("SELECT COUNT(*) FROM productos WHERE usuarioid = :user_id"),
+            {"user_id": user_id}
+        ).scalar()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error al eliminar cuenta: {str(e)}")
+
+    delete_user(db, user_id)
+    return {"productos_eliminados": productos}
         
 # Obtener lista de usuarios (para administración)
 def get_users_list(db: Session):
@@ -200,6 +274,8 @@ def update_user(db: Session, user_id: int, user: UserCreate):
         u.email = user.correo
         if user.contrasena:
             u.contrasenahash = hash_password(user.contrasena)
+            revoke_user_refresh_tokens(db, user_id)
+            revoke_all_user_tokens(db, user_id)
         
         db.commit()
         db.refresh(u)
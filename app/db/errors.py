@@ -0,0 +1,133 @@
+"""
+Clasificación de errores de la base de datos por código, no por texto.
+
+Cada driver informa un código estable e independiente del idioma del
+servidor: SQLSTATE en psycopg (`sqlstate` / `diag.sqlstate`) y pyodbc
+(`args[0]`, más el número nativo de SQL Server en el mensaje), y el código
+extendido en sqlite3 (`sqlite_errorcode`). `classify` lo traduce a una
+categoría con búsquedas en tablas precalculadas: exacta y luego por clase
+(los dos primeros caracteres del SQLSTATE).
+
+Las funciones de usuarios avisan cada error de negocio con su propio código
+(`RAISE EXCEPTION ... USING ERRCODE = 'MB001'`), así un RAISE de otro origen
+no se confunde con ellos:
+- MB001: email ya registrado (fn_createuser)
+- MB002: usuario inexistente (fn_updateuserpassword)
+Un P0001 sin código propio queda como RAISE_EXCEPTION genérico (500).
+
+Mientras la base siga con las versiones anteriores de esas funciones (RAISE
+sin ERRCODE), los CRUD reconocen su P0001 por el mensaje con
+`is_raise_with` (ver app/crud/user.py).
+"""
+
+import re
+from typing import Optional
+
+# Categorías
+UNIQUE_VIOLATION = "unique_violation"
+FOREIGN_KEY_VIOLATION = "foreign_key_violation"
+NOT_NULL_VIOLATION = "not_null_violation"
+CHECK_VIOLATION = "check_violation"
+INTEGRITY = "integrity"
+RAISE_EXCEPTION = "raise_exception"
+EMAIL_TAKEN = "email_taken"
+USER_NOT_FOUND = "user_not_found"
+CONNECTION = "connection"
+TIMEOUT = "timeout"
+SERIALIZATION = "serialization"
+DEADLOCK = "deadlock"
+LOCKED = "locked"
+UNDEFINED_OBJECT = "undefined_object"
+DATA = "data"
+RESOURCES = "resources"
+UNKNOWN = "unknown"
+
+# SQLSTATE exacto (PostgreSQL y ODBC)
+_BY_SQLSTATE = {
+    "23505": UNIQUE_VIOLATION,
+    "23503": FOREIGN_KEY_VIOLATION,
+    "23502": NOT_NULL_VIOLATION,
+    "23514": CHECK_VIOLATION,
+    "P0001": RAISE_EXCEPTION,
+    "MB001": EMAIL_TAKEN,        # Códigos propios de las funciones de la app
+    "MB002": USER_NOT_FOUND,
+    "57014": TIMEOUT,            # query_canceled (statement_timeout)
+    "HYT00": TIMEOUT,            # ODBC: timeout de consulta
+    "HYT01": TIMEOUT,            # ODBC: timeout de conexión
+    "57P01": CONNECTION,         # admin_shutdown (failover, reinicio)
+    "57P02": CONNECTION,         # crash_shutdown
+    "57P03": CONNECTION,         # cannot_connect_now
+    "40001": SERIALIZATION,      # En SQL Server también el deadlock (1205)
+    "40P01": DEADLOCK,
+    "55P03": LOCKED,             # lock_not_available
+    "42P01": UNDEFINED_OBJECT,   # undefined_table
+    "42883": UNDEFINED_OBJECT,   # undefined_function
+    "42S02": UNDEFINED_OBJECT,   # ODBC: tabla no encontrada
+}
+
+# Clase del SQLSTATE (dos primeros caracteres)
+_BY_CLASS = {
+    "08": CONNECTION,
+    "23": INTEGRITY,
+    "40": SERIALIZATION,
+    "22": DATA,
+    "53": RESOURCES,
+}
+
+# SQL Server: el SQLSTATE 23000 agrupa todas las restricciones; el número nativo las separa
+_BY_MSSQL_NATIVE = {
+    2627: UNIQUE_VIOLATION,
+    2601: UNIQUE_VIOLATION,
+    547: FOREIGN_KEY_VIOLATION,
+    515: NOT_NULL_VIOLATION,
+    1205: DEADLOCK,
+    50000: RAISE_EXCEPTION,      # RAISERROR/THROW de un procedimiento
+}
+_MSSQL_NATIVE_RE = re.compile(r"\((\d+)\)\s*\(SQL\w+\)")   # "... (2627) (SQLExecDirectW)"
+
+# sqlite3: códigos extendidos (Python >= 3.11) y primarios
+_BY_SQLITE_CODE = {
+    2067: UNIQUE_VIOLATION,      # SQLITE_CONSTRAINT_UNIQUE
+    1555: UNIQUE_VIOLATION,      # SQLITE_CONSTRAINT_PRIMARYKEY
+    787: FOREIGN_KEY_VIOLATION,  # SQLITE_CONSTRAINT_FOREIGNKEY
+    1299: NOT_NULL_VIOLATION,    # SQLITE_CONSTRAINT_NOTNULL
+    275: CHECK_VIOLATION,        # SQLITE_CONSTRAINT_CHECK
+    19: INTEGRITY,               # SQLITE_CONSTRAINT
+    5: LOCKED,                   # SQLITE_BUSY
+    6: LOCKED,                   # SQLITE_LOCKED
+}
+
+def _driver_error(error: Exception) -> Exception:
+    """El error original del driver (SQLAlchemy lo envuelve en `.orig`)."""
+    return getattr(error, "orig", None) or error
+
+def sqlstate(error: Exception) -> Optional[str]:
+    """SQLSTATE del error del driver (psycopg 3, psycopg2 o pyodbc), si lo informa."""
+    orig = _driver_error(error)
+    code = getattr(orig, "sqlstate", None) or getattr(orig, "pgcode", None)
+    if code is None and type(orig).__module__ == "pyodbc" and orig.args:
+        code = orig.args[0]
+    return code if isinstance(code, str) else None
+
+def classify(error: Exception) -> str:
+    """Categoría del error (constantes de este módulo); UNKNOWN si el driver no da código."""
+    orig = _driver_error(error)
+    sqlite_code = getattr(orig, "sqlite_errorcode", None)
+    if sqlite_code is not None:
+        return _BY_SQLITE_CODE.get(sqlite_code) or _BY_SQLITE_CODE.get(sqlite_code & 0xFF, UNKNOWN)
+
+    code = sqlstate(orig)
+    if code is None:
+        return UNKNOWN
+    if code == "23000" and len(orig.args) > 1:
+        match = _MSSQL_NATIVE_RE.search(str(orig.args[1]))
+        if match:
+            return _BY_MSSQL_NATIVE.get(int(match.group(1)), INTEGRITY)
+    return _BY_SQLSTATE.get(code) or _BY_CLASS.get(code[:2], UNKNOWN)
+
+def is_raise_with(error: Exception, texto: str) -> bool:
+    """
+    P0001 cuyo mensaje contiene `texto`: errores de negocio de las funciones
+    anteriores a MB001/MB002. Se quita cuando estén desplegadas en todas las bases.
+    """
+    return classify(error) == RAISE_EXCEPTION and texto in str(_driver_error(error))
@@ -0,0 +1,215 @@
+"""
+Resiliencia ante caídas de la base de datos (failover, reinicios, red).
+
+- Reintentos: una lectura idempotente (SELECT/WITH, sp_Get*) que falla por un
+  error de CONEXIÓN se repite hasta DB_RETRY_ATTEMPTS veces con espera
+  exponencial y jitter. Solo si la lectura abría la transacción: reintentar
+  a mitad de una transacción repetiría (o perdería) lo anterior. Escrituras,
+  errores de datos y timeouts de sentencia no se reintentan.
+- Circuit breaker: tras DB_BREAKER_FAILURE_THRESHOLD errores de conexión
+  seguidos se deja de intentar durante DB_BREAKER_OPEN_SECONDS; las peticiones
+  reciben 503 con Retry-After al instante en vez de ocupar un hilo y una
+  conexión del pool hasta el timeout. Luego pasa una petición de prueba
+  (half-open): si funciona se cierra, si no vuelve a abrirse.
+- Timeouts: DB_STATEMENT_TIMEOUT_MS y DB_CONNECT_TIMEOUT_SECONDS se aplican
+  al abrir cada conexión (sin consultas extra por petición).
+
+Se engancha a las sesiones con el evento `do_orm_execute` (cubre db.execute
+y db.query), así los CRUD no cambian: DatabaseUnavailable es un
+HTTPException y atraviesa su `except HTTPException: raise`. La espera entre
+reintentos es un time.sleep: los endpoints async llaman a los CRUD con
+run_in_threadpool. Si una sesión se usa directo en el event loop no se
+reintenta (dormir ahí frenaría a todas las peticiones del worker).
+"""
+
+import asyncio
+import logging
+import random
+import re
+import threading
+import time
+
+from fastapi import HTTPException
+from sqlalchemy import event
+from sqlalchemy.exc import DBAPIError, InterfaceError, OperationalError
+
+from app.core.config import settings
+from app.core.metrics import counter, gauge
+from app.db import errors
+
+logger = logging.getLogger(__name__)
+
+DB_CONNECTION_ERRORS = counter("db_connection_errors_total", "Errores de conexión con la base de datos")
+DB_RETRIES = counter("db_retries_total", "Reintentos de lecturas por errores de conexión", ["result"])
+DB_BREAKER_REJECTED = counter("db_breaker_rejected_total", "Peticiones rechazadas con el circuito abierto")
+DB_BREAKER_TRANSITIONS = counter("db_breaker_transitions_total", "Cambios de estado del circuito", ["state"])
+DB_STATEMENT_TIMEOUTS = counter("db_statement_timeouts_total", "Sentencias canceladas por DB_STATEMENT_TIMEOUT_MS")
+
+# Lecturas que se pueden repetir sin efectos (las fn_ de usuarios que escriben quedan fuera)
+_READ_RE = re.compile(r"^\s*(?:(?:SELECT|WITH)\b|EXEC\s+sp_Get)", re.I)
+_WRITE_RE = re.compile(r"\bfn_(?:create|update|delete)\w*|\bFOR\s+UPDATE\b|\b(?:INSERT|UPDATE|DELETE)\s", re.I)
+
+class DatabaseUnavailable(HTTPException):
+    """503 con Retry-After: la base no responde (circuito abierto o reintentos agotados)."""
+
+    def __init__(self, retry_after: float):
+        super().__init__(
+            status_code=503,
+            detail="Base de datos temporalmente no disponible, intenta nuevamente",
+            headers={"Retry-After": str(max(1, int(retry_after + 0.999)))},
+        )
+
+def is_connection_error(error: Exception) -> bool:
+    """La conexión se perdió o no se pudo abrir (no un error de la consulta)."""
+    if isinstance(error, DBAPIError) and error.connection_invalidated:
+        return True
+    if not isinstance(error, (OperationalError, InterfaceError)):
+        return False
+    if errors.sqlstate(error) is not None:
+        return errors.classify(error) == errors.CONNECTION
+    # Sin SQLSTATE el servidor no llegó a responder (rechazo, DNS, timeout de conexión);
+    # en SQLite los OperationalError son de la consulta o del archivo, no de red
+    return not type(getattr(error, "orig", error)).__module__.startswith("sqlite3")
+
+class CircuitBreaker:
+    """Cerrado -> abierto tras N fallas seguidas -> half-open (una prueba) -> cerrado."""
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, failure_threshold: int, open_seconds: float):
+        self.failure_threshold = failure_threshold
+        self.open_seconds = open_seconds
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    def retry_after(self) -> float:
+        return max(0.0, self.opened_at + self.open_seconds - time.monotonic())
+
+    def before_call(self):
+        """Lanza DatabaseUnavailable si el circuito no deja pasar esta llamada."""
+        if self.state == self.CLOSED:
+            return
+        with self._lock:
+            if self.state == self.OPEN and self.retry_after() <= 0:
+                self._transition(self.HALF_OPEN)
+            if self.state == self.HALF_OPEN and not self._trial_running:
+                self._trial_running = True   # Esta llamada es la prueba
+                return
+            if self.state == self.CLOSED:
+                return
+        DB_BREAKER_REJECTED.inc()
+        raise DatabaseUnavailable(self.retry_after() or 1)
+
+    def record_success(self):
+        if self.state == self.CLOSED and self.failures == 0:
+            return
+        with self._lock:
+            self.failures = 0
+            self._trial_running = False
+            if self.state != self.CLOSED:
+                self._transition(self.CLOSED)
+                logger.info(" Base de datos disponible nuevamente, circuito cerrado")
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_running = False
+            if self.state == self.HALF_OPEN or (
+                self.state == self.CLOSED and self.failures >= self.failure_threshold
+            ):
+                self.opened_at = time.monotonic()
+                self._transition(self.OPEN)
+                logger.error(f" Circuito de BD abierto por {self.open_seconds}s tras {self.failures} errores de conexión")
+
+    def release_trial(self):
+        """La prueba terminó sin tocar la red (ej: error de datos): otra llamada puede probar."""
+        with self._lock:
+            self._trial_running = False
+
+    def _transition(self, state: str):
+        self.state = state
+        DB_BREAKER_TRANSITIONS.inc(state=state)
+
+breaker = CircuitBreaker(settings.DB_BREAKER_FAILURE_THRESHOLD, settings.DB_BREAKER_OPEN_SECONDS)
+
+gauge("db_breaker_open", "1 si el circuito de la BD está abierto o en prueba",
+      func=lambda: 0 if breaker.state == CircuitBreaker.CLOSED else 1)
+
+def is_idempotent_read(statement) -> bool:
+    """SELECT sin FOR UPDATE ni funciones que escriben (se evalúa solo tras un error)."""
+    sql = str(statement)
+    return bool(_READ_RE.match(sql)) and not _WRITE_RE.search(sql)
+
+def backoff_seconds(attempt: int) -> float:
+    """Full jitter: uniforme entre 0 y base * 2^intento (los workers no reintentan a la vez)."""
+    return random.uniform(0, settings.DB_RETRY_BASE_DELAY_MS / 1000 * (2 ** attempt))
+
+def _on_event_loop() -> bool:
+    """El hilo actual está corriendo un event loop (no se puede bloquear con sleep)."""
+    try:
+        asyncio.get_running_loop()
+        return True
+    except RuntimeError:
+        return False
+
+def _on_execute(orm_execute_state):
+    """Ejecuta la sentencia bajo el circuit breaker, reintentando lecturas idempotentes."""
+    session = orm_execute_state.session
+    # Solo si la sentencia abre la transacción (no hay nada previo que se perdería)
+    abre_transaccion = not session.in_transaction()
+    intento = 0
+    while True:
+        breaker.before_call()
+        try:
+            result = orm_execute_state.invoke_statement()
+        except DBAPIError as e:
+            if errors.classify(e) == errors.TIMEOUT:
+                DB_STATEMENT_TIMEOUTS.inc()
+            if not is_connection_error(e):
+                breaker.release_trial()
+                raise
+            DB_CONNECTION_ERRORS.inc()
+            breaker.record_failure()
+            intento += 1
+            retryable = (
+                abre_transaccion
+                and is_idempotent_read(orm_execute_state.statement)
+                and not _on_event_loop()
+            )
+            if not retryable or intento >= settings.DB_RETRY_ATTEMPTS:
+                if retryable:
+                    DB_RETRIES.inc(result="exhausted")
+                raise DatabaseUnavailable(breaker.retry_after() or 1) from e
+            logger.warning(f" Error de conexión con la BD, reintento {intento}: {str(e.orig)}")
+            session.rollback()   # Descarta la conexión invalidada; la lectura abre otra transacción
+            time.sleep(backoff_seconds(intento - 1))
+            continue
+        except Exception:
+            breaker.release_trial()
+            raise
+        breaker.record_success()
+        if intento:
+            DB_RETRIES.inc(result="recovered")
+        return result
+
+def install(session_factory, engine):
+    """Registra reintentos/circuit breaker en las sesiones y timeouts en las conexiones nuevas."""
+    event.listen(session_factory, "do_orm_execute", _on_execute)
+
+    if engine.dialect.name == "mssql" and settings.DB_STATEMENT_TIMEOUT_MS > 0:
+        @event.listens_for(engine, "connect")
+        def _query_timeout(dbapi_connection, connection_record):
+            # pyodbc: timeout de consulta en segundos por conexión
+            dbapi_connection.timeout = max(1, settings.DB_STATEMENT_TIMEOUT_MS // 1000)
+
+def connect_args(database_url: str) -> dict:
+    """Timeouts de conexión y de sentencia del motor (se aplican en el handshake, sin round trips)."""
+    if database_url.startswith("postgresql"):
+        args = {"connect_timeout": settings.DB_CONNECT_TIMEOUT_SECONDS}
+        if settings.DB_STATEMENT_TIMEOUT_MS > 0:
+            args["options"] = f"-c statement_timeout={settings.DB_STATEMENT_TIMEOUT_MS}"
+        return args
+    return {}
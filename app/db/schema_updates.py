@@ -0,0 +1,51 @@
+"""
+Columnas agregadas a tablas existentes.
+
+create_all crea las tablas que faltan pero no cambia las que ya existen: en
+una base creada con una versión anterior las columnas nuevas de los modelos
+no están y toda consulta que las use falla. Se agregan (con sus índices) al
+iniciar el servidor con upgrade_existing_tables(), antes de crear los índices
+del resto de los modelos.
+
+- PostgreSQL: ADD COLUMN IF NOT EXISTS (seguro con varios workers a la vez).
+- SQLite (pruebas/benchmarks): no tiene IF NOT EXISTS, se revisa PRAGMA table_info.
+"""
+
+import logging
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+# (tabla, columna, tipo)
+_NEW_COLUMNS = [
+    ("documentos", "tamanobytes", "BIGINT"),
+    ("documentos", "hashcontenido", "VARCHAR(64)"),
+    ("documentos", "miniaturas", "VARCHAR(50)"),
+    ("sesionescarga", "reservafragmento", "VARCHAR(32)"),
+    ("sesionescarga", "reservahasta", "TIMESTAMP WITH TIME ZONE"),
+]
+
+# Índices sobre esas columnas (mismo nombre que genera el modelo, así create() los encuentra)
+_NEW_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS ix_documentos_hashcontenido ON documentos (hashcontenido)",
+]
+
+def upgrade_existing_tables(engine: Engine) -> None:
+    """Agrega a las tablas existentes las columnas nuevas de los modelos."""
+    dialecto = engine.dialect.name
+    if dialecto not in ("postgresql", "sqlite"):
+        logger.warning(f" Columnas nuevas no verificadas en {dialecto}")
+        return
+    with engine.begin() as conn:
+        for tabla, columna, tipo in _NEW_COLUMNS:
+            if dialecto == "postgresql":
+                conn.execute(text(f"ALTER TABLE {tabla} ADD COLUMN IF NOT EXISTS {columna} {tipo}"))
+                continue
+            existentes = {fila[1] for fila in conn.execute(text(f"PRAGMA table_info({tabla})"))}
+            if columna not in existentes:
+                conn.execute(text(f"ALTER TABLE {tabla} ADD COLUMN {columna} {tipo}"))
+                logger.info(f" Columna {tabla}.{columna} agregada")
+        for statement in _NEW_INDEXES:
+            conn.execute(text(statement))
@@ -0,0 +1,94 @@
+"""
+Índices de búsqueda de texto completo sobre productos.
+
+- PostgreSQL: columna generada `busqueda` (tsvector ponderado) con índice GIN.
+- SQLite (pruebas/benchmarks): tabla virtual FTS5 sincronizada con triggers.
+
+Las columnas no forman parte del modelo Producto porque dependen del motor;
+se crean al iniciar el servidor con setup_product_search().
+"""
+
+import logging
+import re
+from typing import List
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+# Nombre más relevante que marca/modelo, luego tienda y por último notas
+_POSTGRES_DDL = [
+    """
+    ALTER TABLE productos ADD COLUMN IF NOT EXISTS busqueda tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('spanish', coalesce(nombreproducto, '')), 'A') ||
+        setweight(to_tsvector('spanish', coalesce(marca, '') || ' ' || coalesce(modelo, '')), 'B') ||
+        setweight(to_tsvector('spanish', coalesce(tienda, '')), 'C') ||
+        setweight(to_tsvector('spanish', coalesce(notas, '')), 'D')
+    ) STORED
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_productos_busqueda ON productos USING GIN (busqueda)",
+]
+
+_SQLITE_DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS productos_fts USING fts5(
+        nombreproducto, marca, modelo, tienda, notas,
+        content='productos', content_rowid='productoid',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS productos_fts_ai AFTER INSERT ON productos BEGIN
+        INSERT INTO productos_fts(rowid, nombreproducto, marca, modelo, tienda, notas)
+        VALUES (new.productoid, new.nombreproducto, new.marca, new.modelo, new.tienda, new.notas);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS productos_fts_ad AFTER DELETE ON productos BEGIN
+        INSERT INTO productos_fts(productos_fts, rowid, nombreproducto, marca, modelo, tienda, notas)
+        VALUES ('delete', old.productoid, old.nombreproducto, old.marca, old.modelo, old.tienda, old.notas);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS productos_fts_au AFTER UPDATE ON productos BEGIN
+        INSERT INTO productos_fts(productos_fts, rowid, nombreproducto, marca, modelo, tienda, notas)
+        VALUES ('delete', old.productoid, old.nombreproducto, old.marca, old.modelo, old.tienda, old.notas);
+        INSERT INTO productos_fts(rowid, nombreproducto, marca, modelo, tienda, notas)
+        VALUES (new.productoid, new.nombreproducto, new.marca, new.modelo, new.tienda, new.notas);
+    END
+    """,
+]
+
+def setup_product_search(engine: Engine) -> None:
+    """Crea (si no existen) la columna/tabla e índices de búsqueda."""
+    ddl = {"postgresql": _POSTGRES_DDL, "sqlite": _SQLITE_DDL}.get(engine.dialect.name)
+    if ddl is None:
+        logger.warning(f" Búsqueda de texto no soportada en {engine.dialect.name}")
+        return
+    try:
+        with engine.begin() as conn:
+            nueva_fts = engine.dialect.name == "sqlite" and conn.execute(
+                text("SELECT 1 FROM sqlite_master WHERE name = 'productos_fts'")
+            ).first() is None
+            for statement in ddl:
+                conn.execute(text(statement))
+            if nueva_fts:
+                # Indexar productos que existían antes de crear la tabla FTS
+                conn.execute(text("INSERT INTO productos_fts(productos_fts) VALUES ('rebuild')"))
+    except Exception as e:
+        # Sin permisos de DDL o SQLite compilado sin FTS5: la API sigue funcionando
+        logger.error(f" No se pudo preparar la búsqueda de productos: {str(e)}")
+
+def search_terms(query: str) -> List[str]:
+    """Palabras de la consulta del usuario (sin operadores ni comillas)."""
+    return re.findall(r"\w+", query.lower())[:10]
+
+def postgres_tsquery(terms: List[str]) -> str:
+    """'sam tel' -> 'sam:* & tel:*' (coincidencia por prefijo mientras se escribe)."""
+    return " & ".join(f"{t}:*" for t in terms)
+
+def sqlite_match(terms: List[str]) -> str:
+    """'sam tel' -> '"sam"* "tel"*' (AND implícito en FTS5)."""
+    return " ".join(f'"{t}"*' for t in terms)
@@ -1,29 +1,48 @@
+import logging
 from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from app.core.config import settings
 from typing import Generator
+from starlette.requests import HTTPConnection
+from app.db import resilience
 
 # Usamos directamente la DATABASE_URL que es leída desde Render
 SQLALCHEMY_DATABASE_URL = settings.SQLALCHEMY_DATABASE_URL
 
-# Crear el motor de SQLAlchemy con SSL
+# Opciones de conexión según el motor: SSL para PostgreSQL (obligatorio para
+# conexiones externas en Render); SQLite (benchmarks/pruebas locales) no las acepta
+if SQLALCHEMY_DATABASE_URL.startswith("sqlite"):
+    _connect_args = {"check_same_thread": False, "timeout": 30}
+else:
+    _connect_args = {"sslmode": settings.DB_SSLMODE, **resilience.connect_args(SQLALCHEMY_DATABASE_URL)}
+
+# Crear el motor de SQLAlchemy
 engine = create_engine(
     SQLALCHEMY_DATABASE_URL,
     pool_pre_ping=True,
-    echo=True,
-    connect_args={"sslmode": "require"}  # 🔹 obligatorio para conexiones externas en Render
+    connect_args=_connect_args
 )
+if settings.DB_ECHO:
+    # Mismo efecto que echo=True, pero por el pipeline de logs (cola, JSON, request_id)
+    logging.getLogger("sqlalchemy.engine").setLevel(logging.INFO)
 
 # Crear la sesión
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Reintentos de lecturas, circuit breaker y timeouts (app/db/resilience.py)
+resilience.install(SessionLocal, engine)
 
 # Base para los modelos
 Base = declarative_base()
 
 # Dependencia para obtener la sesión de la base de datos (inyección de dependencias de FastAPI)
-def get_db() -> Generator:
+def get_db(connection: HTTPConnection) -> Generator:
     """Proporciona una sesión de base de datos y la cierra al finalizar."""
+    # Sub-peticiones de POST /batch que comparten la sesión del lote
+    shared = connection.scope.get("state", {}).get("batch_db")
+    if shared is not None:
+        yield shared
+        return
     db = SessionLocal()
     try:
         yield db
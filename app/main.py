@@ -1,31 +1,116 @@
-from fastapi import FastAPI
-from app.api.v1 import user, product
+import asyncio
+from contextlib import asynccontextmanager
+
+from fastapi import Depends, FastAPI
+from fastapi.responses import JSONResponse, PlainTextResponse
+from app.api.v1 import user, product, upload, batch, events
+from app.api.dependencies import require_internal_access
+from app.core.config import settings
 from app.core.middleware import setup_middleware
 from app.core.error_handlers import setup_exception_handlers
+from app.core.background import start_periodic_task, stop_periodic_tasks
+from app.core.previews import shutdown_previews
+from app.core.events import start_event_listener, stop_event_listener
+from app.core.metrics import render_metrics
+from app.core import startup, health, shutdown, logs
 from app.db.session import engine, Base
 
 # Funcion Para Crear Tablas
 def create_tables():
     """
     Función que crea todas las tablas de SQLAlchemy en la base de datos de PostgreSQL.
-    Se ejecuta al iniciar el servidor (on_startup).
+    Se ejecuta al iniciar el servidor (lifespan, en segundo plano).
     """
     print("Intentando crear tablas en la base de datos...")
 
     """Importar Modelos para que Base.metadata los conozca"""
-    from app.models import user, categoria, producto, documento, producto_categoria
+    from app.models import user, categoria, producto, documento, producto_categoria, sesion_carga, refresh_token, token_revocado, clave_idempotencia
     # Base.metadata contiene la definición de todas tus clases modelo
     Base.metadata.create_all(bind=engine)
+    # create_all tampoco agrega columnas nuevas a tablas que ya existían
+    from app.db.schema_updates import upgrade_existing_tables
+    upgrade_existing_tables(engine)
+    # create_all no agrega índices nuevos a tablas que ya existían
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
     print("Tablas creadas exitosamente o ya existentes.")
 
+    # Índices de búsqueda de texto (dependen del motor, no están en los modelos)
+    from app.db.search import setup_product_search
+    setup_product_search(engine)
+
+# Funcion Para Iniciar Tareas En Segundo Plano
+def start_background_tasks():
+    """Inicia limpiezas periódicas, el reintento de miniaturas y la sincronización de revocaciones."""
+    from app.crud.upload import sweep_expired_uploads
+    from app.core.previews import retry_pending_previews
+    from app.crud.refresh_token import purge_expired_refresh_tokens
+    from app.crud.token_revocation import sync_revocations, purge_expired_revocations
+    from app.crud.idempotency import purge_expired_idempotency_keys
+    start_periodic_task("limpieza-cargas", settings.UPLOAD_SWEEP_INTERVAL_SECONDS, sweep_expired_uploads)
+    start_periodic_task("miniaturas-pendientes", settings.PREVIEW_RETRY_INTERVAL_SECONDS, retry_pending_previews)
+    start_periodic_task("limpieza-refresh-tokens", 3600, purge_expired_refresh_tokens)
+    start_periodic_task("limpieza-revocaciones", 3600, purge_expired_revocations)
+    start_periodic_task("limpieza-idempotencia", 3600, purge_expired_idempotency_keys)
+    # Revocaciones vigentes: la carga inicial es un paso del arranque, luego deltas de otros workers
+    start_periodic_task("sync-revocaciones", settings.REVOCATION_SYNC_SECONDS, sync_revocations)
+
+async def load_revocations():
+    """
+    Carga inicial de revocaciones. Si falla queda en /health/status (ultimo_error)
+    y la tarea periódica sync-revocaciones reintenta.
+    """
+    from app.crud.token_revocation import sync_revocations
+    await startup.timed_step("load_revocations", sync_revocations)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    El worker acepta conexiones de inmediato (vivo); tablas, pool y revocaciones
+    se preparan en paralelo en segundo plano y recién entonces queda listo.
+    Al apagar: drena peticiones, detiene tareas y cierra el pool (app/core/shutdown.py).
+    """
+    init = asyncio.create_task(startup.run_startup(
+        {
+            "create_tables": create_tables,
+            "warm_pool": lambda: startup.warm_pool(engine, settings.DB_POOL_WARM_CONNECTIONS),
+            "warm_imports": startup.warm_imports,
+        },
+        # Las revocaciones se leen cuando la tabla ya existe
+        after_ready=[
+            load_revocations,
+            start_background_tasks,
+            start_event_listener,
+        ],
+    ), name="arranque")
+    app.state.startup_task = init
+    shutdown.state.reset()
+    shutdown.install_signal_handlers()   # SIGTERM: deja de estar listo antes de que el servidor drene
+    yield
+    # Si el servidor no drenó (o no avisó la señal), se espera aquí con el mismo plazo
+    await shutdown.drain(settings.SHUTDOWN_DRAIN_SECONDS)
+    shutdown.restore_signal_handlers()
+    init.cancel()
+    await asyncio.gather(init, return_exceptions=True)
+    await stop_periodic_tasks()
+    await stop_event_listener()
+    shutdown_previews()
+    shutdown.flush_logs()
+    # Cierra las conexiones del pool en vez de dejarlas al timeout de PostgreSQL
+    engine.dispose()
+
 # Crear aplicación FastAPI
 app = FastAPI(
     title="MisBoletas API",
     description="API optimizada para gestión de productos, garantías y boletas.",
     version="1.0.0",
-    on_startup=[create_tables]  # Crear tablas al iniciar el servidor
+    lifespan=lifespan  # Crear tablas e iniciar tareas al iniciar el servidor
 )
 
+# Logs JSON escritos desde un hilo, con X-Request-ID y muestreo (app/core/logs.py)
+logs.setup_logging()
+
 # Configurar middleware (CORS, logging, etc.)
 setup_middleware(app)
 
@@ -35,6 +120,9 @@ setup_exception_handlers(app)
 # Registrar routers de endpoints ESENCIALES
 app.include_router(user.router, prefix="/api/v1", tags=["Usuarios"])
 app.include_router(product.router, prefix="/api/v1", tags=["Productos"])
+app.include_router(upload.router, prefix="/api/v1", tags=["Documentos"])
+app.include_router(batch.router, prefix="/api/v1", tags=["Lotes"])
+app.include_router(events.router, prefix="/api/v1", tags=["Eventos"])
 
 @app.get("/")
 
@@ -44,4 +132,28 @@ async def root():
         "message": "MisBoletas API",
         "version": "1.0.0",
         "docs": "/docs"
-    }
\ No newline at end of file
+    }
+
+@app.get("/health/live", include_in_schema=False)
+async def health_live():
+    """Liveness: el proceso responde (sin I/O)."""
+    return {"estado": "vivo"}
+
+@app.get("/health/ready", include_in_schema=False)
+async def health_ready():
+    """Readiness: arranque completo, BD respondiendo (ping cacheado) y pool sin saturar."""
+    listo, detalle = await health.readiness()
+    if not listo:
+        return JSONResponse(status_code=503, content=detalle)
+    return detalle
+
+@app.get("/health/status", include_in_schema=False, dependencies=[Depends(require_internal_access)])
+async def health_status():
+    """Estado interno: pool, cachés, ejecutores y tiempos del arranque."""
+    return await health.status()
+
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False,
+         dependencies=[Depends(require_internal_access)])
+async def metrics():
+    """Métricas del worker en formato Prometheus."""
+    return render_metrics()
@@ -8,4 +8,8 @@ from .user import Usuario
 from .categoria import Categoria
 from .producto import Producto
 from .documento import Documento
-__all__ = ["Usuario", "Categoria", "Producto", "Documento"]
\ No newline at end of file
+from .sesion_carga import SesionCarga
+from .refresh_token import RefreshToken
+from .token_revocado import TokenRevocado
+from .clave_idempotencia import ClaveIdempotencia
+__all__ = ["Usuario", "Categoria", "Producto", "Documento", "SesionCarga", "RefreshToken", "TokenRevocado", "ClaveIdempotencia"]
\ No newline at end of file
@@ -12,7 +12,7 @@ class Categoria(Base):
     
     # Campos exactamente como en el esquema PostgreSQL
     id = Column(Integer, primary_key=True)
-    productoid = Column(Integer, ForeignKey('productos.productoid', ondelete='CASCADE'))
+    productoid = Column(Integer, ForeignKey('productos.productoid', ondelete='CASCADE'), index=True)
     categoria = Column(String(100))
     
     # Relación con el producto
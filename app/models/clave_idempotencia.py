@@ -0,0 +1,32 @@
+"""
+Modelo SQLAlchemy para la tabla ClavesIdempotencia.
+Guarda la primera respuesta de cada POST con cabecera Idempotency-Key
+para devolverla tal cual si el cliente reintenta.
+"""
+
+from sqlalchemy import Column, Integer, String, Text, LargeBinary, DateTime, UniqueConstraint
+from sqlalchemy.sql import func
+from app.db.session import Base
+
+class ClaveIdempotencia(Base):
+    __tablename__ = "clavesidempotencia"
+
+    id = Column(Integer, primary_key=True)
+
+    # Quién y dónde: "u<usuarioid>" o "anon", más método y ruta (ej: "u7 POST /api/v1/products")
+    alcance = Column(String(255), nullable=False)
+    clave = Column(String(255), nullable=False)
+
+    # SHA-256 del cuerpo: la misma clave con otro cuerpo es un error del cliente
+    huellapeticion = Column(String(64), nullable=False)
+
+    # NULL mientras la petición original sigue en curso
+    estado = Column(Integer)
+    cabeceras = Column(Text)          # JSON con las cabeceras a repetir (content-type, location)
+    cuerpo = Column(LargeBinary)
+
+    fechacreacion = Column(DateTime(timezone=True), server_default=func.now())
+    fechaexpiracion = Column(DateTime(timezone=True), nullable=False, index=True)
+
+    # Una búsqueda por (alcance, clave) y protección contra inserciones duplicadas
+    __table_args__ = (UniqueConstraint("alcance", "clave", name="uq_clavesidempotencia_alcance_clave"),)
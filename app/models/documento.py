@@ -3,7 +3,7 @@ Modelo SQLAlchemy para la tabla Documentos.
 Define documentos adjuntos a productos
 """
 
-from sqlalchemy import Column, Integer, String, ForeignKey
+from sqlalchemy import Column, Integer, String, BigInteger, ForeignKey
 from sqlalchemy.orm import relationship
 from app.db.session import Base
 
@@ -12,9 +12,12 @@ class Documento(Base):
     
     # Clave Primaria Autoincremental
     documentoid = Column(Integer, primary_key=True, index=True)
-    productoid = Column(Integer, ForeignKey("productos.productoid", ondelete='CASCADE'))
+    productoid = Column(Integer, ForeignKey("productos.productoid", ondelete='CASCADE'), index=True)
     nombrearchivo = Column(String(255))
     rutaarchivo = Column(String)
+    tamanobytes = Column(BigInteger)                     # Usado para la cuota por usuario
+    hashcontenido = Column(String(64), index=True)       # sha256, NULL mientras no se procesa
+    miniaturas = Column(String(50))                      # Tamaños generados ("160,640"), vacío si no aplica
     
     # Relación con el producto
     producto = relationship("Producto", back_populates="documentos")
@@ -23,7 +23,7 @@ class Producto(Base):
     notas = Column(Text)                                    
     
     # Clave Foránea al Usuario
-    usuarioid = Column(Integer, ForeignKey("usuarios.usuarioid", ondelete="CASCADE"), nullable=False)
+    usuarioid = Column(Integer, ForeignKey("usuarios.usuarioid", ondelete="CASCADE"), nullable=False, index=True)
     
     # Relaciones (Relationships)
     # Relación uno-a-muchos: El producto pertenece a un solo usuario
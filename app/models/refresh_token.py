@@ -0,0 +1,25 @@
+"""
+Modelo SQLAlchemy para la tabla RefreshTokens.
+Guarda el hash de los refresh tokens rotativos emitidos en el login.
+"""
+
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey
+from sqlalchemy.sql import func
+from app.db.session import Base
+
+class RefreshToken(Base):
+    __tablename__ = "refreshtokens"
+
+    id = Column(Integer, primary_key=True)
+    usuarioid = Column(Integer, ForeignKey("usuarios.usuarioid", ondelete="CASCADE"), nullable=False, index=True)
+
+    # SHA-256 del token: único e indexado, /auth/refresh es una sola búsqueda
+    tokenhash = Column(String(64), unique=True, nullable=False)
+
+    # Todos los tokens de una misma sesión (login) comparten familia;
+    # si se reutiliza uno ya rotado se revoca la familia completa
+    familia = Column(String(32), nullable=False, index=True)
+
+    revocado = Column(Boolean, nullable=False, default=False)
+    fechacreacion = Column(DateTime(timezone=True), server_default=func.now())
+    fechaexpiracion = Column(DateTime(timezone=True), nullable=False)
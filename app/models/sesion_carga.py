@@ -0,0 +1,28 @@
+"""
+Modelo SQLAlchemy para la tabla SesionesCarga.
+Guarda el progreso de las cargas reanudables de documentos.
+"""
+
+from sqlalchemy import Column, Integer, String, BigInteger, DateTime, ForeignKey
+from sqlalchemy.sql import func
+from app.db.session import Base
+
+class SesionCarga(Base):
+    __tablename__ = "sesionescarga"
+
+    # Identificador opaco que recibe el cliente (uuid hex)
+    sesionid = Column(String(32), primary_key=True)
+    usuarioid = Column(Integer, ForeignKey("usuarios.usuarioid", ondelete="CASCADE"), nullable=False, index=True)
+    productoid = Column(Integer, ForeignKey("productos.productoid", ondelete="CASCADE"), nullable=False)
+
+    # Datos del archivo y progreso
+    nombrearchivo = Column(String(255), nullable=False)
+    tamanototal = Column(BigInteger, nullable=False)
+    bytesrecibidos = Column(BigInteger, nullable=False, default=0)
+
+    # Fragmento en curso: solo quien tiene la reserva escribe en el archivo parcial
+    reservafragmento = Column(String(32))
+    reservahasta = Column(DateTime(timezone=True))
+
+    fechacreacion = Column(DateTime(timezone=True), server_default=func.now())
+    fechaexpiracion = Column(DateTime(timezone=True), nullable=False, index=True)
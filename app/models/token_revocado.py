@@ -0,0 +1,26 @@
+"""
+Modelo SQLAlchemy para la tabla TokensRevocados.
+Registra access tokens revocados (logout) y revocaciones masivas por usuario
+(cambio de contraseña, eliminación de cuenta). Los workers la leen por deltas.
+"""
+
+from sqlalchemy import Column, Integer, String, DateTime
+from sqlalchemy.sql import func
+from app.db.session import Base
+
+class TokenRevocado(Base):
+    __tablename__ = "tokensrevocados"
+
+    # Autoincremental: los workers piden solo las filas con id mayor al último visto
+    id = Column(Integer, primary_key=True)
+
+    # Token puntual (claim jti) o NULL si se revocan todos los del usuario
+    jti = Column(String(32))
+    usuarioid = Column(Integer, nullable=False)   # Sin FK: debe sobrevivir a la eliminación del usuario
+
+    # Revocación masiva: tokens emitidos antes de esta fecha dejan de valer
+    emitidosantesde = Column(DateTime(timezone=True))
+
+    # Cuándo expiran naturalmente los tokens afectados (después la fila sobra)
+    fechaexpiracion = Column(DateTime(timezone=True), nullable=False, index=True)
+    fecharevocacion = Column(DateTime(timezone=True), server_default=func.now())
@@ -0,0 +1,21 @@
+from pydantic import BaseModel, Field
+from typing import Any, List, Literal, Optional
+
+# Schema de una sub-petición dentro de POST /batch
+class BatchItem(BaseModel):
+    Id: Optional[str] = Field(None, max_length=100)       # Opcional, se devuelve en el resultado
+    Metodo: Literal["GET", "POST", "PUT", "DELETE"] = "GET"
+    Ruta: str = Field(..., min_length=1, max_length=2000)  # Ej: "/api/v1/products?fields=NombreProducto"
+    Cuerpo: Optional[Any] = None                           # JSON para POST/PUT
+
+class BatchRequest(BaseModel):
+    Peticiones: List[BatchItem] = Field(..., min_length=1, max_length=20)
+
+# Resultado de cada sub-petición, en el mismo orden que se pidieron
+class BatchItemResult(BaseModel):
+    Id: Optional[str] = None
+    Estado: int                 # Código HTTP de la sub-petición
+    Cuerpo: Any = None
+
+class BatchResponse(BaseModel):
+    Resultados: List[BatchItemResult]
@@ -0,0 +1,15 @@
+from pydantic import BaseModel
+from typing import Optional, List
+
+# Schema para LEER documentos adjuntos a un producto
+class DocumentoRead(BaseModel):
+    DocumentoID: int
+    ProductoID: int
+    NombreArchivo: Optional[str] = None
+    RutaArchivo: Optional[str] = None
+    TamanoBytes: Optional[int] = None
+    HashContenido: Optional[str] = None
+    Miniaturas: List[int] = []       # Tamaños disponibles en GET /documents/{id}/preview
+
+    class Config:
+        from_attributes = True
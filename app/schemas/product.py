@@ -1,6 +1,9 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, TypeAdapter, create_model
 from datetime import date
-from typing import Optional
+from functools import lru_cache
+from typing import Optional, List, Tuple
+
+from app.schemas.documento import DocumentoRead
 
 # ===== SCHEMAS CORREGIDOS - SIN CONFUSIÓN =====
 
@@ -19,6 +22,95 @@ class ProductRead(BaseModel):
     class Config:
         from_attributes = True
 
+# Schema para resultados de búsqueda paginados (ordenados por relevancia)
+class ProductSearchResult(BaseModel):
+    Resultados: List[ProductRead]
+    Limite: int
+    Desplazamiento: int
+    HayMas: bool
+
+# Schema para sugerencias de autocompletado (marca, tienda, modelo)
+class ProductSuggestions(BaseModel):
+    Campo: str
+    Prefijo: str
+    Sugerencias: List[str]
+
+# Schemas para el resumen del home (GET /me/summary)
+class ProductCountByValue(BaseModel):
+    Valor: Optional[str] = None     # None = sin tienda/marca/categoría
+    Cantidad: int
+
+class UserSummary(BaseModel):
+    TotalProductos: int
+    GarantiasActivas: int
+    GarantiasVencidas: int
+    VencenEsteMes: int
+    SinGarantia: int
+    PorTienda: List[ProductCountByValue]
+    PorMarca: List[ProductCountByValue]
+    PorCategoria: List[ProductCountByValue]
+
+# ===== CAMPOS PARCIALES (fields=) Y RELACIONES (include=) =====
+
+# Campo de ProductRead -> columna de la tabla productos
+PRODUCT_FIELD_COLUMNS = {
+    "ProductoID": "productoid",
+    "NombreProducto": "nombreproducto",
+    "FechaCompra": "fechacompra",
+    "DuracionGarantia": "duraciongarantia",
+    "Marca": "marca",
+    "Modelo": "modelo",
+    "Tienda": "tienda",
+    "Notas": "notas",
+    "UsuarioID": "usuarioid",
+}
+PRODUCT_INCLUDES = ("documentos", "categorias")
+
+# Forma de la respuesta con fields=/include= (solo para la documentación OpenAPI):
+# ProductoID siempre viene, el resto solo si se pidió
+class ProductSparse(BaseModel):
+    ProductoID: int
+    NombreProducto: Optional[str] = None
+    FechaCompra: Optional[date] = None
+    DuracionGarantia: Optional[int] = None
+    Marca: Optional[str] = None
+    Modelo: Optional[str] = None
+    Tienda: Optional[str] = None
+    Notas: Optional[str] = None
+    UsuarioID: Optional[int] = None
+    Documentos: Optional[List[DocumentoRead]] = None    # include=documentos
+    Categorias: Optional[List[str]] = None              # include=categorias
+
+@lru_cache(maxsize=256)
+def product_partial_model(fields: Tuple[str, ...], include: Tuple[str, ...]) -> type:
+    """Modelo con solo los campos pedidos; se genera una vez por combinación."""
+    definiciones = {
+        name: (ProductRead.model_fields[name].annotation, ProductRead.model_fields[name])
+        for name in fields
+    }
+    if "documentos" in include:
+        definiciones["Documentos"] = (List[DocumentoRead], [])
+    if "categorias" in include:
+        definiciones["Categorias"] = (List[str], [])
+    return create_model("ProductPartial_" + "_".join(fields + include), **definiciones)
+
+@lru_cache(maxsize=256)
+def product_partial_adapter(fields: Tuple[str, ...], include: Tuple[str, ...]) -> TypeAdapter:
+    """Serializador de List[modelo parcial], reutilizado entre peticiones."""
+    return TypeAdapter(List[product_partial_model(fields, include)])
+
+# Schemas para obtener varios productos por ID (POST /products/batch-get)
+class ProductBatchRequest(BaseModel):
+    IDs: List[int] = Field(..., min_length=1, max_length=500)
+
+class ProductWithRelations(ProductRead):
+    Documentos: List[DocumentoRead] = []
+    Categorias: List[str] = []
+
+class ProductBatchResult(BaseModel):
+    Productos: List[ProductWithRelations]     # En el mismo orden que los IDs pedidos
+    NoEncontrados: List[int]                  # No existen o son de otro usuario
+
 # Schema para CREAR productos (sin ID, campos obligatorios)
 class ProductCreate(BaseModel):
     NombreProducto: str = Field(..., min_length=1, max_length=255)
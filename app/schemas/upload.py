@@ -0,0 +1,19 @@
+from pydantic import BaseModel, Field
+from datetime import datetime
+
+# ===== SCHEMAS PARA CARGAS REANUDABLES =====
+
+# Schema para INICIAR una carga (el cliente declara el tamaño total)
+class UploadCreate(BaseModel):
+    ProductoID: int
+    NombreArchivo: str = Field(..., min_length=1, max_length=255)
+    TamanoTotal: int = Field(..., gt=0)
+
+# Schema para consultar el progreso de una carga
+class UploadStatus(BaseModel):
+    SesionID: str
+    ProductoID: int
+    NombreArchivo: str
+    TamanoTotal: int
+    BytesRecibidos: int
+    FechaExpiracion: datetime
@@ -25,9 +25,20 @@ class UserLogin(BaseModel):
 # Schema para respuesta de login (con token)
 class LoginResponse(BaseModel):
     access_token: str
+    refresh_token: str
     token_type: str
     user: UserRead
 
+# Schema para renovar la sesión con un refresh token
+class RefreshRequest(BaseModel):
+    refresh_token: str
+
+# Schema para respuesta de renovación (el refresh token anterior queda revocado)
+class RefreshResponse(BaseModel):
+    access_token: str
+    refresh_token: str
+    token_type: str
+
 # Schema para cambiar contraseña
 class PasswordChangeRequest(BaseModel):
     nueva_contrasena: str
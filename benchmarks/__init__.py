@@ -0,0 +1,3 @@
+"""
+Benchmarks de la API contra una base de datos local (ver benchmarks/run.py).
+"""
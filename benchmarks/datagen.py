@@ -0,0 +1,258 @@
+"""
+Generador de datos sintéticos: usuarios, productos, documentos y categorías.
+
+La cantidad de productos por usuario sigue una distribución Zipf (muchos
+usuarios con pocos productos, unos pocos con cientos), con marcas, tiendas,
+fechas de compra y meses de garantía verosímiles. Misma semilla = mismos datos.
+
+Escribe por lotes: `COPY ... FROM STDIN` en PostgreSQL (psycopg) y
+`executemany` en los demás motores. Los IDs se asignan en el cliente
+(a partir del máximo existente) para no tener que leerlos de vuelta, así
+que no debe haber otras escrituras en esas tablas mientras corre.
+
+Uso:
+    python -m benchmarks.datagen --users 1000000                 # Base de Settings (.env)
+    python -m benchmarks.datagen --users 200000 --db-url postgresql+psycopg://... --seed 7
+    python -m benchmarks.datagen --users 5000 --db-url sqlite:///datos.db --create-schema
+
+Todos los usuarios tienen la contraseña DATAGEN_PASSWORD.
+"""
+
+import argparse
+import bisect
+import itertools
+import json
+import os
+import random
+import sys
+import time
+from datetime import date, datetime, timedelta, timezone
+
+DATAGEN_PASSWORD = "Datos-1234"
+
+MARCAS = [
+    "Samsung", "LG", "Sony", "Apple", "Xiaomi", "Philips", "Bosch", "HP", "Lenovo", "Mabe",
+    "Huawei", "Motorola", "Oster", "Thomas", "Electrolux", "Whirlpool", "Asus", "Acer", "JBL", "Nintendo",
+]
+TIENDAS = [
+    "Falabella", "Ripley", "Paris", "Lider", "Hites", "PC Factory", "Sodimac", "Easy", "Jumbo", "Mercado Libre",
+]
+# (producto, categoría, garantías típicas en meses)
+TIPOS = [
+    ("Televisor", "Electrónica", [12, 24]),
+    ("Refrigerador", "Línea blanca", [12, 24, 36]),
+    ("Lavadora", "Línea blanca", [12, 24]),
+    ("Microondas", "Cocina", [6, 12]),
+    ("Notebook", "Computación", [12, 24]),
+    ("Celular", "Telefonía", [12]),
+    ("Audífonos", "Electrónica", [3, 6, 12]),
+    ("Aspiradora", "Hogar", [6, 12]),
+    ("Cafetera", "Cocina", [6, 12]),
+    ("Consola", "Entretención", [12]),
+    ("Impresora", "Computación", [12]),
+    ("Bicicleta", "Deportes", [6, 12, 60]),
+]
+NOMBRES = ["Camila", "Matías", "Valentina", "Benjamín", "Javiera", "Vicente", "Fernanda", "Tomás", "Catalina", "Diego"]
+APELLIDOS = ["González", "Muñoz", "Rojas", "Díaz", "Pérez", "Soto", "Contreras", "Silva", "Martínez", "Sepúlveda"]
+
+class Zipf:
+    """Muestreo de k en [0, maximo] con P(k) ∝ (k + 1)^-s (CDF precalculada)."""
+
+    def __init__(self, s: float, maximo: int):
+        pesos = [(k + 1) ** -s for k in range(maximo + 1)]
+        total = sum(pesos)
+        self.cdf = list(itertools.accumulate(p / total for p in pesos))
+
+    def sample(self, rng: random.Random) -> int:
+        return min(bisect.bisect_left(self.cdf, rng.random()), len(self.cdf) - 1)
+
+# ===== GENERACIÓN =====
+
+def _usuario(rng, usuarioid: int, password_hash: str, email_prefix: str, registro_desde: datetime) -> dict:
+    return {
+        "usuarioid": usuarioid,
+        "nombreusuario": f"{rng.choice(NOMBRES)} {rng.choice(APELLIDOS)}",
+        "email": f"{email_prefix}{usuarioid}@datos.misboletas.cl",
+        "contrasenahash": password_hash,
+        "fecharegistro": registro_desde + timedelta(seconds=rng.randint(0, 3 * 365 * 86400)),
+    }
+
+def _producto(rng, productoid: int, usuarioid: int, hoy: date) -> tuple:
+    tipo, categoria, garantias = rng.choice(TIPOS)
+    marca = rng.choice(MARCAS)
+    # Compras recientes más frecuentes: la mayoría de garantías siguen vigentes
+    dias = int(rng.expovariate(1 / 365)) % (6 * 365)
+    fila = {
+        "productoid": productoid,
+        "nombreproducto": f"{tipo} {marca}",
+        "fechacompra": hoy - timedelta(days=dias),
+        "duraciongarantia": rng.choice(garantias) if rng.random() > 0.05 else None,
+        "marca": marca,
+        "modelo": f"{marca[:2].upper()}-{rng.randint(100, 9999)}",
+        "tienda": rng.choice(TIENDAS),
+        "notas": "" if rng.random() < 0.7 else f"Comprado en oferta, boleta {rng.randint(10**5, 10**6)}",
+        "usuarioid": usuarioid,
+    }
+    return fila, categoria
+
+def _documento(rng, documentoid: int, productoid: int) -> dict:
+    extension = rng.choice(["pdf", "pdf", "jpg", "png"])
+    return {
+        "documentoid": documentoid,
+        "productoid": productoid,
+        "nombrearchivo": f"boleta_{documentoid}.{extension}",
+        "rutaarchivo": f"{productoid}/boleta_{documentoid}.{extension}",
+        "tamanobytes": rng.randint(30_000, 4_000_000),
+        "hashcontenido": f"{rng.getrandbits(256):064x}",
+        "miniaturas": "160,640" if extension != "pdf" else "",
+    }
+
+# ===== ESCRITURA =====
+
+def _columnas(table) -> list:
+    return [c.name for c in table.columns]
+
+def _escribir(conn, table, filas: list):
+    """Inserta filas (dicts) con COPY en PostgreSQL o executemany en otros motores."""
+    if not filas:
+        return
+    if conn.dialect.name == "postgresql":
+        columnas = _columnas(table)
+        # Solo las columnas presentes; el resto toma su valor por defecto
+        columnas = [c for c in columnas if c in filas[0]]
+        cursor = conn.connection.driver_connection.cursor()
+        with cursor.copy(f"COPY {table.name} ({', '.join(columnas)}) FROM STDIN") as copy:
+            for fila in filas:
+                copy.write_row([fila[c] for c in columnas])
+        cursor.close()
+    else:
+        conn.execute(table.insert(), filas)
+
+def _siguiente_id(conn, table, columna: str) -> int:
+    from sqlalchemy import text
+    return (conn.execute(text(f"SELECT MAX({columna}) FROM {table.name}")).scalar() or 0) + 1
+
+def _ajustar_secuencias(conn):
+    """En PostgreSQL las secuencias no avanzan con IDs explícitos: se alinean al máximo."""
+    from sqlalchemy import text
+    if conn.dialect.name != "postgresql":
+        return
+    for tabla, columna in [("usuarios", "usuarioid"), ("productos", "productoid"),
+                           ("documentos", "documentoid"), ("productocategorias", "id")]:
+        conn.execute(text(
+            f"SELECT setval(pg_get_serial_sequence('{tabla}', '{columna}'), "
+            f"COALESCE((SELECT MAX({columna}) FROM {tabla}), 0) + 1, false)"
+        ))
+
+def generate(engine, users: int, zipf_s: float = 1.5, max_products: int = 500,
+             docs_per_product: float = 0.8, seed: int = 42, batch_size: int = 50_000,
+             password: str = DATAGEN_PASSWORD, email_prefix: str = "u", progress=None) -> dict:
+    """
+    Genera e inserta `users` usuarios con sus productos, documentos y categorías.
+    Devuelve el conteo de filas por tabla, el rango de IDs de usuario y el tiempo.
+    """
+    from app.core.security import hash_password
+    from app.models import Usuario, Producto, Documento, Categoria
+
+    rng = random.Random(seed)
+    zipf = Zipf(zipf_s, max_products)
+    password_hash = hash_password(password)   # Un solo hash: bcrypt es caro a propósito
+    hoy = date(2026, 1, 1)                     # Fija: los datos no dependen del día en que se generan
+    registro_desde = datetime(2023, 1, 1, tzinfo=timezone.utc)
+
+    with engine.begin() as conn:
+        usuario_id = _siguiente_id(conn, Usuario.__table__, "usuarioid")
+        producto_id = _siguiente_id(conn, Producto.__table__, "productoid")
+        documento_id = _siguiente_id(conn, Documento.__table__, "documentoid")
+        categoria_id = _siguiente_id(conn, Categoria.__table__, "id")
+    primer_usuario = usuario_id
+
+    conteo = {"usuarios": 0, "productos": 0, "documentos": 0, "productocategorias": 0}
+    inicio = time.perf_counter()
+    pendientes = users
+    while pendientes > 0:
+        # Un lote = usuarios hasta juntar ~batch_size filas (las FK quedan dentro del lote)
+        usuarios, productos, documentos, categorias = [], [], [], []
+        while pendientes > 0 and len(productos) + len(usuarios) < batch_size:
+            usuarios.append(_usuario(rng, usuario_id, password_hash, email_prefix, registro_desde))
+            for _ in range(zipf.sample(rng)):
+                fila, categoria = _producto(rng, producto_id, usuario_id, hoy)
+                productos.append(fila)
+                if rng.random() < 0.6:
+                    categorias.append({"id": categoria_id, "productoid": producto_id, "categoria": categoria})
+                    categoria_id += 1
+                # Poisson aproximada con la media pedida
+                while rng.random() < docs_per_product / (1 + docs_per_product):
+                    documentos.append(_documento(rng, documento_id, producto_id))
+                    documento_id += 1
+                producto_id += 1
+            usuario_id += 1
+            pendientes -= 1
+
+        with engine.begin() as conn:
+            _escribir(conn, Usuario.__table__, usuarios)
+            _escribir(conn, Producto.__table__, productos)
+            _escribir(conn, Documento.__table__, documentos)
+            _escribir(conn, Categoria.__table__, categorias)
+        conteo["usuarios"] += len(usuarios)
+        conteo["productos"] += len(productos)
+        conteo["documentos"] += len(documentos)
+        conteo["productocategorias"] += len(categorias)
+        if progress:
+            progress(conteo, time.perf_counter() - inicio)
+
+    with engine.begin() as conn:
+        _ajustar_secuencias(conn)
+
+    elapsed = time.perf_counter() - inicio
+    return {
+        "filas": conteo,
+        "usuarios_ids": [primer_usuario, usuario_id - 1],
+        "segundos": round(elapsed, 2),
+        "filas_por_segundo": round(sum(conteo.values()) / elapsed) if elapsed > 0 else 0,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Genera datos sintéticos para MisBoletas")
+    parser.add_argument("--users", type=int, required=True, help="Usuarios a generar")
+    parser.add_argument("--zipf", type=float, default=1.5, help="Exponente Zipf de productos por usuario")
+    parser.add_argument("--max-products", type=int, default=500, help="Máximo de productos de un usuario")
+    parser.add_argument("--docs-per-product", type=float, default=0.8, help="Documentos promedio por producto")
+    parser.add_argument("--seed", type=int, default=42, help="Semilla (misma semilla = mismos datos)")
+    parser.add_argument("--batch-size", type=int, default=50_000, help="Filas por transacción")
+    parser.add_argument("--db-url", help="URL de la base (def: la de Settings / .env)")
+    parser.add_argument("--create-schema", action="store_true", help="Crea tablas e índices de búsqueda antes")
+    parser.add_argument("--analyze", action="store_true", help="Actualiza estadísticas del planificador al terminar")
+    args = parser.parse_args()
+
+    if args.db_url:
+        # Misma resolución que la app: ENV=render usa DATABASE_URL
+        os.environ["ENV"] = "render"
+        os.environ["DATABASE_URL"] = args.db_url
+        os.environ.setdefault("SECRET_KEY", "datagen")
+    os.environ.setdefault("DB_ECHO", "false")
+
+    from sqlalchemy import text
+    from app.db.session import engine
+
+    if args.create_schema:
+        from app.main import create_tables
+        create_tables()
+
+    def progress(conteo, segundos):
+        total = sum(conteo.values())
+        print(f"  {conteo['usuarios']:>10} usuarios  {total:>12} filas  {total / segundos:>10.0f} filas/s",
+              file=sys.stderr)
+
+    resultado = generate(
+        engine, args.users, args.zipf, args.max_products, args.docs_per_product,
+        args.seed, args.batch_size, progress=progress
+    )
+    if args.analyze:
+        with engine.begin() as conn:
+            conn.execute(text("ANALYZE"))
+    print(json.dumps(resultado, indent=2))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
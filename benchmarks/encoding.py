@@ -0,0 +1,177 @@
+"""
+Bytes en la red y CPU por petición de GET /products según la codificación.
+
+Crea un usuario con N productos (notas largas y variadas, como las que escribe
+la app) y pide la lista completa R veces con cada combinación de formato
+(JSON, MessagePack) y compresión (ninguna, gzip, brotli). La caché de
+respuestas queda caliente: se mide la codificación, no la consulta.
+
+- bytes:   cuerpo tal como sale del servidor (sin descomprimir en el cliente).
+- cpu_ms:  tiempo de CPU del proceso por petición (servidor y cliente ASGI en
+           proceso); `extra_cpu_ms` lo compara con JSON sin comprimir.
+           `uncached_*`: lo mismo codificando en cada petición
+           (ENCODING_CACHE_MAX_MB=0), como con respuestas que no se repiten.
+
+Con --levels imprime además tamaño y tiempo de cada nivel de gzip y brotli
+sobre el mismo cuerpo, para elegir COMPRESSION_GZIP_LEVEL y
+COMPRESSION_BROTLI_QUALITY.
+
+Uso:
+    python -m benchmarks.encoding
+    python -m benchmarks.encoding --products 500 --requests 300 --levels
+"""
+
+import argparse
+import asyncio
+import gzip
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+
+from benchmarks import harness
+from benchmarks.datagen import MARCAS, TIENDAS, TIPOS
+from benchmarks.run import percentile
+
+VARIANTS = [
+    ("json", "application/json", "identity"),
+    ("json+gzip", "application/json", "gzip"),
+    ("json+br", "application/json", "br"),
+    ("msgpack", "application/msgpack", "identity"),
+    ("msgpack+gzip", "application/msgpack", "gzip"),
+    ("msgpack+br", "application/msgpack", "br"),
+]
+
+_FRASES = [
+    "Comprado en oferta con {pct}% de descuento, boleta {boleta}.",
+    "La garantía extendida cubre {meses} meses adicionales con el servicio técnico de {marca}.",
+    "Retiro en tienda {tienda}, sucursal {sucursal}.",
+    "Se pagó en {cuotas} cuotas sin interés con tarjeta terminada en {tarjeta}.",
+    "Número de serie {serie}; guardar la caja original para un eventual cambio.",
+    "El vendedor indicó que la primera mantención es gratuita dentro del primer año.",
+    "Contacto del servicio técnico: +56 9 {fono}.",
+]
+
+def _notas(rng: random.Random) -> str:
+    frases = rng.sample(_FRASES, rng.randint(2, 5))
+    return " ".join(f.format(
+        pct=rng.randint(5, 40), boleta=rng.randint(10**5, 10**7), meses=rng.choice([12, 24, 36]),
+        marca=rng.choice(MARCAS), tienda=rng.choice(TIENDAS), sucursal=rng.randint(1, 300),
+        cuotas=rng.choice([3, 6, 12]), tarjeta=rng.randint(1000, 9999),
+        serie=f"{rng.getrandbits(48):012X}", fono=rng.randint(10**7, 10**8 - 1),
+    ) for f in frases)
+
+async def create_products(client, products: int, seed_value: int) -> dict:
+    rng = random.Random(seed_value)
+    cuenta = {"nombre": "Usuario Codificacion", "correo": "codificacion@datos.misboletas.cl", "contrasena": "Codif-1234"}
+    await client.post("/api/v1/users", json=cuenta)
+    r = await client.post("/api/v1/auth/login", json={"correo": cuenta["correo"], "contrasena": cuenta["contrasena"]})
+    headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+    for _ in range(products):
+        tipo, _, garantias = rng.choice(TIPOS)
+        marca = rng.choice(MARCAS)
+        r = await client.post("/api/v1/products", headers=headers, json={
+            "NombreProducto": f"{tipo} {marca}",
+            "FechaCompra": f"2025-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+            "DuracionGarantia": rng.choice(garantias),
+            "Marca": marca,
+            "Modelo": f"{marca[:2].upper()}-{rng.randint(100, 9999)}",
+            "Tienda": rng.choice(TIENDAS),
+            "Notas": _notas(rng),
+        })
+        r.raise_for_status()
+    return headers
+
+async def measure(client, headers: dict, accept: str, accept_encoding: str, requests: int) -> dict:
+    pedido = {**headers, "Accept": accept, "Accept-Encoding": accept_encoding}
+
+    async def get() -> tuple:
+        async with client.stream("GET", "/api/v1/products", headers=pedido) as r:
+            cuerpo = b"".join([parte async for parte in r.aiter_raw()])
+            return r, cuerpo
+
+    r, cuerpo = await get()   # Calienta la caché de respuestas
+    latencias = []
+    cpu = time.process_time()
+    for _ in range(requests):
+        inicio = time.perf_counter()
+        await get()
+        latencias.append(time.perf_counter() - inicio)
+    cpu = time.process_time() - cpu
+    latencias.sort()
+    return {
+        "content_type": r.headers["content-type"],
+        "content_encoding": r.headers.get("content-encoding", "identity"),
+        "bytes": len(cuerpo),
+        "cpu_ms": round(cpu / requests * 1000, 3),
+        "p50_ms": round(percentile(latencias, 50) * 1000, 3),
+        "p99_ms": round(percentile(latencias, 99) * 1000, 3),
+    }
+
+def levels_table(body: bytes) -> dict:
+    """Tamaño y µs de cada nivel sobre el mismo cuerpo."""
+    from app.core import encoding
+
+    def medir(comprimir) -> dict:
+        repeticiones, inicio = 0, time.perf_counter()
+        while repeticiones < 3 or time.perf_counter() - inicio < 0.2:
+            salida = comprimir()
+            repeticiones += 1
+        return {"bytes": len(salida), "us": round((time.perf_counter() - inicio) / repeticiones * 1e6)}
+
+    tabla = {"gzip": {n: medir(lambda: gzip.compress(body, n, mtime=0)) for n in range(1, 10)}}
+    if encoding.brotli is not None:
+        tabla["br"] = {n: medir(lambda: encoding.brotli.compress(body, quality=n)) for n in range(0, 12)}
+    return tabla
+
+async def run(args) -> dict:
+    app, engine = harness.load_app()
+    for nombre in ("httpx", "app"):
+        logging.getLogger(nombre).setLevel(logging.WARNING)
+    from app.core import encoding
+
+    async with harness.running_app(app) as client:
+        headers = await create_products(client, args.products, args.seed)
+        resultados = {}
+        max_bytes = encoding.encoded_cache.max_bytes
+        for nombre, accept, accept_encoding in VARIANTS:
+            if accept_encoding == "br" and encoding.brotli is None or accept != "application/json" and encoding.msgpack is None:
+                continue   # Falta el paquete opcional
+            encoding.encoded_cache.max_bytes = 0
+            sin_cache = await measure(client, headers, accept, accept_encoding, args.requests)
+            encoding.encoded_cache.max_bytes = max_bytes
+            resultado = await measure(client, headers, accept, accept_encoding, args.requests)
+            resultado.update({"uncached_cpu_ms": sin_cache["cpu_ms"], "uncached_p50_ms": sin_cache["p50_ms"]})
+            resultados[nombre] = resultado
+        base = resultados["json"]["cpu_ms"]
+        for resultado in resultados.values():
+            resultado["extra_cpu_ms"] = round(resultado["cpu_ms"] - base, 3)
+            resultado["uncached_extra_cpu_ms"] = round(resultado["uncached_cpu_ms"] - base, 3)
+
+        salida = {"database": engine.dialect.name, "products": args.products, "requests": args.requests,
+                  "variants": resultados}
+        if args.levels:
+            r = await client.get("/api/v1/products", headers={**headers, "Accept-Encoding": "identity"})
+            salida["levels"] = levels_table(r.content)
+        return salida
+
+def main():
+    parser = argparse.ArgumentParser(description="Bytes y CPU por codificación de la lista de productos")
+    parser.add_argument("--products", type=int, default=500, help="Productos del usuario")
+    parser.add_argument("--requests", type=int, default=200, help="Peticiones por variante")
+    parser.add_argument("--levels", action="store_true", help="Tabla de niveles de gzip y brotli")
+    parser.add_argument("--seed", type=int, default=42, help="Semilla de los productos")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="misboletas-codificacion-")
+    os.environ.setdefault("UPLOAD_DIR", os.path.join(workdir, "uploads"))
+    harness.configure_environment(f"sqlite:///{os.path.join(workdir, 'codificacion.db')}", bcrypt_rounds=4)
+
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,82 @@
+"""
+Latencia del camino de error: avalancha de registros con un email repetido.
+
+Registra un usuario y luego envía N registros más con el mismo correo desde
+C clientes concurrentes. Todas las respuestas deberían ser el mismo error de
+negocio; mide cuánto cuesta producirlo (clasificar el error del driver,
+revertir, responder) y qué códigos de estado se devolvieron.
+
+Con --bcrypt-rounds bajo el hash de la contraseña (que se calcula antes de
+llegar a la base) no tapa el costo del error.
+
+Uso:
+    python -m benchmarks.error_path                       # SQLite temporal
+    python -m benchmarks.error_path --db postgres --requests 5000
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+from collections import Counter
+
+from benchmarks import harness
+from benchmarks.run import summarize
+
+async def flood(client, requests: int, concurrency: int) -> dict:
+    cuerpo = {"nombre": "Usuario Repetido", "correo": "repetido@datos.misboletas.cl", "contrasena": "Repetido-1234"}
+    primero = await client.post("/api/v1/users", json=cuerpo)
+    pendientes = iter(range(requests))
+    latencias, estados = [], Counter()
+
+    async def worker():
+        for _ in pendientes:
+            inicio = time.perf_counter()
+            r = await client.post("/api/v1/users", json=cuerpo)
+            latencias.append(time.perf_counter() - inicio)
+            estados[r.status_code] += 1
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - inicio
+    resumen = summarize(latencias, 0, elapsed)
+    resumen.pop("errors")
+    return {"primer_registro": primero.status_code, "estados": dict(estados), **resumen}
+
+async def run(args) -> dict:
+    app, engine = harness.load_app()
+    for nombre in ("httpx", "app"):
+        logging.getLogger(nombre).setLevel(logging.WARNING)
+    async with harness.running_app(app) as client:
+        resultado = await flood(client, args.requests, args.concurrency)
+    return {"database": engine.dialect.name, "requests": args.requests,
+            "concurrency": args.concurrency, "bcrypt_rounds": args.bcrypt_rounds, **resultado}
+
+def main():
+    parser = argparse.ArgumentParser(description="Latencia de registros duplicados")
+    parser.add_argument("--db", choices=["sqlite", "postgres"], default="sqlite", help="Base local a usar")
+    parser.add_argument("--db-url", help="URL de una base existente (se usa en vez de --db)")
+    parser.add_argument("--requests", type=int, default=2000, help="Registros duplicados a enviar")
+    parser.add_argument("--concurrency", type=int, default=16, help="Clientes concurrentes")
+    parser.add_argument("--bcrypt-rounds", type=int, default=4, help="Costo bcrypt (bajo: se mide el error)")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="misboletas-errores-")
+    if args.db_url:
+        url = args.db_url
+    elif args.db == "postgres":
+        url = harness.embedded_postgres_url(os.path.join(workdir, "pgdata"))
+    else:
+        url = f"sqlite:///{os.path.join(workdir, 'errores.db')}"
+    os.environ.setdefault("UPLOAD_DIR", os.path.join(workdir, "uploads"))
+    harness.configure_environment(url, args.bcrypt_rounds)
+
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,75 @@
+"""
+Arranque de la app para benchmarks: base de datos local, datos de prueba y
+cliente ASGI en proceso (sin red).
+
+Las variables de entorno se fijan ANTES de importar `app`, porque `Settings`
+y el engine se crean al importar.
+"""
+
+import os
+from contextlib import asynccontextmanager
+
+BENCH_PASSWORD = "Bench-1234"
+
+def configure_environment(database_url: str, bcrypt_rounds: int = None, response_cache: bool = True):
+    """Configura la app para medir: sin SQL en el log, sin SSL local y sin límite de login."""
+    os.environ["ENV"] = "render"                  # Usa DATABASE_URL
+    os.environ["DATABASE_URL"] = database_url
+    os.environ.setdefault("SECRET_KEY", "benchmark-secret")
+    os.environ["DB_ECHO"] = "false"
+    os.environ.setdefault("LOG_LEVEL", "WARNING")  # Los logs van a stdout, junto al JSON del resultado
+    os.environ["DB_SSLMODE"] = "disable"
+    os.environ["LOGIN_RATE_IP_CAPACITY"] = "1000000"
+    os.environ["LOGIN_RATE_EMAIL_CAPACITY"] = "1000000"
+    if bcrypt_rounds is not None:
+        os.environ["BCRYPT_ROUNDS"] = str(bcrypt_rounds)
+    if not response_cache:
+        os.environ["RESPONSE_CACHE_MAX_MB"] = "0"
+
+def embedded_postgres_url(data_dir: str) -> str:
+    """PostgreSQL embebido (paquete opcional `pgserver`) para medir con el motor real."""
+    try:
+        import pgserver
+    except ImportError:
+        raise SystemExit("--db postgres requiere el paquete 'pgserver' (pip install pgserver) o usar --db-url")
+    server = pgserver.get_server(data_dir, cleanup_mode=None)
+    return server.get_uri().replace("postgresql://", "postgresql+psycopg://")
+
+def load_app():
+    """Importa la app ya configurada e instala el sustituto de procedimientos almacenados."""
+    from app.db.session import engine
+    from benchmarks.stand_in import install_stand_in
+    install_stand_in(engine)
+
+    import app.main
+    return app.main.app, engine
+
+def seed(engine, users: int, max_products: int, seed_value: int = 42) -> list:
+    """
+    Inserta usuarios (todos con BENCH_PASSWORD) con benchmarks.datagen si faltan.
+    Devuelve [(usuarioid, email)].
+    """
+    from sqlalchemy import text
+    from benchmarks.datagen import generate
+
+    consulta = text("SELECT usuarioid, email FROM usuarios WHERE email LIKE 'bench%' ORDER BY usuarioid")
+    with engine.begin() as conn:
+        existentes = conn.execute(consulta).fetchall()
+    if len(existentes) < users:
+        generate(engine, users - len(existentes), max_products=max_products, seed=seed_value,
+                 password=BENCH_PASSWORD, email_prefix="bench")
+        with engine.begin() as conn:
+            existentes = conn.execute(consulta).fetchall()
+    return [(r.usuarioid, r.email) for r in existentes[:users]]
+
+@asynccontextmanager
+async def running_app(app):
+    """Ejecuta el lifespan (crear tablas, tareas de fondo) y entrega un cliente httpx en proceso."""
+    import httpx
+    from app.core.startup import state
+
+    async with app.router.lifespan_context(app):
+        await state.wait_ready(timeout=300)   # Tablas y pool se preparan en segundo plano
+        transport = httpx.ASGITransport(app=app, client=("127.0.0.1", 50000))
+        async with httpx.AsyncClient(transport=transport, base_url="http://localhost", timeout=60) as client:
+            yield client
@@ -0,0 +1,88 @@
+"""
+Costo del logging por petición: el mismo benchmark de carga con distintos modos.
+
+Cada modo corre `benchmarks.run --app-logs` en un proceso aparte (Settings y el
+pipeline de logs se fijan al importar la app) con la salida estándar en un
+pipe, como detrás de uvicorn/systemd/docker:
+
+- off:      LOG_LEVEL=WARNING, no se escribe ninguna línea por petición.
+- sync:     JSON escrito desde el event loop (LOG_ASYNC=false).
+- queue:    JSON encolado y escrito desde el hilo del QueueListener.
+- sampled:  queue con LOG_SAMPLE_RATES=INFO:0.1.
+
+--sink-delay-ms simula un colector de logs lento: el pipe se lee de a 4 KiB
+con esa pausa entre lecturas. Con el pipe lleno, `sync` bloquea el event loop
+en cada escritura; `queue` solo bloquea el hilo del listener.
+
+Uso:
+    python -m benchmarks.logging_overhead --duration 10
+    python -m benchmarks.logging_overhead --db postgres --modes off,queue
+    python -m benchmarks.logging_overhead --sink-delay-ms 5
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+MODES = {
+    "off": {"LOG_LEVEL": "WARNING"},
+    "sync": {"LOG_ASYNC": "false"},
+    "queue": {},
+    "sampled": {"LOG_SAMPLE_RATES": "INFO:0.1"},
+}
+
+def run_mode(nombre: str, args) -> dict:
+    salida = os.path.join(tempfile.mkdtemp(prefix="misboletas-logs-"), "resultado.json")
+    comando = [
+        sys.executable, "-m", "benchmarks.run", "--app-logs", "--output", salida,
+        "--db", args.db, "--iterations", "0", "--duration", str(args.duration),
+        "--concurrency", str(args.concurrency), "--bcrypt-rounds", str(args.bcrypt_rounds),
+    ]
+    if args.db_url:
+        comando += ["--db-url", args.db_url]
+    entorno = {**os.environ, "LOG_LEVEL": "INFO", "LOG_ASYNC": "true", "LOG_FORMAT": "json",
+               "LOG_SAMPLE_RATES": "", **MODES[nombre]}
+    proceso = subprocess.Popen(comando, env=entorno, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    leido = []
+
+    def colector():
+        while bloque := proceso.stdout.read1(4096):
+            leido.append(bloque)
+            if args.sink_delay_ms:
+                time.sleep(args.sink_delay_ms / 1000)
+
+    hilo = threading.Thread(target=colector)
+    hilo.start()
+    errores = proceso.stderr.read()
+    proceso.wait()
+    hilo.join()
+    if proceso.returncode != 0:
+        raise SystemExit(f"{nombre}: {errores.decode()[-2000:]}")
+    with open(salida) as f:
+        carga = json.load(f)["load"]["overall"]
+    lineas = b"".join(leido).count(b'"request_id"')
+    return {"modo": nombre, "throughput_rps": carga["throughput_rps"], "p50_ms": carga["p50_ms"],
+            "p99_ms": carga["p99_ms"], "requests": carga["requests"], "lineas_de_log": lineas}
+
+def main():
+    parser = argparse.ArgumentParser(description="Throughput con y sin logging por petición")
+    parser.add_argument("--db", choices=["sqlite", "postgres"], default="sqlite", help="Base local a usar")
+    parser.add_argument("--db-url", help="URL de una base existente (se usa en vez de --db)")
+    parser.add_argument("--modes", default=",".join(MODES), help=f"Modos a comparar (def: {','.join(MODES)})")
+    parser.add_argument("--duration", type=float, default=10, help="Segundos de carga por modo")
+    parser.add_argument("--concurrency", type=int, default=16, help="Clientes concurrentes")
+    parser.add_argument("--bcrypt-rounds", type=int, default=4, help="Costo bcrypt (bajo: no tapa el logging)")
+    parser.add_argument("--sink-delay-ms", type=float, default=0, help="Pausa entre lecturas de 4 KiB del pipe")
+    args = parser.parse_args()
+
+    resultados = [run_mode(nombre, args) for nombre in args.modes.split(",")]
+    print(json.dumps(resultados, indent=2))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,215 @@
+"""
+Planes de ejecución de las consultas más usadas.
+
+Ejecuta cada ruta caliente de `app/crud` contra una base sembrada con
+benchmarks.datagen, captura el SQL que emite (ya traducido por
+benchmarks.stand_in) y le aplica EXPLAIN. Sirve para detectar:
+
+- Un recorrido secuencial (Seq Scan / SCAN) sobre productos, usuarios o
+  documentos cuando la tabla supera SEQ_SCAN_ROW_THRESHOLD filas: casi
+  siempre es un índice perdido.
+- Un costo estimado por PostgreSQL que crece más de COST_TOLERANCE veces
+  respecto del baseline guardado (tests/query_plans_baseline.json).
+
+Lo usa tests/test_query_plans.py. Para regenerar el baseline tras un
+cambio intencional:
+    python -m benchmarks.query_plans --db-url postgresql+psycopg://... --update-baseline
+    python -m benchmarks.query_plans --update-baseline              # PostgreSQL embebido (pgserver)
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+
+from sqlalchemy import event, text
+
+WATCHED_TABLES = ("productos", "usuarios", "documentos")
+SEQ_SCAN_ROW_THRESHOLD = 1_000
+COST_TOLERANCE = 2.0
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                             "tests", "query_plans_baseline.json")
+
+# Datos fijos: los costos del baseline dependen del volumen y la distribución
+SEED_USERS = 3000
+SEED_MAX_PRODUCTS = 60
+SEED_VALUE = 20240601
+
+def hot_paths(engine, user_id: int, email: str, product_ids: list) -> dict:
+    """Rutas calientes: nombre -> función que recibe la sesión."""
+    from app.crud import product as crud_product, user as crud_user, upload as crud_upload
+
+    paths = {
+        "get_products_by_user": lambda db: crud_product.get_products_by_user(db, user_id),
+        "search_product_wrapper": lambda db: crud_product.search_product_wrapper(db, product_ids[0], user_id),
+        "get_products_batch": lambda db: crud_product.get_products_batch(db, product_ids, user_id),
+        "search_products": lambda db: crud_product.search_products(db, user_id, "televisor samsung", 20, 0),
+        "get_field_value_counts": lambda db: crud_product.get_field_value_counts(db, user_id, "marca"),
+        "get_user_for_login": lambda db: crud_user.get_user_for_login(db, email),
+        "search_user": lambda db: crud_user.search_user(db, user_id),
+        "used_bytes": lambda db: crud_upload._used_bytes(db, user_id),
+        "get_user_summary": lambda db: crud_product.get_user_summary(db, user_id),
+    }
+    return paths
+
+# ===== CAPTURA Y EXPLAIN =====
+
+def capture_statements(engine, session_factory, func) -> list:
+    """Ejecuta func(db) y devuelve [(sql, parámetros)] tal como llegaron al driver."""
+    capturadas = []
+
+    # Se registra después del stand-in: ve el SQL ya traducido
+    def _capturar(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(("SELECT", "WITH")):
+            capturadas.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", _capturar)
+    try:
+        db = session_factory()
+        try:
+            func(db)
+        finally:
+            db.rollback()
+            db.close()
+    finally:
+        event.remove(engine, "before_cursor_execute", _capturar)
+    return capturadas
+
+def explain(engine, statement: str, parameters):
+    """Plan de la consulta: JSON de PostgreSQL o filas de EXPLAIN QUERY PLAN en SQLite."""
+    with engine.connect() as conn:
+        cursor = conn.connection.driver_connection.cursor()
+        try:
+            if engine.dialect.name == "postgresql":
+                cursor.execute("EXPLAIN (FORMAT JSON) " + statement, parameters)
+                plan = cursor.fetchone()[0]
+                return plan[0] if isinstance(plan, list) else json.loads(plan)[0]
+            cursor.execute("EXPLAIN QUERY PLAN " + statement, parameters)
+            return [row[3] for row in cursor.fetchall()]
+        finally:
+            cursor.close()
+
+def _nodes(plan: dict):
+    yield plan
+    for hijo in plan.get("Plans", []):
+        yield from _nodes(hijo)
+
+def _sqlite_aliases(statement: str) -> dict:
+    """alias -> tabla vigilada (SQLite informa el alias en SCAN)."""
+    aliases = {t: t for t in WATCHED_TABLES}
+    patron = r"\b(" + "|".join(WATCHED_TABLES) + r")\s+(?:AS\s+)?(\w+)"
+    for tabla, alias in re.findall(patron, statement, re.I):
+        if alias.upper() not in ("WHERE", "JOIN", "ON", "ORDER", "GROUP", "LEFT", "INNER", "LIMIT"):
+            aliases[alias] = tabla.lower()
+    return aliases
+
+def sequential_scans(engine, statement: str, plan) -> list:
+    """Tablas vigiladas que el plan recorre completas."""
+    if engine.dialect.name == "postgresql":
+        return [n["Relation Name"] for n in _nodes(plan["Plan"])
+                if n["Node Type"] == "Seq Scan" and n.get("Relation Name") in WATCHED_TABLES]
+    aliases = _sqlite_aliases(statement)
+    tablas = []
+    for detalle in plan:
+        # "SCAN p" o "SCAN p USING COVERING INDEX ..." recorren todo; "SEARCH" usa el índice
+        match = re.match(r"SCAN (\w+)", detalle)
+        if match and "VIRTUAL TABLE" not in detalle and match.group(1) in aliases:
+            tablas.append(aliases[match.group(1)])
+    return tablas
+
+def total_cost(engine, plan):
+    if engine.dialect.name == "postgresql":
+        return plan["Plan"]["Total Cost"]
+    return None   # SQLite no estima costos
+
+def table_rows(engine) -> dict:
+    with engine.connect() as conn:
+        return {t: conn.execute(text(f"SELECT COUNT(*) FROM {t}")).scalar() for t in WATCHED_TABLES}
+
+# ===== BASE SEMBRADA =====
+
+def prepare_database(engine) -> tuple:
+    """Crea el esquema, siembra datos fijos si faltan y actualiza estadísticas.
+    Devuelve (user_id, email, product_ids) del usuario con más productos."""
+    from app.db.session import Base
+    from app.db.search import setup_product_search
+    from app import models  # noqa: F401  (registra las tablas)
+    from benchmarks.datagen import generate
+    from benchmarks.stand_in import install_stand_in
+
+    Base.metadata.create_all(engine)
+    setup_product_search(engine)
+    install_stand_in(engine)
+
+    with engine.begin() as conn:
+        vacia = conn.execute(text("SELECT COUNT(*) FROM usuarios")).scalar() == 0
+    if vacia:
+        generate(engine, SEED_USERS, max_products=SEED_MAX_PRODUCTS, seed=SEED_VALUE, batch_size=20_000)
+    with engine.begin() as conn:
+        conn.execute(text("ANALYZE"))
+        fila = conn.execute(text("""
+            SELECT u.usuarioid, u.email, COUNT(*) AS total
+            FROM usuarios u JOIN productos p ON p.usuarioid = u.usuarioid
+            GROUP BY u.usuarioid, u.email
+            ORDER BY total DESC, u.usuarioid
+            LIMIT 1
+        """)).first()
+        product_ids = [r[0] for r in conn.execute(
+            text("SELECT productoid FROM productos WHERE usuarioid = :u ORDER BY productoid LIMIT 20"),
+            {"u": fila.usuarioid}
+        ).fetchall()]
+    return fila.usuarioid, fila.email, product_ids
+
+def collect_plans(engine, session_factory, paths: dict) -> dict:
+    """{"ruta#n": {"sql", "seq_scans", "cost"}} para cada consulta emitida por cada ruta."""
+    resultado = {}
+    for nombre, func in paths.items():
+        for i, (statement, parameters) in enumerate(capture_statements(engine, session_factory, func)):
+            plan = explain(engine, statement, parameters)
+            resultado[f"{nombre}#{i}"] = {
+                "sql": " ".join(statement.split()),
+                "seq_scans": sequential_scans(engine, statement, plan),
+                "cost": total_cost(engine, plan),
+            }
+    return resultado
+
+def load_baseline() -> dict:
+    if not os.path.exists(BASELINE_PATH):
+        return {}
+    with open(BASELINE_PATH) as f:
+        return json.load(f)
+
+def main():
+    parser = argparse.ArgumentParser(description="Planes de las consultas calientes")
+    parser.add_argument("--db-url", help="Base PostgreSQL/SQLite dedicada (def: PostgreSQL embebido)")
+    parser.add_argument("--update-baseline", action="store_true", help="Guarda los costos como nuevo baseline")
+    args = parser.parse_args()
+
+    os.environ.setdefault("ENV", "render")
+    os.environ.setdefault("DATABASE_URL", "sqlite://")
+    os.environ.setdefault("SECRET_KEY", "query-plans")
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+
+    url = args.db_url
+    if url is None:
+        import tempfile
+        from benchmarks.harness import embedded_postgres_url
+        url = embedded_postgres_url(os.path.join(tempfile.mkdtemp(prefix="misboletas-plans-"), "pgdata"))
+    engine = create_engine(url)
+    user_id, email, product_ids = prepare_database(engine)
+    planes = collect_plans(engine, sessionmaker(bind=engine), hot_paths(engine, user_id, email, product_ids))
+    print(json.dumps(planes, indent=2, ensure_ascii=False))
+
+    if args.update_baseline:
+        if engine.dialect.name != "postgresql":
+            raise SystemExit("El baseline de costos se genera con PostgreSQL")
+        with open(BASELINE_PATH, "w") as f:
+            json.dump({k: round(v["cost"], 2) for k, v in planes.items()}, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"Baseline actualizado: {BASELINE_PATH}", file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
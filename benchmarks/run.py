@@ -0,0 +1,254 @@
+"""
+Benchmark de la API en proceso (cliente ASGI, sin red) contra una base local.
+
+Mide login, listar, obtener, crear, actualizar y eliminar productos:
+1. Latencia: cada operación N veces seguidas con un solo cliente.
+2. Carga: C clientes concurrentes con una mezcla de operaciones durante S segundos.
+
+Imprime (o guarda con --output) un JSON con p50/p95/p99 y throughput para
+comparar entre commits.
+
+Uso:
+    python -m benchmarks.run                              # SQLite temporal
+    python -m benchmarks.run --db postgres                # PostgreSQL embebido (pgserver)
+    python -m benchmarks.run --db-url postgresql+psycopg://... --output bench.json
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+from benchmarks import harness
+
+DEFAULT_MIX = "list:40,get:30,create:10,update:10,delete:5,login:5"
+
+def percentile(sorted_values: list, pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+def summarize(latencies: list, errors: int, elapsed: float) -> dict:
+    ordenadas = sorted(latencies)
+    total = len(latencies) + errors
+    return {
+        "requests": total,
+        "errors": errors,
+        "p50_ms": round(percentile(ordenadas, 50) * 1000, 3),
+        "p95_ms": round(percentile(ordenadas, 95) * 1000, 3),
+        "p99_ms": round(percentile(ordenadas, 99) * 1000, 3),
+        "mean_ms": round(sum(ordenadas) / len(ordenadas) * 1000, 3) if ordenadas else 0.0,
+        "throughput_rps": round(total / elapsed, 1) if elapsed > 0 else 0.0,
+    }
+
+class VirtualUser:
+    """Un usuario sembrado con su token y los productos que conoce."""
+
+    def __init__(self, client, user_id: int, email: str, rng: random.Random):
+        self.client = client
+        self.user_id = user_id
+        self.email = email
+        self.rng = rng
+        self.headers = {}
+        self.product_ids = []
+        self.created_ids = []
+
+    async def login(self):
+        r = await self.client.post("/api/v1/auth/login", json={"correo": self.email, "contrasena": harness.BENCH_PASSWORD})
+        if r.status_code == 200:
+            self.headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+        return r
+
+    async def list(self):
+        r = await self.client.get("/api/v1/products", headers=self.headers)
+        if r.status_code == 200:
+            self.product_ids = [p["ProductoID"] for p in r.json()]
+        return r
+
+    async def get(self):
+        if not self.product_ids:
+            return await self.list()
+        return await self.client.get(f"/api/v1/products/{self.rng.choice(self.product_ids)}", headers=self.headers)
+
+    async def create(self):
+        r = await self.client.post("/api/v1/products", headers=self.headers, json={
+            "NombreProducto": f"Producto benchmark {self.rng.randint(1, 10**6)}",
+            "FechaCompra": "2025-01-15",
+            "DuracionGarantia": 12,
+            "Marca": "Samsung",
+            "Tienda": "Falabella",
+        })
+        if r.status_code == 201:
+            self.created_ids.append(r.json()["ProductoID"])
+            self.product_ids.append(r.json()["ProductoID"])
+        return r
+
+    async def update(self):
+        if not self.product_ids:
+            return await self.create()
+        return await self.client.put(
+            f"/api/v1/products/{self.rng.choice(self.product_ids)}",
+            headers=self.headers, json={"Notas": f"editado {self.rng.randint(1, 10**6)}"}
+        )
+
+    async def delete(self):
+        if not self.created_ids:
+            await self.create()
+        producto_id = self.created_ids.pop()
+        if producto_id in self.product_ids:
+            self.product_ids.remove(producto_id)
+        return await self.client.delete(f"/api/v1/products/{producto_id}", headers=self.headers)
+
+OPERATIONS = ["login", "list", "get", "create", "update", "delete"]
+
+async def timed(operation) -> tuple:
+    inicio = time.perf_counter()
+    r = await operation()
+    return time.perf_counter() - inicio, r.status_code < 400
+
+async def latency_phase(users: list, iterations: int) -> dict:
+    """Cada operación `iterations` veces, una a la vez."""
+    resultados = {}
+    for nombre in OPERATIONS:
+        latencias, errores = [], 0
+        inicio = time.perf_counter()
+        for i in range(iterations):
+            usuario = users[i % len(users)]
+            if nombre == "delete" and not usuario.created_ids:
+                await usuario.create()   # Preparación, no se mide
+            duracion, ok = await timed(getattr(usuario, nombre))
+            if ok:
+                latencias.append(duracion)
+            else:
+                errores += 1
+        resultados[nombre] = summarize(latencias, errores, time.perf_counter() - inicio)
+    return resultados
+
+async def load_phase(users: list, concurrency: int, duration: float, mix: dict, seed_value: int) -> dict:
+    """`concurrency` clientes eligiendo operaciones según `mix` hasta cumplir `duration`."""
+    nombres = list(mix)
+    pesos = [mix[n] for n in nombres]
+    por_operacion = {n: ([], [0]) for n in nombres}
+    fin = time.perf_counter() + duration
+
+    async def worker(index: int):
+        rng = random.Random(seed_value + index)
+        # Usuarios propios del cliente: evita leer un producto que otro cliente acaba de borrar
+        propios = users[index::concurrency] or users
+        while time.perf_counter() < fin:
+            usuario = rng.choice(propios)
+            nombre = rng.choices(nombres, pesos)[0]
+            duracion, ok = await timed(getattr(usuario, nombre))
+            latencias, errores = por_operacion[nombre]
+            if ok:
+                latencias.append(duracion)
+            else:
+                errores[0] += 1
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(worker(i) for i in range(concurrency)))
+    elapsed = time.perf_counter() - inicio
+
+    todas = [l for latencias, _ in por_operacion.values() for l in latencias]
+    total_errores = sum(e[0] for _, e in por_operacion.values())
+    return {
+        "concurrency": concurrency,
+        "duration_s": round(elapsed, 2),
+        "mix": mix,
+        "overall": summarize(todas, total_errores, elapsed),
+        "operations": {n: summarize(l, e[0], elapsed) for n, (l, e) in por_operacion.items()},
+    }
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return "unknown"
+
+def parse_mix(value: str) -> dict:
+    mix = {}
+    for parte in value.split(","):
+        nombre, peso = parte.split(":")
+        if nombre not in OPERATIONS:
+            raise argparse.ArgumentTypeError(f"Operación desconocida: {nombre}")
+        mix[nombre] = float(peso)
+    return mix
+
+async def run(args) -> dict:
+    app, engine = harness.load_app()
+    # El log por petición distorsiona la medición (salvo que sea lo que se mide: --app-logs)
+    for nombre in ("httpx",) if args.app_logs else ("httpx", "app"):
+        logging.getLogger(nombre).setLevel(logging.WARNING)
+    async with harness.running_app(app) as client:
+        sembrados = harness.seed(engine, args.users, args.max_products, args.seed)
+        rng = random.Random(args.seed)
+        usuarios = [VirtualUser(client, uid, email, random.Random(rng.random())) for uid, email in sembrados]
+        for usuario in usuarios:
+            await usuario.login()
+            await usuario.list()
+
+        resultado = {
+            "commit": git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "database": engine.dialect.name,
+            "config": {
+                "users": args.users, "max_products": args.max_products,
+                "iterations": args.iterations, "seed": args.seed,
+                "bcrypt_rounds": int(os.environ.get("BCRYPT_ROUNDS", 0)) or "default",
+                "response_cache": not args.no_cache, "app_logs": args.app_logs,
+            },
+            "latency": await latency_phase(usuarios, args.iterations),
+        }
+        if args.duration > 0:
+            resultado["load"] = await load_phase(usuarios, args.concurrency, args.duration, args.mix, args.seed)
+        return resultado
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark en proceso de la API MisBoletas")
+    parser.add_argument("--db", choices=["sqlite", "postgres"], default="sqlite", help="Base local a usar")
+    parser.add_argument("--db-url", help="URL de una base existente (se usa en vez de --db)")
+    parser.add_argument("--users", type=int, default=50, help="Usuarios sembrados")
+    parser.add_argument("--max-products", type=int, default=200, help="Máximo de productos por usuario (Zipf)")
+    parser.add_argument("--iterations", type=int, default=200, help="Repeticiones por operación (fase de latencia)")
+    parser.add_argument("--concurrency", type=int, default=16, help="Clientes concurrentes (fase de carga)")
+    parser.add_argument("--duration", type=float, default=10, help="Segundos de la fase de carga (0 = omitir)")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix(DEFAULT_MIX), help=f"Mezcla (def: {DEFAULT_MIX})")
+    parser.add_argument("--bcrypt-rounds", type=int, help="Costo bcrypt para el benchmark (def: el de Settings)")
+    parser.add_argument("--no-cache", action="store_true", help="Desactiva la caché de respuestas")
+    parser.add_argument("--app-logs", action="store_true", help="Mantiene el log por petición (con LOG_LEVEL=INFO)")
+    parser.add_argument("--seed", type=int, default=42, help="Semilla de datos y mezcla")
+    parser.add_argument("--output", help="Archivo JSON de salida (def: stdout)")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="misboletas-bench-")
+    if args.db_url:
+        url = args.db_url
+    elif args.db == "postgres":
+        url = harness.embedded_postgres_url(os.path.join(workdir, "pgdata"))
+    else:
+        url = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    os.environ.setdefault("UPLOAD_DIR", os.path.join(workdir, "uploads"))
+    harness.configure_environment(url, args.bcrypt_rounds, response_cache=not args.no_cache)
+
+    resultado = asyncio.run(run(args))
+    salida = json.dumps(resultado, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(salida + "\n")
+    print(salida)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,130 @@
+"""
+Sustituto local de los procedimientos almacenados.
+
+La app llama a `EXEC sp_*` y `SELECT * FROM fn_*(...)`, que solo existen en la
+base de datos de producción. Para medir contra SQLite o un PostgreSQL local
+con el esquema de `app/models`, cada llamada se reescribe (justo antes de
+enviarla al driver) por SQL equivalente. El resto del SQL de la app pasa
+sin cambios.
+
+Uso:
+    from benchmarks.stand_in import install_stand_in
+    install_stand_in(engine)
+"""
+
+import re
+
+from sqlalchemy import event
+
+_PLACEHOLDER = r"(\?|%\(\w+\)s)"
+_EXEC_RE = re.compile(r"^\s*EXEC\s+(sp_\w+)\s*(.*)$", re.S | re.I)
+_EXEC_ARG_RE = re.compile(r"@(\w+)\s*=\s*" + _PLACEHOLDER)
+_FN_RE = re.compile(r"^\s*SELECT \* FROM (fn_\w+)\((.*)\)\s*$", re.S | re.I)
+_FN_ARG_RE = re.compile(_PLACEHOLDER)
+_TOKEN_RE = re.compile(r"\{(\w+)\}")
+
+_PRODUCT_COLUMNS = (
+    'productoid AS "ProductoID", nombreproducto AS "NombreProducto", fechacompra AS "FechaCompra", '
+    'duraciongarantia AS "DuracionGarantia", marca AS "Marca", modelo AS "Modelo", tienda AS "Tienda", '
+    'notas AS "Notas", usuarioid AS "UsuarioID"'
+)
+_USER_COLUMNS = "usuarioid, nombreusuario, email, fecharegistro"
+
+# Mismo contrato (parámetros y columnas devueltas) que los procedimientos reales
+_PROCEDURES = {
+    "sp_getproductbyid": f"SELECT {_PRODUCT_COLUMNS} FROM productos WHERE productoid = {{ProductoID}}",
+    "sp_getproductsbyuser": (
+        f"SELECT {_PRODUCT_COLUMNS} FROM productos WHERE usuarioid = {{UsuarioID}} ORDER BY productoid"
+    ),
+    "sp_createproduct": (
+        "INSERT INTO productos (nombreproducto, fechacompra, duraciongarantia, marca, modelo, tienda, notas, usuarioid) "
+        "VALUES ({NombreProducto}, {FechaCompra}, {DuracionGarantia}, {Marca}, {Modelo}, {Tienda}, {Notas}, {UsuarioID}) "
+        f"RETURNING {_PRODUCT_COLUMNS}"
+    ),
+    "sp_updateproduct": (
+        "UPDATE productos SET nombreproducto = {NombreProducto}, fechacompra = {FechaCompra}, "
+        "duraciongarantia = {DuracionGarantia}, marca = {Marca}, modelo = {Modelo}, tienda = {Tienda}, notas = {Notas} "
+        "WHERE productoid = {ProductoID} AND usuarioid = {UsuarioID} "
+        f"RETURNING {_PRODUCT_COLUMNS}"
+    ),
+    "sp_deleteproduct": (
+        "DELETE FROM productos WHERE productoid = {ProductoID} AND usuarioid = {UsuarioID} "
+        "RETURNING 'Producto eliminado correctamente' AS mensaje"
+    ),
+}
+
+# Funciones con argumentos posicionales: nombre de cada argumento y SQL equivalente
+_FUNCTIONS = {
+    "fn_createuser": (
+        ["nombre", "email", "password"],
+        "INSERT INTO usuarios (nombreusuario, email, contrasenahash, fecharegistro) "
+        f"VALUES ({{nombre}}, lower(trim({{email}})), {{password}}, CURRENT_TIMESTAMP) RETURNING {_USER_COLUMNS}"
+    ),
+    "fn_getuserforlogin": (
+        ["email"],
+        f"SELECT {_USER_COLUMNS}, contrasenahash FROM usuarios WHERE email = lower(trim({{email}}))"
+    ),
+    "fn_updateuserpassword": (
+        ["user_id", "password"],
+        f"UPDATE usuarios SET contrasenahash = {{password}} WHERE usuarioid = {{user_id}} RETURNING {_USER_COLUMNS}"
+    ),
+}
+
+def _values(placeholders, parameters) -> list:
+    """Valores de los placeholders en orden (qmark: tupla; pyformat: dict por nombre)."""
+    if isinstance(parameters, dict):
+        return [parameters[p[2:-2]] for p in placeholders]
+    return list(parameters)
+
+def _render(template: str, args: dict, dict_style: bool):
+    """Sustituye {Nombre} por el placeholder del driver y arma los parámetros."""
+    params = {} if dict_style else []
+
+    def placeholder(match):
+        value = args[match.group(1)]
+        if dict_style:
+            key = f"si_{len(params)}"
+            params[key] = value
+            return f"%({key})s"
+        params.append(value)
+        return "?"
+
+    statement = _TOKEN_RE.sub(placeholder, template)
+    return statement, params if dict_style else tuple(params)
+
+def rewrite(statement: str, parameters):
+    """Devuelve (sql, parámetros) traducidos, o los originales si no es un procedimiento."""
+    dict_style = isinstance(parameters, dict)
+
+    match = _EXEC_RE.match(statement)
+    if match:
+        template = _PROCEDURES[match.group(1).lower()]
+        pairs = _EXEC_ARG_RE.findall(match.group(2))
+        values = _values([p for _, p in pairs], parameters)
+        return _render(template, {name: v for (name, _), v in zip(pairs, values)}, dict_style)
+
+    match = _FN_RE.match(statement)
+    if match:
+        names, template = _FUNCTIONS[match.group(1).lower()]
+        values = _values(_FN_ARG_RE.findall(match.group(2)), parameters)
+        return _render(template, dict(zip(names, values)), dict_style)
+
+    return statement, parameters
+
+def install_stand_in(engine):
+    """Activa la traducción en el engine (y WAL + espera por bloqueo en SQLite)."""
+
+    @event.listens_for(engine, "before_cursor_execute", retval=True)
+    def _rewrite(conn, cursor, statement, parameters, context, executemany):
+        if executemany:
+            return statement, parameters
+        return rewrite(statement, parameters)
+
+    if engine.dialect.name == "sqlite":
+        @event.listens_for(engine, "connect")
+        def _sqlite_pragmas(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            cursor.execute("PRAGMA journal_mode=WAL")
+            cursor.execute("PRAGMA synchronous=NORMAL")
+            cursor.execute("PRAGMA foreign_keys=ON")
+            cursor.close()
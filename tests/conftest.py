@@ -0,0 +1,61 @@
+"""
+Configuración común de pytest.
+
+Si no existe un .env (por ejemplo en CI) se definen valores mínimos para que
+app.core.config pueda cargar Settings sin una base de datos real: un SQLite
+temporal con el sustituto de procedimientos de los benchmarks, suficiente
+para los tests que usan la app completa (fixture `api`).
+"""
+import itertools
+import os
+import sys
+import tempfile
+import time
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+if not os.path.exists(os.path.join(ROOT, ".env")):
+    _TMP = tempfile.mkdtemp(prefix="misboletas-tests-")
+    os.environ.setdefault("ENV", "render")
+    os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(_TMP, 'tests.db')}")
+    os.environ.setdefault("SECRET_KEY", "clave-de-pruebas")
+    os.environ.setdefault("UPLOAD_DIR", os.path.join(_TMP, "uploads"))
+    os.environ.setdefault("BCRYPT_ROUNDS", "5")
+    os.environ.setdefault("LOGIN_RATE_IP_CAPACITY", "1000000")
+    os.environ.setdefault("LOGIN_RATE_EMAIL_CAPACITY", "1000000")
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+_usuarios = itertools.count(1)
+
+@pytest.fixture(scope="session")
+def api():
+    """Cliente de la app completa (middlewares, lifespan) contra la base de pruebas."""
+    from fastapi.testclient import TestClient
+    import app.main
+    from app.db.session import engine
+
+    if engine.dialect.name == "sqlite":
+        from benchmarks.stand_in import install_stand_in
+        install_stand_in(engine)
+    with TestClient(app.main.app) as client:
+        for _ in range(300):
+            if client.get("/health/ready").status_code == 200:
+                break
+            time.sleep(0.05)
+        yield client
+
+@pytest.fixture
+def new_user(api):
+    """Crea un usuario nuevo; devuelve (datos del login, cabeceras con su token)."""
+
+    def crear(contrasena: str = "Prueba-1234"):
+        correo = f"usuario{next(_usuarios)}.{os.getpid()}@pruebas.misboletas.cl"
+        r = api.post("/api/v1/users", json={"nombre": "Usuario Prueba", "correo": correo, "contrasena": contrasena})
+        assert r.status_code == 201, r.text
+        login = api.post("/api/v1/auth/login", json={"correo": correo, "contrasena": contrasena}).json()
+        return login, {"Authorization": f"Bearer {login['access_token']}"}
+
+    return crear
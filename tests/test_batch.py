@@ -0,0 +1,64 @@
+"""
+Tests de POST /batch contra la app completa: escrituras en orden, lecturas y Idempotency-Key.
+"""
+
+def _producto(nombre):
+    return {"Metodo": "POST", "Ruta": "/api/v1/products", "Cuerpo": {"NombreProducto": nombre}}
+
+def test_two_posts_in_one_batch_create_two_products(api, new_user):
+    _, headers = new_user()
+    lote = {"Peticiones": [_producto("Televisor"), _producto("Televisor"), _producto("Lavadora")]}
+    r = api.post("/api/v1/batch", json=lote, headers={**headers, "Idempotency-Key": "lote-1"})
+
+    assert r.status_code == 200
+    resultados = r.json()["Resultados"]
+    assert [x["Estado"] for x in resultados] == [201, 201, 201]
+    assert len({x["Cuerpo"]["ProductoID"] for x in resultados}) == 3
+
+    # Reintento del lote completo: se repite la respuesta, no se crean más productos
+    repetido = api.post("/api/v1/batch", json=lote, headers={**headers, "Idempotency-Key": "lote-1"})
+    assert repetido.headers.get("Idempotent-Replayed") == "true"
+    assert repetido.json() == r.json()
+    assert len(api.get("/api/v1/products", headers=headers).json()) == 3
+
+def test_mixed_reads_and_writes_run_in_order(api, new_user):
+    _, headers = new_user()
+    creado = api.post("/api/v1/products", json={"NombreProducto": "Notebook"}, headers=headers).json()
+    producto_id = creado["ProductoID"]
+    lote = {"Peticiones": [
+        {"Id": "antes", "Ruta": "/api/v1/products"},
+        {"Id": "editar", "Metodo": "PUT", "Ruta": f"/api/v1/products/{producto_id}", "Cuerpo": {"Notas": "editado"}},
+        {"Id": "crear", **_producto("Cafetera")},
+        {"Id": "despues", "Ruta": "/api/v1/products"},
+        {"Id": "uno", "Ruta": f"/api/v1/products/{producto_id}?fields=Notas"},
+        {"Id": "prohibida", "Ruta": "/api/v1/auth/logout"},
+    ]}
+    r = api.post("/api/v1/batch", json=lote, headers=headers)
+
+    por_id = {x["Id"]: x for x in r.json()["Resultados"]}
+    assert len(por_id["antes"]["Cuerpo"]) == 1
+    assert por_id["editar"]["Estado"] == 200
+    assert por_id["crear"]["Estado"] == 201
+    assert len(por_id["despues"]["Cuerpo"]) == 2
+    assert por_id["uno"]["Cuerpo"] == {"ProductoID": producto_id, "Notas": "editado"}
+    assert por_id["prohibida"]["Estado"] == 400
+
+def test_unhandled_error_in_one_item_keeps_the_rest(api, new_user, monkeypatch):
+    from app.api.v1 import product as product_api
+
+    def falla(*args, **kwargs):
+        raise RuntimeError("error inesperado")
+
+    monkeypatch.setattr(product_api.suggestions, "suggest", falla)
+    _, headers = new_user()
+    lote = {"Peticiones": [
+        _producto("Antes"),
+        {"Ruta": "/api/v1/products/suggest?field=marca&prefix=a"},
+        _producto("Despues"),
+    ]}
+    r = api.post("/api/v1/batch", json=lote, headers=headers)
+
+    assert r.status_code == 200
+    assert [x["Estado"] for x in r.json()["Resultados"]] == [201, 500, 201]
+    assert r.json()["Resultados"][1]["Cuerpo"]["error"] == "Error 500"
+    assert len(api.get("/api/v1/products", headers=headers).json()) == 2
@@ -0,0 +1,59 @@
+"""
+Tests de POST /products/batch-get: orden, productos ajenos o inexistentes, relaciones y límite de IDs.
+"""
+from sqlalchemy import text
+
+from app.db.session import SessionLocal
+
+def _crear(api, headers, nombre):
+    return api.post("/api/v1/products", json={"NombreProducto": nombre}, headers=headers).json()["ProductoID"]
+
+def _batch_get(api, headers, ids):
+    return api.post("/api/v1/products/batch-get", json={"IDs": ids}, headers=headers)
+
+def test_returns_products_in_request_order_without_duplicates(api, new_user):
+    _, headers = new_user()
+    primero, segundo = _crear(api, headers, "Notebook"), _crear(api, headers, "Mouse")
+
+    r = _batch_get(api, headers, [segundo, primero, segundo])
+    assert r.status_code == 200
+    assert [p["ProductoID"] for p in r.json()["Productos"]] == [segundo, primero]
+    assert r.json()["NoEncontrados"] == []
+
+def test_other_users_and_missing_ids_are_not_found(api, new_user):
+    _, headers = new_user()
+    _, ajenos = new_user()
+    propio, ajeno = _crear(api, headers, "Monitor"), _crear(api, ajenos, "Teclado")
+    inexistente = ajeno + 100000
+
+    r = _batch_get(api, headers, [ajeno, propio, inexistente])
+    assert [p["ProductoID"] for p in r.json()["Productos"]] == [propio]
+    assert r.json()["NoEncontrados"] == [ajeno, inexistente]
+
+def test_includes_documents_and_categories(api, new_user):
+    _, headers = new_user()
+    producto_id = _crear(api, headers, "Impresora")
+    sesion = api.post("/api/v1/uploads", headers=headers, json={
+        "ProductoID": producto_id, "NombreArchivo": "boleta.txt", "TamanoTotal": 4
+    }).json()["SesionID"]
+    api.put(f"/api/v1/uploads/{sesion}", content=b"hola", headers={**headers, "Upload-Offset": "0"})
+    documento = api.post(f"/api/v1/uploads/{sesion}/complete", headers=headers).json()
+    db = SessionLocal()
+    try:
+        db.execute(
+            text("INSERT INTO productocategorias (productoid, categoria) VALUES (:p, 'Oficina')"),
+            {"p": producto_id}
+        )
+        db.commit()
+    finally:
+        db.close()
+
+    producto = _batch_get(api, headers, [producto_id]).json()["Productos"][0]
+    assert [d["DocumentoID"] for d in producto["Documentos"]] == [documento["DocumentoID"]]
+    assert producto["Categorias"] == ["Oficina"]
+
+def test_id_list_must_be_between_1_and_500(api, new_user):
+    _, headers = new_user()
+    assert _batch_get(api, headers, []).status_code == 422
+    assert _batch_get(api, headers, list(range(1, 502))).status_code == 422
+    assert _batch_get(api, headers, list(range(1, 501))).status_code == 200
@@ -0,0 +1,36 @@
+"""
+Tests del sustituto de procedimientos almacenados usado por los benchmarks.
+"""
+from benchmarks.stand_in import rewrite
+from benchmarks.run import percentile
+
+def test_exec_qmark_is_translated_by_name():
+    sql, params = rewrite("EXEC sp_getproductbyid @ProductoID = ?", (7,))
+
+    assert sql.startswith("SELECT productoid AS \"ProductoID\"")
+    assert "WHERE productoid = ?" in sql
+    assert params == (7,)
+
+def test_exec_pyformat_keeps_argument_order_of_template():
+    sql, params = rewrite(
+        "EXEC sp_deleteproduct @UsuarioID = %(UsuarioID)s, @ProductoID = %(ProductoID)s",
+        {"UsuarioID": 3, "ProductoID": 9},
+    )
+
+    assert "productoid = %(si_0)s AND usuarioid = %(si_1)s" in sql
+    assert params == {"si_0": 9, "si_1": 3}
+
+def test_function_positional_arguments():
+    sql, params = rewrite("SELECT * FROM fn_getuserforlogin(?)", ("a@b.cl",))
+
+    assert "FROM usuarios WHERE email = lower(trim(?))" in sql
+    assert params == ("a@b.cl",)
+
+def test_other_sql_passes_through():
+    assert rewrite("SELECT 1", ()) == ("SELECT 1", ())
+
+def test_percentile_nearest_rank():
+    valores = [i / 1000 for i in range(1, 101)]
+    assert percentile(valores, 50) == 0.05
+    assert percentile(valores, 99) == 0.099
+    assert percentile([], 95) == 0.0
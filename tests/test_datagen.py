@@ -0,0 +1,52 @@
+"""
+Tests del generador de datos sintéticos (SQLite en memoria).
+"""
+import random
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import StaticPool
+
+from app.core import security
+from app.db.session import Base
+from benchmarks.datagen import Zipf, generate
+
+def _engine():
+    from app import models  # noqa: F401  (registra las tablas en Base.metadata)
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    return engine
+
+def _snapshot(engine):
+    with engine.connect() as conn:
+        return [
+            conn.execute(text(f"SELECT * FROM {tabla} ORDER BY 1")).fetchall()
+            for tabla in ("productos", "documentos", "productocategorias")
+        ]
+
+def test_same_seed_generates_same_data(monkeypatch):
+    monkeypatch.setattr(security, "hash_password", lambda p: "hash")
+    a, b = _engine(), _engine()
+    resultado = generate(a, 200, max_products=50, seed=7, batch_size=500)
+    generate(b, 200, max_products=50, seed=7, batch_size=5000)   # El tamaño de lote no cambia los datos
+
+    assert resultado["filas"]["usuarios"] == 200
+    assert resultado["filas"]["productos"] > 0
+    assert _snapshot(a) == _snapshot(b)
+
+def test_second_run_appends_after_existing_ids(monkeypatch):
+    monkeypatch.setattr(security, "hash_password", lambda p: "hash")
+    engine = _engine()
+    generate(engine, 10, max_products=5, seed=1)
+    resultado = generate(engine, 10, max_products=5, seed=2)
+
+    assert resultado["usuarios_ids"] == [11, 20]
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT COUNT(DISTINCT email) FROM usuarios")).scalar() == 20
+
+def test_zipf_is_skewed_and_bounded():
+    zipf = Zipf(1.5, 100)
+    rng = random.Random(3)
+    muestras = [zipf.sample(rng) for _ in range(20000)]
+
+    assert max(muestras) <= 100
+    assert sum(1 for m in muestras if m <= 2) > sum(1 for m in muestras if m > 20)
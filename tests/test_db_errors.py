@@ -0,0 +1,104 @@
+"""
+Tests de la clasificación de errores de BD por código (SQLSTATE / sqlite3 / pyodbc).
+"""
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import IntegrityError, OperationalError
+
+from app.core.error_handlers import handle_database_error
+from app.crud import exceptions
+from app.db import errors
+
+class FakePsycopgError(Exception):
+    """Como psycopg.Error: el código viene en `sqlstate`, el mensaje puede estar en cualquier idioma."""
+
+    def __init__(self, sqlstate, message="mensaje localizado"):
+        super().__init__(message)
+        self.sqlstate = sqlstate
+
+class FakePyodbcError(Exception):
+    pass
+
+FakePyodbcError.__module__ = "pyodbc"
+
+def _wrap(orig, cls=IntegrityError):
+    return cls("SELECT 1", {}, orig)
+
+def test_sqlite_constraint_codes():
+    engine = create_engine("sqlite://")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE t (id INTEGER PRIMARY KEY, email TEXT UNIQUE, nombre TEXT NOT NULL)"))
+        conn.execute(text("INSERT INTO t (email, nombre) VALUES ('a@b.cl', 'a')"))
+    with pytest.raises(IntegrityError) as duplicado:
+        with engine.begin() as conn:
+            conn.execute(text("INSERT INTO t (email, nombre) VALUES ('a@b.cl', 'b')"))
+    with pytest.raises(IntegrityError) as nulo:
+        with engine.begin() as conn:
+            conn.execute(text("INSERT INTO t (email) VALUES ('c@b.cl')"))
+    assert errors.classify(duplicado.value) == errors.UNIQUE_VIOLATION
+    assert errors.classify(nulo.value) == errors.NOT_NULL_VIOLATION
+
+@pytest.mark.parametrize("code, kind", [
+    ("23505", errors.UNIQUE_VIOLATION),
+    ("23503", errors.FOREIGN_KEY_VIOLATION),
+    ("23P01", errors.INTEGRITY),        # exclusion_violation: por clase
+    ("P0001", errors.RAISE_EXCEPTION),
+    ("MB001", errors.EMAIL_TAKEN),
+    ("MB002", errors.USER_NOT_FOUND),
+    ("57014", errors.TIMEOUT),
+    ("08006", errors.CONNECTION),
+    ("XX000", errors.UNKNOWN),
+])
+def test_sqlstate_lookup(code, kind):
+    assert errors.classify(_wrap(FakePsycopgError(code))) == kind
+
+def test_pyodbc_native_code_refines_23000():
+    orig = FakePyodbcError("23000", "[23000] Violation of UNIQUE KEY constraint. The duplicate key value is (7). (2627) (SQLExecDirectW)")
+    assert errors.classify(_wrap(orig)) == errors.UNIQUE_VIOLATION
+
+def test_handler_maps_kinds_to_domain_exceptions():
+    assert isinstance(handle_database_error(_wrap(FakePsycopgError("23505"))), exceptions.ResourceAlreadyExists)
+    assert handle_database_error(_wrap(FakePsycopgError("23503"))).status_code == 422
+    timeout = handle_database_error(_wrap(FakePsycopgError("57014"), OperationalError))
+    assert timeout.status_code == 503
+    assert handle_database_error(_wrap(Exception("sin código"))).status_code == 422
+
+def test_only_app_errcodes_map_to_business_errors():
+    assert isinstance(exceptions.from_db_error(_wrap(FakePsycopgError("MB001"))), exceptions.EmailAlreadyRegistered)
+    assert isinstance(exceptions.from_db_error(_wrap(FakePsycopgError("MB002"))), exceptions.UserNotFound)
+    # Un RAISE EXCEPTION de otro origen (trigger, otra función) no se confunde con ellos
+    assert exceptions.from_db_error(_wrap(FakePsycopgError("P0001"))).status_code == 500
+
+def test_legacy_function_messages_still_map_until_deployed(monkeypatch):
+    from app.crud import user as crud_user
+    from app.db.session import SessionLocal
+    from app.schemas.user import UserCreate
+
+    def falla(mensaje):
+        def execute(*args, **kwargs):
+            raise _wrap(FakePsycopgError("P0001", mensaje))
+        return execute
+
+    db = SessionLocal()
+    try:
+        monkeypatch.setattr(db, "execute", falla("Usuario con ID 999 no encontrado"))
+        with pytest.raises(exceptions.UserNotFound):
+            crud_user.update_user_password(db, 999, "Prueba-1234")
+        monkeypatch.setattr(db, "execute", falla("Otro error de un trigger"))
+        with pytest.raises(exceptions.DomainError) as generico:
+            crud_user.update_user_password(db, 999, "Prueba-1234")
+        monkeypatch.setattr(db, "execute", falla("El email a@b.cl ya está registrado"))
+        with pytest.raises(exceptions.EmailAlreadyRegistered):
+            crud_user.create_user(db, UserCreate(nombre="Otro", correo="a@b.cl", contrasena="Prueba-1234"))
+    finally:
+        db.close()
+    assert generico.value.status_code == 500
+
+def test_email_precheck_uses_the_same_normalization(api, new_user, monkeypatch):
+    from app.crud import user as crud_user
+
+    login, _ = new_user()
+    correo = login["user"]["correo"]
+    monkeypatch.setattr(crud_user, "hash_password", lambda _: pytest.fail("bcrypt con email repetido"))
+    r = api.post("/api/v1/users", json={"nombre": "Otro", "correo": correo.upper(), "contrasena": "Prueba-1234"})
+    assert r.status_code == 400
@@ -0,0 +1,110 @@
+"""
+Tests de la resiliencia de la BD: reintentos de lecturas y circuit breaker.
+
+Los errores de conexión se simulan en el driver (SQLite los reconoce como
+desconexión), así pasan por el mismo camino que un failover real.
+"""
+import asyncio
+import sqlite3
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.db import resilience
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'resiliencia.db'}")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE t (id INTEGER PRIMARY KEY, nombre TEXT)"))
+        conn.execute(text("INSERT INTO t (nombre) VALUES ('a')"))
+    factory = sessionmaker(bind=engine)
+    resilience.install(factory, engine)
+    monkeypatch.setattr(settings, "DB_RETRY_BASE_DELAY_MS", 0)
+    monkeypatch.setattr(resilience, "breaker", resilience.CircuitBreaker(failure_threshold=3, open_seconds=60))
+
+    # Las primeras `caidas[0]` sentencias fallan como una conexión cerrada
+    caidas, ejecutadas = [0], []
+    original = engine.dialect.do_execute
+
+    def do_execute(cursor, statement, parameters, context=None):
+        ejecutadas.append(statement)
+        if caidas[0] > 0:
+            caidas[0] -= 1
+            raise sqlite3.ProgrammingError("Cannot operate on a closed database.")
+        return original(cursor, statement, parameters, context)
+
+    monkeypatch.setattr(engine.dialect, "do_execute", do_execute)
+    session = factory()
+    yield session, caidas, ejecutadas
+    session.close()
+
+def test_read_is_retried_after_connection_errors(db):
+    session, caidas, ejecutadas = db
+    caidas[0] = 2
+    assert session.execute(text("SELECT nombre FROM t")).scalar() == "a"
+    assert len(ejecutadas) == 3
+    assert resilience.breaker.state == resilience.CircuitBreaker.CLOSED
+
+def test_write_is_not_retried(db):
+    session, caidas, ejecutadas = db
+    caidas[0] = 1
+    with pytest.raises(resilience.DatabaseUnavailable) as error:
+        session.execute(text("INSERT INTO t (nombre) VALUES ('b')"))
+    assert error.value.status_code == 503 and "Retry-After" in error.value.headers
+    assert len(ejecutadas) == 1
+
+def test_breaker_fails_fast_then_recovers_after_trial(db):
+    session, caidas, ejecutadas = db
+    caidas[0] = 10
+    with pytest.raises(resilience.DatabaseUnavailable):
+        session.execute(text("SELECT nombre FROM t"))   # 3 intentos: abre el circuito
+    session.rollback()
+    assert resilience.breaker.state == resilience.CircuitBreaker.OPEN
+
+    with pytest.raises(resilience.DatabaseUnavailable) as error:
+        session.execute(text("SELECT nombre FROM t"))
+    assert len(ejecutadas) == 3   # Rechazada sin tocar la base
+    assert int(error.value.headers["Retry-After"]) > 50
+
+    caidas[0] = 0
+    resilience.breaker.opened_at -= 60   # Vence el tiempo abierto: pasa una prueba
+    assert session.execute(text("SELECT nombre FROM t")).scalar() == "a"
+    assert resilience.breaker.state == resilience.CircuitBreaker.CLOSED
+
+def test_read_on_the_event_loop_is_not_retried(db):
+    session, caidas, ejecutadas = db
+    caidas[0] = 1
+
+    async def scenario():
+        session.execute(text("SELECT nombre FROM t"))
+
+    with pytest.raises(resilience.DatabaseUnavailable):
+        asyncio.run(scenario())
+    assert len(ejecutadas) == 1   # Sin time.sleep dentro del event loop
+
+def test_retry_backoff_in_threadpool_does_not_block_the_loop(db, monkeypatch):
+    session, caidas, ejecutadas = db
+    caidas[0] = 2
+    monkeypatch.setattr(resilience, "backoff_seconds", lambda attempt: 0.1)
+
+    async def scenario():
+        ticks = 0
+
+        async def reloj():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        tarea = asyncio.create_task(reloj())
+        nombre = await run_in_threadpool(lambda: session.execute(text("SELECT nombre FROM t")).scalar())
+        tarea.cancel()
+        return nombre, ticks
+
+    nombre, ticks = asyncio.run(scenario())
+    assert nombre == "a" and len(ejecutadas) == 3
+    assert ticks >= 10   # El loop siguió atendiendo durante los ~200 ms de espera
@@ -0,0 +1,113 @@
+"""
+Tests de compresión (gzip/brotli) y MessagePack en request y response.
+"""
+import asyncio
+import gzip
+
+import pytest
+
+msgpack = pytest.importorskip("msgpack")
+pytest.importorskip("brotli")
+
+from fastapi import FastAPI, Response
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+from pydantic import BaseModel
+
+from app.core import encoding
+
+class Item(BaseModel):
+    nombre: str
+    notas: str = ""
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(encoding, "encoded_cache", encoding.EncodedCache(1024 * 1024))
+    app = FastAPI()
+    app.add_middleware(encoding.MsgPackMiddleware)
+    app.add_middleware(encoding.CompressionMiddleware, minimum_size=500)
+
+    @app.get("/items")
+    def listar(n: int = 50):
+        return [{"nombre": f"producto {i}", "notas": "garantía extendida " * 3} for i in range(n)]
+
+    @app.post("/items")
+    def crear(item: Item):
+        return item
+
+    @app.get("/events")
+    def eventos():
+        return StreamingResponse(iter([b"data: uno\n\n"] * 100), media_type="text/event-stream")
+
+    @app.get("/png")
+    def imagen():
+        return Response(b"\x89PNG" * 1000, media_type="image/png")
+
+    return TestClient(app)
+
+def test_choose_encoding_follows_qvalues():
+    assert encoding.choose_encoding("gzip, deflate, br") == "br"
+    assert encoding.choose_encoding("br;q=0.5, gzip") == "gzip"
+    assert encoding.choose_encoding("gzip;q=0, br;q=0") is None
+    assert encoding.choose_encoding("*") == "br"
+    assert encoding.choose_encoding("identity") is None
+
+def test_prefers_msgpack():
+    assert encoding.prefers_msgpack("application/msgpack")
+    assert encoding.prefers_msgpack("application/msgpack, application/json;q=0.5")
+    assert not encoding.prefers_msgpack("application/json, application/msgpack;q=0.5")
+    assert not encoding.prefers_msgpack("*/*")
+
+def test_large_json_is_compressed(client):
+    for codificacion in ("gzip", "br"):
+        r = client.get("/items", headers={"Accept-Encoding": codificacion})
+        assert r.headers["content-encoding"] == codificacion
+        assert "Accept-Encoding" in r.headers["vary"]
+        assert len(r.json()) == 50   # httpx descomprime
+
+    crudo = client.get("/items", headers={"Accept-Encoding": "gzip"})
+    assert int(crudo.headers["content-length"]) < len(crudo.content) / 5
+
+def test_small_streaming_and_binary_responses_pass_through(client):
+    pequena = client.get("/items?n=1", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in pequena.headers
+    eventos = client.get("/events", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in eventos.headers and eventos.text.count("data: uno") == 100
+    imagen = client.get("/png", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in imagen.headers
+
+def test_msgpack_response_and_request(client):
+    r = client.get("/items", headers={"Accept": "application/msgpack", "Accept-Encoding": "identity"})
+    assert r.headers["content-type"] == "application/msgpack"
+    assert "Accept" in r.headers["vary"]
+    assert msgpack.unpackb(r.content)[0]["nombre"] == "producto 0"
+
+    cuerpo = msgpack.packb({"nombre": "Televisor", "notas": "boleta 123"})
+    r = client.post("/items", content=cuerpo, headers={"Content-Type": "application/msgpack", "Accept": "application/msgpack"})
+    assert r.status_code == 200 and msgpack.unpackb(r.content) == {"nombre": "Televisor", "notas": "boleta 123"}
+
+    # La validación sigue siendo la del endpoint
+    r = client.post("/items", content=msgpack.packb({"notas": "sin nombre"}), headers={"Content-Type": "application/msgpack"})
+    assert r.status_code == 422
+
+    r = client.post("/items", content=b"\xc1", headers={"Content-Type": "application/msgpack"})
+    assert r.status_code == 400 and "MessagePack" in r.json()["message"]
+
+def test_encoded_cache_reuses_and_evicts():
+    cache = encoding.EncodedCache(max_bytes=200 * 1024)
+    llamadas = []
+
+    def comprimir(body):
+        llamadas.append(1)
+        return gzip.compress(body)
+
+    cuerpo = b"x" * 50 * 1024
+    primero = asyncio.run(cache.encode("gzip", cuerpo, comprimir))
+    segundo = asyncio.run(cache.encode("gzip", bytes(cuerpo), comprimir))   # Mismo contenido, otro objeto
+    assert primero is segundo and len(llamadas) == 1
+
+    for i in range(5):
+        asyncio.run(cache.encode("gzip", bytes([i]) * 50 * 1024, comprimir))
+    assert cache.size_bytes <= cache.max_bytes
+    asyncio.run(cache.encode("gzip", cuerpo, comprimir))
+    assert len(llamadas) == 7   # El primero fue desalojado
@@ -0,0 +1,68 @@
+"""
+Tests del reparto de eventos en memoria (colas acotadas y clientes lentos) y del
+cierre del feed cuando el token deja de ser válido.
+"""
+import asyncio
+import time
+
+from app.core.config import settings
+from app.core.events import EventBroker
+
+def test_events_reach_only_the_users_subscribers():
+    async def scenario():
+        broker = EventBroker(queue_size=10)
+        mine, other = broker.subscribe(1), broker.subscribe(2)
+        broker.dispatch(1, {"tipo": "producto", "accion": "creado", "recurso": 5})
+        event = await mine.next_event(1)
+        assert event["recurso"] == 5 and event["id"] == 1
+        assert other.queue.empty()
+        broker.unsubscribe(mine)
+        broker.unsubscribe(other)
+        assert broker.count() == 0
+
+    asyncio.run(scenario())
+
+def test_slow_subscriber_is_dropped_with_overflow():
+    async def scenario():
+        broker = EventBroker(queue_size=3)
+        slow = broker.subscribe(1)
+        for i in range(10):
+            broker.dispatch(1, {"tipo": "producto", "accion": "actualizado", "recurso": i})
+        # Lo pendiente se descarta y solo queda la marca de overflow
+        assert slow.overflowed
+        assert await slow.next_event(1) is None
+        assert slow.queue.empty()
+
+    asyncio.run(scenario())
+
+def test_sse_stream_ends_when_token_expires(monkeypatch):
+    from app.api.v1.events import stream_events
+
+    monkeypatch.setattr(settings, "EVENTS_HEARTBEAT_SECONDS", 0.05)
+
+    async def scenario():
+        respuesta = await stream_events({"user_id": 1, "jti": "sse", "exp": time.time() + 0.3})
+        partes = []
+
+        async def leer():
+            async for parte in respuesta.body_iterator:
+                partes.append(parte)
+
+        await asyncio.wait_for(leer(), 5)
+        return b"".join(partes).decode()
+
+    eventos = [linea for linea in asyncio.run(scenario()).splitlines() if linea.startswith("event:")]
+    assert eventos == ["event: ready", "event: unauthorized"]
+
+def test_websocket_closes_after_logout(api, new_user, monkeypatch):
+    login, headers = new_user()
+    monkeypatch.setattr(settings, "EVENTS_HEARTBEAT_SECONDS", 0.05)
+
+    with api.websocket_connect(f"/api/v1/events/ws?token={login['access_token']}") as ws:
+        assert ws.receive_json() == {"tipo": "ready"}
+        assert api.post("/api/v1/auth/logout", headers=headers).status_code == 200
+        for _ in range(100):
+            mensaje = ws.receive_json()
+            if mensaje["tipo"] != "ping":
+                break
+    assert mensaje == {"tipo": "unauthorized"}
@@ -0,0 +1,68 @@
+"""
+Tests de los health checks: ping cacheado y compartido, pool saturado y readiness.
+"""
+import asyncio
+
+from sqlalchemy import create_engine
+
+from app.core import health, startup
+from app.core.config import settings
+
+def _engine(tmp_path, **kwargs):
+    return create_engine(f"sqlite:///{tmp_path / 'health.db'}", **kwargs)
+
+def test_ping_is_cached_and_shared(tmp_path):
+    probe = health.DatabaseProbe(_engine(tmp_path), ttl_seconds=60, timeout_seconds=5)
+    pings = []
+    ping_real = probe._ping
+    probe._ping = lambda: pings.append(1) or ping_real()
+
+    async def scenario():
+        # Varias sondas a la vez con la caché vacía: un solo ping
+        resultados = await asyncio.gather(*(probe.check() for _ in range(10)))
+        resultados.append(await probe.check())
+        return resultados
+
+    resultados = asyncio.run(scenario())
+    assert len(pings) == 1
+    assert all(r["ok"] for r in resultados)
+
+def test_ping_failure_and_timeout_are_reported(tmp_path):
+    probe = health.DatabaseProbe(_engine(tmp_path), ttl_seconds=0, timeout_seconds=0.05)
+
+    def caida():
+        raise ConnectionError("sin conexión")
+    probe._ping = caida
+    assert asyncio.run(probe.check())["error"] == "ConnectionError"   # Sin el texto del driver
+
+    probe._ping = lambda: __import__("time").sleep(0.5)
+    resultado = asyncio.run(probe.check())
+    assert not resultado["ok"] and "sin respuesta" in resultado["error"]
+
+def test_saturated_pool_is_not_ready(tmp_path, monkeypatch):
+    engine = _engine(tmp_path, pool_size=1, max_overflow=0)
+    monkeypatch.setattr(health, "_probe", health.DatabaseProbe(engine, ttl_seconds=60, timeout_seconds=5))
+    monkeypatch.setattr(startup, "state", startup.StartupState())
+
+    async def scenario():
+        assert (await health.readiness())[1]["estado"] == "iniciando"
+        startup.state.mark_ready()
+        listo, detalle = await health.readiness()   # Cachea el ping antes de ocupar el pool
+        assert listo and detalle["pool"]["maximo"] == 1
+        with engine.connect():
+            listo, detalle = await health.readiness()
+        assert not listo and detalle["estado"] == "pool_saturado"
+
+    asyncio.run(scenario())
+
+def test_internal_endpoints_require_token_or_localhost(api, monkeypatch):
+    # TestClient se conecta como "testclient": no es localhost
+    assert api.get("/health/status").status_code == 403
+    assert api.get("/metrics").status_code == 403
+    assert api.get("/health/ready").status_code == 200
+
+    monkeypatch.setattr(settings, "INTERNAL_ENDPOINTS_TOKEN", "secreto")
+    assert api.get("/metrics", headers={"Authorization": "Bearer otro"}).status_code == 403
+    interno = {"Authorization": "Bearer secreto"}
+    assert api.get("/metrics", headers=interno).status_code == 200
+    assert api.get("/health/status", headers=interno).json()["listo"] is True
@@ -0,0 +1,103 @@
+"""
+Tests del middleware de Idempotency-Key (con SQLite en memoria).
+"""
+import asyncio
+
+import httpx
+import pytest
+from fastapi import FastAPI, HTTPException
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.core.idempotency import IdempotencyMiddleware
+from app.crud import idempotency as crud_idempotency
+from app.models.clave_idempotencia import ClaveIdempotencia
+
+@pytest.fixture
+def client(monkeypatch):
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    ClaveIdempotencia.__table__.create(engine)
+    monkeypatch.setattr(crud_idempotency, "SessionLocal", sessionmaker(bind=engine))
+
+    app = FastAPI()
+    app.add_middleware(IdempotencyMiddleware)
+    app.state.llamadas = 0
+    app.state.listo = False
+
+    @app.post("/items", status_code=201)
+    async def create_item(item: dict):
+        app.state.llamadas += 1
+        await asyncio.sleep(0.05)
+        return {"id": app.state.llamadas, **item}
+
+    @app.post("/complete")
+    async def complete(item: dict):
+        # 409 mientras la carga no termina, 404 si no existe
+        app.state.llamadas += 1
+        if item.get("sesion") == "inexistente":
+            raise HTTPException(status_code=404, detail="Sesión no encontrada")
+        if not app.state.listo:
+            raise HTTPException(status_code=409, detail="Carga incompleta")
+        return {"documento": app.state.llamadas}
+
+    transport = httpx.ASGITransport(app=app)
+    return app, httpx.AsyncClient(transport=transport, base_url="http://test")
+
+def test_retry_replays_first_response(client):
+    app, http = client
+
+    async def scenario():
+        first = await http.post("/items", json={"a": 1}, headers={"Idempotency-Key": "k1"})
+        retry = await http.post("/items", json={"a": 1}, headers={"Idempotency-Key": "k1"})
+        other_body = await http.post("/items", json={"a": 2}, headers={"Idempotency-Key": "k1"})
+        return first, retry, other_body
+
+    first, retry, other_body = asyncio.run(scenario())
+    assert first.status_code == retry.status_code == 201
+    assert retry.json() == first.json() == {"id": 1, "a": 1}
+    assert retry.headers["idempotent-replayed"] == "true"
+    assert other_body.status_code == 422
+    assert app.state.llamadas == 1
+
+def test_concurrent_duplicates_execute_once(client):
+    app, http = client
+
+    async def scenario():
+        return await asyncio.gather(*[
+            http.post("/items", json={"a": 1}, headers={"Idempotency-Key": "k2"}) for _ in range(5)
+        ])
+
+    responses = asyncio.run(scenario())
+    assert [r.status_code for r in responses] == [201] * 5
+    assert {r.json()["id"] for r in responses} == {1}
+    assert app.state.llamadas == 1
+
+def test_transient_errors_release_the_key(client):
+    app, http = client
+    headers = {"Idempotency-Key": "k3"}
+
+    async def scenario():
+        incompleta = await http.post("/complete", json={"sesion": "s1"}, headers=headers)
+        app.state.listo = True   # El cliente termina de subir y reintenta con la misma clave
+        lista = await http.post("/complete", json={"sesion": "s1"}, headers=headers)
+        repetida = await http.post("/complete", json={"sesion": "s1"}, headers=headers)
+        return incompleta, lista, repetida
+
+    incompleta, lista, repetida = asyncio.run(scenario())
+    assert incompleta.status_code == 409
+    assert lista.status_code == 200 and "idempotent-replayed" not in lista.headers
+    assert repetida.headers["idempotent-replayed"] == "true" and repetida.json() == lista.json()
+    assert app.state.llamadas == 2
+
+def test_deterministic_client_errors_are_replayed(client):
+    app, http = client
+    headers = {"Idempotency-Key": "k4"}
+
+    async def scenario():
+        return [await http.post("/complete", json={"sesion": "inexistente"}, headers=headers) for _ in range(2)]
+
+    primera, segunda = asyncio.run(scenario())
+    assert primera.status_code == segunda.status_code == 404
+    assert segunda.headers["idempotent-replayed"] == "true"
+    assert app.state.llamadas == 1
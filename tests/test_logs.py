@@ -0,0 +1,107 @@
+"""
+Tests del pipeline de logs: formato JSON, muestreo por nivel/ruta y X-Request-ID.
+"""
+import io
+import json
+import logging
+import logging.handlers
+import queue
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.core import logs
+from app.core.middleware import add_logging_middleware
+
+def _record(level=logging.INFO, msg="hola %s", args=("mundo",), **extra):
+    record = logging.LogRecord("app.test", level, __file__, 1, msg, args, None)
+    record.__dict__.update(extra)
+    return record
+
+def test_parse_rates():
+    assert logs.parse_rates("INFO:0.1, DEBUG:0") == [("INFO", 0.1), ("DEBUG", 0.0)]
+    assert logs.parse_rates("") == []
+
+def test_json_formatter_includes_request_fields():
+    linea = logs.JsonFormatter().format(_record(request_id="abc", method="GET", status=200, duration_ms=1.5))
+    data = json.loads(linea)
+    assert data["msg"] == "hola mundo" and data["level"] == "INFO"
+    assert data["request_id"] == "abc" and data["status"] == 200 and data["duration_ms"] == 1.5
+    assert "client" not in data
+
+def test_sampling_is_per_request_and_spares_warnings():
+    filtro = logs.SamplingFilter({"INFO": 0.5}, [("/health", 0.0)])
+    ids = [f"req-{i}" for i in range(2000)]
+    decisiones = {i: filtro.filter(_record(request_id=i)) for i in ids}
+    # Todas las líneas de una misma petición corren la misma suerte
+    assert all(filtro.filter(_record(request_id=i)) == d for i, d in decisiones.items())
+    assert 0.4 < sum(decisiones.values()) / len(ids) < 0.6
+
+    assert not filtro.filter(_record(request_id="x", route="/health/ready"))
+    assert filtro.filter(_record(level=logging.WARNING, request_id="x", route="/health/ready"))
+    assert filtro.filter(_record(level=logging.ERROR, request_id="x"))
+
+def test_sampling_depends_on_a_per_process_key(monkeypatch):
+    filtro = logs.SamplingFilter({"INFO": 0.5}, [])
+    ids = [f"req-{i}" for i in range(200)]
+    guardados = {i for i in ids if filtro.filter(_record(request_id=i))}
+    # Con otra clave (otro proceso) se guardan otras peticiones: el cliente no puede
+    # precalcular un X-Request-ID que siempre pase o siempre se descarte
+    monkeypatch.setattr(logs, "_SAMPLING_KEY", b"otra-clave-16-by")
+    assert guardados != {i for i in ids if filtro.filter(_record(request_id=i))}
+
+def test_queue_handler_defers_formatting_to_listener():
+    cola, salida = queue.SimpleQueue(), io.StringIO()
+    stream = logging.StreamHandler(salida)
+    stream.setFormatter(logs.JsonFormatter())
+    listener = logging.handlers.QueueListener(cola, stream)
+    handler = logs._QueueHandler(cola)
+    handler.addFilter(logs.ContextFilter())
+
+    token = logs.request_id_var.set("rid-1")
+    try:
+        handler.handle(_record(args=({"cambia": 1},)))
+    finally:
+        logs.request_id_var.reset(token)
+    listener.start()
+    listener.stop()
+    data = json.loads(salida.getvalue())
+    assert data["request_id"] == "rid-1" and data["msg"] == "hola {'cambia': 1}"
+
+def test_middleware_propagates_request_id():
+    registros = []
+
+    class Captura(logging.Handler):
+        def emit(self, record):
+            registros.append(record)
+
+    captura = Captura()
+    captura.addFilter(logs.ContextFilter())
+    logger = logging.getLogger("app.core.middleware")
+    logger.addHandler(captura)
+    nivel = logger.level
+    logger.setLevel(logging.INFO)
+
+    app = FastAPI()
+    add_logging_middleware(app)
+
+    @app.get("/ping")
+    def ping():
+        logging.getLogger("app.test").warning("dentro del endpoint")
+        return {"request_id": logs.request_id_var.get()}
+
+    try:
+        with TestClient(app) as client:
+            propio = client.get("/ping", headers={"X-Request-ID": "desde-el-proxy"})
+            nuevo = client.get("/ping")
+    finally:
+        logger.removeHandler(captura)
+        logger.setLevel(nivel)
+
+    assert propio.headers["X-Request-ID"] == "desde-el-proxy"
+    assert propio.json()["request_id"] == "desde-el-proxy"
+    assert nuevo.headers["X-Request-ID"] == nuevo.json()["request_id"]
+    # Una sola línea por petición, con el ID y los campos estructurados
+    assert [r.request_id for r in registros] == ["desde-el-proxy", nuevo.headers["X-Request-ID"]]
+    assert registros[0].status == 200 and registros[0].path == "/ping"
+    assert logs.request_id_var.get() is None
@@ -0,0 +1,41 @@
+"""
+Tests de la detección de hashes de contraseña a actualizar y del hash en el login.
+"""
+import asyncio
+
+from passlib.hash import bcrypt
+
+from app.core.security import hash_password, password_needs_rehash, verify_password
+
+def test_hash_with_different_cost_needs_rehash():
+    viejo = bcrypt.using(rounds=4).hash("secreta")
+    assert verify_password("secreta", viejo)
+    assert password_needs_rehash(viejo)
+
+def test_current_hash_does_not_need_rehash():
+    actual = hash_password("secreta")
+    assert verify_password("secreta", actual)
+    assert not password_needs_rehash(actual)
+
+def test_login_hashes_outside_the_event_loop(api, new_user, monkeypatch):
+    from app.api.v1 import user as user_api
+
+    login, _ = new_user()
+    llamadas = []
+
+    def fuera_del_loop(func):
+        def wrapper(*args):
+            try:
+                asyncio.get_running_loop()
+                llamadas.append("event loop")
+            except RuntimeError:
+                llamadas.append("hilo")
+            return func(*args)
+        return wrapper
+
+    monkeypatch.setattr(user_api, "verify_password", fuera_del_loop(user_api.verify_password))
+    monkeypatch.setattr(user_api, "dummy_verify_password", fuera_del_loop(user_api.dummy_verify_password))
+    correo = login["user"]["correo"]
+    assert api.post("/api/v1/auth/login", json={"correo": correo, "contrasena": "Prueba-1234"}).status_code == 200
+    assert api.post("/api/v1/auth/login", json={"correo": "nadie@x.cl", "contrasena": "Prueba-1234"}).status_code == 401
+    assert llamadas == ["hilo", "hilo"]
@@ -0,0 +1,119 @@
+"""
+Tests de las miniaturas: generación tras finalizar una carga, cola llena y fallos.
+
+Los trabajos corren en un ThreadPoolExecutor en vez del pool de procesos: el
+camino (cola, callback, actualización en BD) es el mismo y el test no paga el
+arranque de procesos con spawn.
+"""
+import hashlib
+import io
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import pytest
+from PIL import Image
+
+from app.core import previews
+from app.db.session import SessionLocal
+from app.models.documento import Documento
+
+@pytest.fixture
+def pool(monkeypatch):
+    executor = ThreadPoolExecutor(max_workers=2)
+    monkeypatch.setattr(previews, "_get_executor", lambda: executor)
+    monkeypatch.setattr(previews, "_results", ThreadPoolExecutor(max_workers=1))
+    yield executor
+    _esperar(executor)
+
+def _esperar(executor):
+    """Espera los trabajos del pool y el guardado de sus resultados."""
+    executor.shutdown(wait=True)
+    previews._results.shutdown(wait=True)
+
+def _png() -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", (800, 600), (200, 30, 30)).save(buffer, "PNG")
+    return buffer.getvalue()
+
+def _subir(api, headers, contenido: bytes, nombre: str = "boleta.png") -> dict:
+    producto = api.post("/api/v1/products", json={"NombreProducto": "Horno"}, headers=headers).json()
+    sesion = api.post("/api/v1/uploads", headers=headers, json={
+        "ProductoID": producto["ProductoID"], "NombreArchivo": nombre, "TamanoTotal": len(contenido)
+    }).json()["SesionID"]
+    api.put(f"/api/v1/uploads/{sesion}", content=contenido, headers={**headers, "Upload-Offset": "0"})
+    r = api.post(f"/api/v1/uploads/{sesion}/complete", headers=headers)
+    assert r.status_code == 201, r.text
+    return r.json()
+
+def _documento(documento_id: int):
+    db = SessionLocal()
+    try:
+        doc = db.query(Documento).filter(Documento.documentoid == documento_id).one()
+        return doc.hashcontenido, doc.miniaturas
+    finally:
+        db.close()
+
+def test_previews_are_generated_after_complete(api, new_user, pool):
+    _, headers = new_user()
+    contenido = _png()
+    documento = _subir(api, headers, contenido)
+    _esperar(pool)
+
+    assert _documento(documento["DocumentoID"]) == (hashlib.sha256(contenido).hexdigest(), "160,640")
+    r = api.get(f"/api/v1/documents/{documento['DocumentoID']}/preview?size=160", headers=headers)
+    assert r.status_code == 200 and r.headers["content-type"] == "image/jpeg"
+    assert max(Image.open(io.BytesIO(r.content)).size) == 160
+
+def test_full_queue_leaves_document_pending_until_retry(api, new_user, pool, monkeypatch):
+    _, headers = new_user()
+    monkeypatch.setattr(previews, "_slots", threading.BoundedSemaphore(1))
+    previews._slots.acquire()   # Cola llena
+    documento = _subir(api, headers, _png())
+    assert _documento(documento["DocumentoID"]) == (None, None)
+
+    previews._slots.release()
+    assert previews.retry_pending_previews() >= 1
+    _esperar(pool)
+    assert _documento(documento["DocumentoID"])[1] == "160,640"
+
+def test_failed_generation_is_not_retried_forever(api, new_user, pool, monkeypatch):
+    _, headers = new_user()
+    llamadas = []
+
+    def falla(path, sizes):
+        llamadas.append(path)
+        raise OSError("archivo dañado")
+
+    monkeypatch.setattr(previews, "generate_previews", falla)
+    contenido = b"no es una imagen"
+    documento = _subir(api, headers, contenido, "garantia.jpg")
+    _esperar(pool)
+
+    # Queda procesado sin miniaturas: el reintento periódico ya no lo toma
+    assert _documento(documento["DocumentoID"]) == (hashlib.sha256(contenido).hexdigest(), "")
+    previews.retry_pending_previews()
+    assert len(llamadas) == 1
+
+def test_done_callback_leaves_saving_to_the_results_thread(monkeypatch):
+    guardando, seguir = threading.Event(), threading.Event()
+    hilos = []
+
+    def guardar_lento(documento_id, resultado):
+        hilos.append(threading.current_thread())
+        guardando.set()
+        seguir.wait(5)
+
+    monkeypatch.setattr(previews, "_slots", threading.BoundedSemaphore(1))
+    monkeypatch.setattr(previews, "_results", ThreadPoolExecutor(max_workers=1))
+    monkeypatch.setattr(previews, "_store_result", guardar_lento)
+    previews._slots.acquire()
+    terminado = Future()
+    terminado.set_result(("hash", [160]))
+
+    # El hilo de gestión del pool no espera el hash, la BD ni los eventos
+    previews._on_done(1, terminado)
+    assert guardando.wait(5)
+    assert previews._slots.acquire(blocking=False)
+    seguir.set()
+    previews._results.shutdown(wait=True)
+    assert hilos and hilos[0] is not threading.current_thread()
@@ -0,0 +1,68 @@
+"""
+Tests de planes de ejecución: las consultas calientes deben usar índices.
+
+Siembra una base con benchmarks.datagen (SQLite siempre; PostgreSQL con
+QUERY_PLANS_DATABASE_URL o, si está instalado, pgserver) y aplica EXPLAIN
+al SQL que emite cada ruta de app/crud. Ver benchmarks/query_plans.py.
+"""
+import os
+import tempfile
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from benchmarks import query_plans
+
+def _postgres_url():
+    url = os.environ.get("QUERY_PLANS_DATABASE_URL")
+    if url:
+        return url
+    pytest.importorskip("pgserver")
+    from benchmarks.harness import embedded_postgres_url
+    return embedded_postgres_url(os.path.join(tempfile.mkdtemp(prefix="misboletas-plans-"), "pgdata"))
+
+@pytest.fixture(scope="module", params=["sqlite", "postgresql"])
+def plans(request):
+    if request.param == "sqlite":
+        engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    else:
+        engine = create_engine(_postgres_url())
+    user_id, email, product_ids = query_plans.prepare_database(engine)
+    paths = query_plans.hot_paths(engine, user_id, email, product_ids)
+    yield engine, query_plans.collect_plans(engine, sessionmaker(bind=engine), paths)
+    engine.dispose()
+
+def test_every_hot_path_was_captured(plans):
+    engine, planes = plans
+    rutas = {nombre.split("#")[0] for nombre in planes}
+    assert rutas == set(query_plans.hot_paths(engine, 0, "", [0]))
+
+def test_no_sequential_scans_on_large_tables(plans):
+    engine, planes = plans
+    filas = query_plans.table_rows(engine)
+    assert all(n > query_plans.SEQ_SCAN_ROW_THRESHOLD for n in filas.values()), filas
+
+    problemas = {
+        nombre: plan["seq_scans"]
+        for nombre, plan in planes.items()
+        if any(filas[t] > query_plans.SEQ_SCAN_ROW_THRESHOLD for t in plan["seq_scans"])
+    }
+    assert not problemas, f"Recorridos secuenciales (¿índice perdido?): {problemas}"
+
+def test_costs_within_baseline(plans):
+    engine, planes = plans
+    if engine.dialect.name != "postgresql":
+        pytest.skip("SQLite no estima costos")
+    baseline = query_plans.load_baseline()
+
+    subidas = {
+        nombre: (baseline[nombre], round(plan["cost"], 2))
+        for nombre, plan in planes.items()
+        if nombre in baseline and plan["cost"] > baseline[nombre] * query_plans.COST_TOLERANCE
+    }
+    assert not subidas, (
+        f"Costo estimado sobre {query_plans.COST_TOLERANCE}x el baseline (antes, ahora): {subidas}. "
+        "Si el cambio es intencional: python -m benchmarks.query_plans --update-baseline"
+    )
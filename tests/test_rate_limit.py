@@ -0,0 +1,57 @@
+"""
+Tests del limitador de intentos de login (token bucket en memoria).
+"""
+import pytest
+from fastapi import HTTPException
+
+from app.core import rate_limit
+from app.core.rate_limit import InMemoryRateLimiter
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def test_bucket_allows_burst_then_rejects():
+    clock = FakeClock()
+    limiter = InMemoryRateLimiter(capacity=3, per_minute=60, max_keys=10, clock=clock)
+
+    assert [limiter.hit("1.2.3.4")[0] for _ in range(3)] == [True, True, True]
+    allowed, retry_after = limiter.hit("1.2.3.4")
+    assert not allowed
+    assert retry_after == pytest.approx(1.0)
+
+    # Otra clave tiene su propio balde
+    assert limiter.hit("5.6.7.8")[0]
+
+def test_bucket_refills_over_time():
+    clock = FakeClock()
+    limiter = InMemoryRateLimiter(capacity=2, per_minute=60, max_keys=10, clock=clock)
+    limiter.hit("a@a.cl")
+    limiter.hit("a@a.cl")
+    assert not limiter.hit("a@a.cl")[0]
+
+    clock.now += 1.0
+    assert limiter.hit("a@a.cl")[0]
+    assert not limiter.hit("a@a.cl")[0]
+
+def test_bucket_keys_are_bounded():
+    limiter = InMemoryRateLimiter(capacity=1, per_minute=1, max_keys=2, clock=FakeClock())
+    for key in ("a", "b", "c"):
+        limiter.hit(key)
+    assert list(limiter._buckets) == ["b", "c"]
+
+def test_check_login_rate_rejects_by_email(monkeypatch):
+    monkeypatch.setattr(rate_limit, "_limiters", {})
+    monkeypatch.setattr(rate_limit.settings, "LOGIN_RATE_EMAIL_CAPACITY", 2)
+
+    rate_limit.check_login_rate("10.0.0.1", "user@misboletas.cl")
+    rate_limit.check_login_rate("10.0.0.2", "USER@misboletas.cl ")
+    with pytest.raises(HTTPException) as exc:
+        rate_limit.check_login_rate("10.0.0.3", "user@misboletas.cl")
+
+    assert exc.value.status_code == 429
+    assert int(exc.value.headers["Retry-After"]) >= 1
+    assert rate_limit.RATE_LIMIT_DECISIONS.value(scope="email", decision="rejected") >= 1
@@ -0,0 +1,41 @@
+"""
+Tests de la rotación de refresh tokens: rotación, reutilización (posible robo) y sesiones cerradas.
+"""
+import pytest
+
+from app.crud import refresh_token as crud_refresh
+
+@pytest.fixture
+def alertas(monkeypatch):
+    """Avisos de posible robo registrados durante el test."""
+    registradas = []
+    monkeypatch.setattr(crud_refresh.logger, "warning", lambda mensaje, *a, **k: registradas.append(mensaje))
+    return registradas
+
+def _refresh(api, token):
+    return api.post("/api/v1/auth/refresh", json={"refresh_token": token})
+
+def test_rotation_rejects_the_old_token(api, new_user, alertas):
+    login, _ = new_user()
+    r = _refresh(api, login["refresh_token"])
+    assert r.status_code == 200
+    nuevo = r.json()["refresh_token"]
+    assert nuevo != login["refresh_token"]
+
+    assert _refresh(api, nuevo).status_code == 200
+
+def test_replay_of_rotated_token_revokes_the_family(api, new_user, alertas):
+    login, _ = new_user()
+    vigente = _refresh(api, login["refresh_token"]).json()["refresh_token"]
+
+    assert _refresh(api, login["refresh_token"]).status_code == 401   # Reutilización
+    assert len(alertas) == 1
+    assert _refresh(api, vigente).status_code == 401                  # La sesión completa quedó cortada
+
+def test_token_revoked_by_password_change_is_a_plain_401(api, new_user, alertas):
+    login, headers = new_user()
+    r = api.put("/api/v1/auth/change-password", json={"nueva_contrasena": "Otra-5678"}, headers=headers)
+    assert r.status_code == 200
+
+    assert _refresh(api, login["refresh_token"]).status_code == 401
+    assert alertas == []   # No es un robo: la sesión ya estaba cerrada
@@ -0,0 +1,135 @@
+"""
+Tests de la caché de respuestas: presupuesto en bytes, invalidación y single-flight.
+"""
+import asyncio
+import threading
+
+from app.core.response_cache import MemoryBackend, ResponseCache
+
+def test_lru_respects_byte_budget():
+    backend = MemoryBackend(max_bytes=1000, ttl_seconds=60)
+    for i in range(10):
+        backend.set(1, 0, f"k{i}", b"x" * 200)
+
+    assert backend.size_bytes <= 1000
+    assert backend.get(1, 0, "k0") is None      # las más antiguas se desalojan
+    assert backend.get(1, 0, "k9") == b"x" * 200
+
+def test_invalidate_drops_user_entries_and_stale_writes():
+    backend = MemoryBackend(max_bytes=10000, ttl_seconds=60)
+    backend.set(1, 0, "list", b"viejo")
+    backend.set(2, 0, "list", b"otro")
+    backend.invalidate(1)
+
+    assert backend.generation(1) == 1
+    assert backend.get(1, 1, "list") is None
+    assert backend.get(2, 0, "list") == b"otro"
+    # Un cálculo que empezó antes de invalidar no se guarda
+    backend.set(1, 0, "list", b"viejo")
+    assert backend.get(1, 1, "list") is None
+
+def test_concurrent_misses_run_one_query():
+    cache = ResponseCache(MemoryBackend(max_bytes=10000, ttl_seconds=60))
+    calls = []
+    release = threading.Event()
+
+    def compute():
+        calls.append(1)
+        release.wait(2)
+        return b"[]"
+
+    async def scenario():
+        tasks = [asyncio.create_task(cache.get_or_compute(1, "list", compute)) for _ in range(5)]
+        await asyncio.sleep(0.05)
+        release.set()
+        return await asyncio.gather(*tasks)
+
+    assert asyncio.run(scenario()) == [b"[]"] * 5
+    assert len(calls) == 1
+
+def test_cancelled_leader_does_not_fail_waiters():
+    cache = ResponseCache(MemoryBackend(max_bytes=10000, ttl_seconds=60))
+    release = threading.Event()
+
+    def compute():
+        release.wait(2)
+        return b"[1]"
+
+    async def scenario():
+        lider = asyncio.create_task(cache.get_or_compute(1, "list", compute))
+        await asyncio.sleep(0.05)
+        esperando = [asyncio.create_task(cache.get_or_compute(1, "list", compute)) for _ in range(3)]
+        await asyncio.sleep(0.05)
+        lider.cancel()   # Ej: el cliente que inició el cálculo se desconectó
+        release.set()
+        resultados = await asyncio.gather(*esperando)
+        assert lider.cancelled()
+        return resultados
+
+    assert asyncio.run(scenario()) == [b"[1]"] * 3
+    assert cache.backend.get(1, 0, "list") == b"[1]"
+
+def test_generations_are_pruned_without_reviving_stale_writes(monkeypatch):
+    from app.core import response_cache
+
+    monkeypatch.setattr(response_cache, "_MIN_GENERATIONS", 10)
+    backend = MemoryBackend(max_bytes=100000, ttl_seconds=60)
+    backend.set(1, 0, "list", b"vigente")
+    antes = backend.generation(2)
+    for user_id in range(2, 100):
+        backend.invalidate(user_id)
+
+    assert len(backend._generations) <= 10
+    assert backend.get(1, backend.generation(1), "list") == b"vigente"
+    # Un cálculo que empezó antes de invalidar (y de podar) sigue sin guardarse
+    backend.set(2, antes, "list", b"viejo")
+    assert backend.get(2, backend.generation(2), "list") is None
+
+def test_cached_loads_use_their_own_session(monkeypatch):
+    from app.api.v1 import product
+
+    class FakeSession:
+        closed = False
+
+        def close(self):
+            self.closed = True
+
+    sesiones = []
+    monkeypatch.setattr(product, "SessionLocal", lambda: sesiones.append(FakeSession()) or sesiones[-1])
+    # La sesión de la petición no interviene: el cálculo puede sobrevivir a la petición
+    load = product._with_own_session(lambda db: b"[]" if not db.closed else b"cerrada")
+
+    assert load() == b"[]"
+    assert len(sesiones) == 1 and sesiones[0].closed
+
+def test_blocking_backend_is_never_called_on_the_event_loop():
+    class SlowBackend(MemoryBackend):
+        blocking = True   # Como RedisBackend: cada llamada es I/O de red
+
+        def _check(self):
+            try:
+                asyncio.get_running_loop()
+            except RuntimeError:
+                return
+            raise AssertionError("llamada bloqueante en el event loop")
+
+        def generation(self, user_id):
+            self._check()
+            return super().generation(user_id)
+
+        def get(self, user_id, generation, key):
+            self._check()
+            return super().get(user_id, generation, key)
+
+        def set(self, user_id, generation, key, value):
+            self._check()
+            super().set(user_id, generation, key, value)
+
+    cache = ResponseCache(SlowBackend(max_bytes=10000, ttl_seconds=60))
+
+    async def scenario():
+        primera = await cache.get_or_compute(1, "list", lambda: b"[]")
+        segunda = await cache.get_or_compute(1, "list", lambda: b"distinto")
+        return primera, segunda
+
+    assert asyncio.run(scenario()) == (b"[]", b"[]")
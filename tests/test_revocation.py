@@ -0,0 +1,41 @@
+"""
+Tests de la lista de revocación de access tokens en memoria.
+"""
+import time
+from datetime import datetime, timedelta, timezone
+
+from app.core.revocation import RevocationList
+
+def test_revoked_jti_is_rejected_until_expiry():
+    revocations = RevocationList()
+    now = time.time()
+    revocations.revoke_jti("abc", now + 60)
+
+    assert revocations.is_revoked({"jti": "abc", "user_id": 1, "iat": int(now)})
+    assert not revocations.is_revoked({"jti": "otro", "user_id": 1, "iat": int(now)})
+
+    # Al expirar el token la entrada ya no es necesaria
+    assert revocations.prune(now + 61) == 1
+    assert len(revocations) == 0
+
+def test_user_cutoff_rejects_only_older_tokens():
+    revocations = RevocationList()
+    cutoff = time.time()
+    revocations.revoke_user(7, cutoff, cutoff + 1800)
+
+    assert revocations.is_revoked({"jti": "a", "user_id": 7, "iat": int(cutoff) - 5})
+    assert not revocations.is_revoked({"jti": "b", "user_id": 7, "iat": int(cutoff) + 1})
+    assert not revocations.is_revoked({"jti": "c", "user_id": 8, "iat": int(cutoff) - 5})
+    # Tokens emitidos antes de que existiera el claim iat
+    assert revocations.is_revoked({"user_id": 7})
+
+def test_apply_rows_tracks_last_id_and_naive_dates():
+    revocations = RevocationList()
+    expira = datetime.now(timezone.utc) + timedelta(minutes=30)
+    revocations.apply(3, "jti-1", 1, None, expira)
+    # SQLite devuelve fechas sin zona horaria
+    revocations.apply(5, None, 2, datetime.utcnow(), expira.replace(tzinfo=None))
+
+    assert revocations.last_id == 5
+    assert revocations.is_revoked({"jti": "jti-1", "user_id": 1, "iat": 0})
+    assert revocations.is_revoked({"jti": "x", "user_id": 2, "iat": int(time.time()) - 10})
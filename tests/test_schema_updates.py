@@ -0,0 +1,65 @@
+"""
+Tests de las columnas agregadas al arrancar sobre tablas creadas por una versión anterior
+(SQLite siempre; PostgreSQL con QUERY_PLANS_DATABASE_URL o pgserver).
+"""
+import os
+import tempfile
+
+import pytest
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.pool import StaticPool
+
+from app.db.schema_updates import upgrade_existing_tables
+
+def _postgres_url():
+    url = os.environ.get("QUERY_PLANS_DATABASE_URL")
+    if url:
+        return url
+    pytest.importorskip("pgserver")
+    from benchmarks.harness import embedded_postgres_url
+    return embedded_postgres_url(os.path.join(tempfile.mkdtemp(prefix="misboletas-schema-"), "pgdata"))
+
+@pytest.fixture(params=["sqlite", "postgresql"])
+def legacy_engine(request):
+    """Base con las tablas documentos y sesionescarga como eran en una versión anterior."""
+    if request.param == "sqlite":
+        engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    else:
+        engine = create_engine(_postgres_url())
+    with engine.begin() as conn:
+        conn.execute(text("DROP TABLE IF EXISTS documentos"))
+        conn.execute(text("DROP TABLE IF EXISTS sesionescarga"))
+        conn.execute(text("""
+            CREATE TABLE documentos (
+                documentoid INTEGER PRIMARY KEY,
+                productoid INTEGER,
+                nombrearchivo VARCHAR(255),
+                rutaarchivo VARCHAR
+            )
+        """))
+        conn.execute(text("""
+            CREATE TABLE sesionescarga (
+                sesionid VARCHAR(32) PRIMARY KEY,
+                bytesrecibidos BIGINT NOT NULL
+            )
+        """))
+        conn.execute(text("INSERT INTO documentos (documentoid, nombrearchivo) VALUES (1, 'boleta.pdf')"))
+    yield engine
+    with engine.begin() as conn:
+        conn.execute(text("DROP TABLE IF EXISTS documentos"))
+        conn.execute(text("DROP TABLE IF EXISTS sesionescarga"))
+    engine.dispose()
+
+def test_new_columns_are_added_to_existing_tables(legacy_engine):
+    upgrade_existing_tables(legacy_engine)
+    upgrade_existing_tables(legacy_engine)   # Idempotente: cada worker lo ejecuta al arrancar
+
+    columnas = {c["name"] for c in inspect(legacy_engine).get_columns("documentos")}
+    assert {"tamanobytes", "hashcontenido", "miniaturas"} <= columnas
+    columnas = {c["name"] for c in inspect(legacy_engine).get_columns("sesionescarga")}
+    assert {"reservafragmento", "reservahasta"} <= columnas
+    indices = {i["name"] for i in inspect(legacy_engine).get_indexes("documentos")}
+    assert "ix_documentos_hashcontenido" in indices
+    with legacy_engine.connect() as conn:
+        fila = conn.execute(text("SELECT nombrearchivo, tamanobytes, hashcontenido, miniaturas FROM documentos")).one()
+    assert tuple(fila) == ("boleta.pdf", None, None, None)
@@ -0,0 +1,204 @@
+"""
+Tests del apagado ordenado: SIGTERM con carga en curso contra un uvicorn real.
+
+Cada consulta a la BD tarda 50 ms a propósito, así que al llegar la señal
+siempre hay peticiones a medio camino. Ninguna petición que el servidor
+aceptó debe fallar; las que llegan con el socket ya cerrado reciben
+"connection refused" (el cliente o el balanceador reintenta en otro worker).
+"""
+import asyncio
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+
+import httpx
+
+from app.core import shutdown
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SERVER = """
+import sys, time
+from benchmarks import harness
+harness.configure_environment(sys.argv[1], bcrypt_rounds=4, response_cache=False)
+app, engine = harness.load_app()
+from app.main import create_tables
+create_tables()
+harness.seed(engine, 4, 20)
+
+from sqlalchemy import event
+@event.listens_for(engine, "before_cursor_execute")
+def lento(*args):
+    time.sleep(0.05)
+
+import asyncio
+@app.get("/colgada")
+async def colgada():
+    await asyncio.sleep(600)
+
+import uvicorn
+uvicorn.run(app, host="127.0.0.1", port=int(sys.argv[2]), log_level="warning")
+"""
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+async def _wait_ready(client, proceso):
+    for _ in range(300):
+        if proceso.poll() is not None:
+            raise AssertionError(proceso.stderr.read())
+        try:
+            if (await client.get("/health/ready")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.1)
+    raise AssertionError("El servidor no quedó listo")
+
+def test_sigterm_mid_load_drains_without_failed_requests(tmp_path):
+    port = _free_port()
+    env = {**os.environ, "UPLOAD_DIR": str(tmp_path / "uploads"), "SHUTDOWN_DRAIN_SECONDS": "20"}
+    proceso = subprocess.Popen(
+        [sys.executable, "-c", SERVER, f"sqlite:///{tmp_path / 'shutdown.db'}", str(port)],
+        cwd=ROOT, env=env, stderr=subprocess.PIPE, text=True
+    )
+    resultados = {"ok": 0, "ok_tras_senal": 0, "fallidas": [], "rechazadas": 0}
+    senal_enviada = []
+
+    async def cliente(token):
+        headers = {"Authorization": f"Bearer {token}"}
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=30) as c:
+            while True:
+                try:
+                    r = await c.get("/api/v1/products", headers=headers)
+                except httpx.ConnectError:
+                    resultados["rechazadas"] += 1   # Socket cerrado: la petición nunca fue aceptada
+                    return
+                except httpx.TransportError as e:
+                    resultados["fallidas"].append(repr(e))
+                    return
+                if r.status_code != 200:
+                    resultados["fallidas"].append(r.status_code)
+                    continue
+                resultados["ok"] += 1
+                if senal_enviada:
+                    resultados["ok_tras_senal"] += 1
+
+    async def stream_eventos(client, token):
+        # El feed SSE no debe retener el apagado: se cierra con un evento overflow
+        async with client.stream("GET", "/api/v1/events", headers={"Authorization": f"Bearer {token}"}) as r:
+            return [linea async for linea in r.aiter_lines() if linea.startswith("event:")]
+
+    async def scenario():
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=30) as client:
+            await _wait_ready(client, proceso)
+            login = await client.post("/api/v1/auth/login", json={
+                "correo": "bench1@datos.misboletas.cl", "contrasena": "Bench-1234"
+            })
+            token = login.json()["access_token"]
+            eventos = asyncio.create_task(stream_eventos(client, token))
+            clientes = [asyncio.create_task(cliente(token)) for _ in range(8)]
+            await asyncio.sleep(1)
+            senal_enviada.append(time.monotonic())
+            proceso.send_signal(signal.SIGTERM)
+            await asyncio.wait_for(asyncio.gather(*clientes), 30)
+            return await asyncio.wait_for(eventos, 30)
+
+    try:
+        eventos = asyncio.run(scenario())
+        proceso.wait(timeout=30)
+        apagado_en = time.monotonic() - senal_enviada[0]
+    finally:
+        if proceso.poll() is None:
+            proceso.kill()
+
+    assert resultados["fallidas"] == []
+    assert resultados["ok"] > 0 and resultados["ok_tras_senal"] > 0
+    assert eventos == ["event: ready", "event: overflow"]
+    assert apagado_en < 20   # Nada quedó esperando el plazo completo
+
+def test_drain_cancels_requests_past_the_deadline():
+    async def scenario():
+        estado = shutdown.DrainState()
+        original = shutdown.state
+        shutdown.state = estado
+        try:
+            lenta = asyncio.create_task(asyncio.sleep(60))
+            rapida = asyncio.create_task(asyncio.sleep(0.01))
+            for tarea in (lenta, rapida):
+                token = estado.enter(tarea)
+                tarea.add_done_callback(lambda _, token=token: estado.leave(token))
+            canceladas = await shutdown.drain(0.2)
+        finally:
+            shutdown.state = original
+        return canceladas, lenta, estado
+
+    canceladas, lenta, estado = asyncio.run(scenario())
+    assert canceladas == 1 and lenta.cancelled()
+    assert estado.draining and not estado.requests
+
+def test_batch_subrequest_does_not_unregister_its_parent():
+    # /batch reenvía cada subpetición por toda la pila de middlewares, en la misma tarea
+    async def scenario():
+        estado = shutdown.DrainState()
+        original = shutdown.state
+        shutdown.state = estado
+        en_curso = []
+
+        async def app(scope, receive, send):
+            if scope["path"] == "/batch":
+                await middleware({**scope, "path": "/sub"}, receive, send)
+                en_curso.append(dict(estado.requests))
+            await send({"type": "http.response.start", "status": 200, "headers": []})
+            await send({"type": "http.response.body", "body": b""})
+
+        async def send(message):
+            pass
+
+        middleware = shutdown.DrainMiddleware(app)
+        try:
+            await middleware({"type": "http", "path": "/batch"}, None, send)
+        finally:
+            shutdown.state = original
+        return en_curso, estado
+
+    en_curso, estado = asyncio.run(scenario())
+    assert len(en_curso[0]) == 1   # La petición /batch sigue registrada
+    assert not estado.requests and estado._event().is_set()
+
+def test_sigterm_cancels_request_past_the_deadline(tmp_path):
+    # uvicorn espera sin plazo las peticiones en curso: el timer de la señal debe cancelarla
+    port = _free_port()
+    env = {**os.environ, "UPLOAD_DIR": str(tmp_path / "uploads"), "SHUTDOWN_DRAIN_SECONDS": "1"}
+    proceso = subprocess.Popen(
+        [sys.executable, "-c", SERVER, f"sqlite:///{tmp_path / 'shutdown.db'}", str(port)],
+        cwd=ROOT, env=env, stderr=subprocess.PIPE, text=True
+    )
+
+    async def scenario():
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=30) as client:
+            await _wait_ready(client, proceso)
+            colgada = asyncio.create_task(client.get("/colgada"))
+            await asyncio.sleep(0.5)
+            inicio = time.monotonic()
+            proceso.send_signal(signal.SIGTERM)
+            try:
+                respuesta = (await asyncio.wait_for(colgada, 15)).status_code
+            except httpx.TransportError:
+                respuesta = None
+            await asyncio.to_thread(proceso.wait, 15)
+            return respuesta, time.monotonic() - inicio
+
+    try:
+        respuesta, apagado_en = asyncio.run(scenario())
+    finally:
+        if proceso.poll() is None:
+            proceso.kill()
+
+    assert respuesta in (500, None)   # Cancelada: 500 si no alcanzó a responder, o conexión cortada
+    assert apagado_en < 10
@@ -0,0 +1,43 @@
+"""
+Tests de las respuestas parciales de productos (fields= / include=).
+"""
+import pytest
+from fastapi import HTTPException
+
+from app.api.v1.product import _parse_sparse
+
+def test_without_parameters_is_full_response():
+    assert _parse_sparse(None, None) is None
+
+def test_unknown_field_or_include_is_400():
+    with pytest.raises(HTTPException) as campo:
+        _parse_sparse("NombreProducto,Precio", None)
+    with pytest.raises(HTTPException) as relacion:
+        _parse_sparse(None, "documentos,garantias")
+    assert campo.value.status_code == 400 and "precio" in campo.value.detail
+    assert relacion.value.status_code == 400 and "garantias" in relacion.value.detail
+
+def test_product_id_is_always_present_and_order_is_canonical():
+    assert _parse_sparse(" marca , nombreproducto,", None) == (("ProductoID", "NombreProducto", "Marca"), ())
+
+def test_include_only_keeps_every_field():
+    campos, relaciones = _parse_sparse(None, "Categorias,documentos")
+    assert "NombreProducto" in campos and "UsuarioID" in campos
+    assert relaciones == ("documentos", "categorias")
+
+def test_sparse_responses_through_the_api(api, new_user):
+    _, headers = new_user()
+    producto = api.post("/api/v1/products", json={"NombreProducto": "Parlante", "Marca": "JBL"}, headers=headers).json()
+
+    lista = api.get("/api/v1/products", params={"fields": "Marca", "include": "documentos,categorias"}, headers=headers)
+    assert lista.json() == [{"ProductoID": producto["ProductoID"], "Marca": "JBL", "Documentos": [], "Categorias": []}]
+    uno = api.get(f"/api/v1/products/{producto['ProductoID']}", params={"fields": "NombreProducto"}, headers=headers)
+    assert uno.json() == {"ProductoID": producto["ProductoID"], "NombreProducto": "Parlante"}
+    assert api.get("/api/v1/products", params={"fields": "Precio"}, headers=headers).status_code == 400
+
+def test_openapi_documents_the_sparse_shape(api):
+    rutas = api.get("/openapi.json").json()["paths"]
+    lista = rutas["/api/v1/products"]["get"]["responses"]["200"]["content"]["application/json"]["schema"]
+    uno = rutas["/api/v1/products/{product_id}"]["get"]["responses"]["200"]["content"]["application/json"]["schema"]
+    assert {s["items"]["$ref"].rsplit("/", 1)[1] for s in lista["anyOf"]} == {"ProductRead", "ProductSparse"}
+    assert {s["$ref"].rsplit("/", 1)[1] for s in uno["anyOf"]} == {"ProductRead", "ProductSparse"}
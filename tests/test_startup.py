@@ -0,0 +1,84 @@
+"""
+Tests del arranque en segundo plano: readiness, reintentos y pool precalentado.
+"""
+import asyncio
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+
+from app.core import startup
+
+def test_ready_only_after_parallel_steps_and_hooks(monkeypatch):
+    monkeypatch.setattr(startup, "state", startup.StartupState())
+    orden = []
+
+    async def scenario():
+        tarea = asyncio.create_task(startup.run_startup(
+            {"a": lambda: orden.append("a"), "b": lambda: orden.append("b")},
+            after_ready=[lambda: orden.append("hook")],
+        ))
+        await startup.state.wait_ready(timeout=5)
+        await tarea
+
+    asyncio.run(scenario())
+    assert startup.state.ready
+    assert sorted(orden[:2]) == ["a", "b"] and orden[2] == "hook"
+    assert set(startup.state.report()["pasos_ms"]) == {"a", "b"}
+
+def test_failed_step_is_retried_without_becoming_ready(monkeypatch):
+    monkeypatch.setattr(startup, "state", startup.StartupState())
+    intentos = []
+
+    def base_caida():
+        intentos.append(1)
+        if len(intentos) == 1:
+            raise ConnectionError("sin conexión")
+
+    async def scenario():
+        tarea = asyncio.create_task(startup.run_startup({"db": base_caida}, after_ready=[]))
+        await asyncio.sleep(0.2)
+        assert not startup.state.ready
+        assert startup.state.report()["ultimo_error"] == "ConnectionError"
+        await startup.state.wait_ready(timeout=5)
+        await tarea
+
+    asyncio.run(scenario())
+    assert len(intentos) == 2
+    assert startup.state.report()["ultimo_error"] is None
+
+def test_warm_pool_opens_connections_concurrently(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'warm.db'}", pool_size=3)
+    startup.warm_pool(engine, 3)
+    assert engine.pool.checkedin() == 3
+
+def test_failing_hook_is_recorded_and_later_hooks_still_run(monkeypatch):
+    monkeypatch.setattr(startup, "state", startup.StartupState())
+    orden = []
+
+    def start_event_listener():
+        raise RuntimeError("LISTEN falló")
+
+    async def scenario():
+        await startup.run_startup({}, after_ready=[start_event_listener, lambda: orden.append("tareas")])
+
+    asyncio.run(scenario())
+    assert startup.state.ready and orden == ["tareas"]
+    assert startup.state.report()["ultimo_error"] == "start_event_listener: RuntimeError"
+
+def test_api_returns_503_until_first_ready(monkeypatch):
+    monkeypatch.setattr(startup, "state", startup.StartupState())
+    app = FastAPI()
+    app.add_middleware(startup.StartupGateMiddleware)
+    app.get("/api/v1/products")(lambda: [])
+    app.get("/health/live")(lambda: {"vivo": True})
+    client = TestClient(app)
+
+    r = client.get("/api/v1/products")
+    assert r.status_code == 503 and r.headers["Retry-After"] == "1"
+    assert client.get("/health/live").status_code == 200
+
+    startup.state.mark_ready()
+    assert client.get("/api/v1/products").status_code == 200
+    startup.state.mark_not_ready()   # Apagado: las peticiones aceptadas se siguen atendiendo
+    assert client.get("/api/v1/products").status_code == 200
@@ -0,0 +1,56 @@
+"""
+Tests del autocompletado en memoria: orden de sugerencias, invalidación y liberación de memoria.
+"""
+import pytest
+
+from app.core import suggestions
+from app.core.config import settings
+
+@pytest.fixture(autouse=True)
+def indice_vacio():
+    suggestions._users.clear()
+    suggestions._pending.clear()
+    yield
+    suggestions._users.clear()
+    suggestions._pending.clear()
+
+def test_ranking_groups_spellings_and_orders_by_use():
+    conteos = {"Samsung": 5, "samsung ": 2, "Sony": 3, "Sólido": 1, "LG": 10}
+    assert suggestions.suggest(1, "marca", "s", 5, lambda: conteos) == ["Samsung", "Sony", "Sólido"]
+    assert suggestions.suggest(1, "marca", "SOL", 5, lambda: pytest.fail("debía estar en memoria")) == ["Sólido"]
+
+def test_product_writes_update_or_invalidate_the_index(api, new_user):
+    _, headers = new_user()
+    producto = api.post("/api/v1/products", json={"NombreProducto": "TV", "Marca": "Samsung"}, headers=headers).json()
+
+    def sugerir(prefijo):
+        r = api.get("/api/v1/products/suggest", params={"field": "marca", "prefix": prefijo}, headers=headers)
+        return r.json()["Sugerencias"]
+
+    assert sugerir("sa") == ["Samsung"]
+    api.post("/api/v1/products", json={"NombreProducto": "Radio", "Marca": "Sanyo"}, headers=headers)
+    assert sugerir("sa") == ["Samsung", "Sanyo"]   # Creación: actualización incremental
+
+    api.put(f"/api/v1/products/{producto['ProductoID']}", json={"Marca": "LG"}, headers=headers)
+    assert sugerir("sa") == ["Sanyo"]               # Edición: se reconstruye desde la BD
+
+def test_idle_users_are_evicted_on_read(monkeypatch):
+    monkeypatch.setattr(settings, "SUGGEST_IDLE_SECONDS", 0)
+    suggestions.suggest(1, "marca", "", 5, lambda: {"Sony": 1})
+    suggestions.suggest(2, "marca", "", 5, lambda: {"LG": 1})
+    assert list(suggestions._users) == [2]         # La carga de 2 liberó a 1 (sin uso)
+
+    suggestions.suggest(2, "marca", "", 5, lambda: pytest.fail("debía estar en memoria"))
+    assert list(suggestions._users) == [2]         # Una lectura no libera al propio usuario
+
+def test_write_during_load_is_not_cached_and_leaves_no_state():
+    def carga_con_escritura():
+        suggestions.invalidate_user(1)   # Otra petición edita un producto mientras se consulta la BD
+        return {"Sony": 1}
+
+    assert suggestions.suggest(1, "marca", "", 5, carga_con_escritura) == ["Sony"]
+    assert 1 not in suggestions._users   # Datos posiblemente viejos: no se guardan
+    assert suggestions._pending == {}    # Ni generaciones de usuarios sin cargas en curso
+
+    suggestions.record_product(3, {"marca": "LG"})
+    assert suggestions._pending == {}
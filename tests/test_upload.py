@@ -0,0 +1,136 @@
+"""
+Tests de las cargas reanudables: offsets, reanudación tras un corte, límites y finalización.
+"""
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi import HTTPException
+
+from app.core import storage
+
+def _carga(api, headers, tamano):
+    producto = api.post("/api/v1/products", json={"NombreProducto": "Refrigerador"}, headers=headers).json()
+    r = api.post(
+        "/api/v1/uploads",
+        json={"ProductoID": producto["ProductoID"], "NombreArchivo": "boleta.pdf", "TamanoTotal": tamano},
+        headers=headers
+    )
+    assert r.status_code == 201, r.text
+    return r.json()["SesionID"]
+
+def _put(api, headers, sesion_id, offset, cuerpo):
+    return api.put(f"/api/v1/uploads/{sesion_id}", content=cuerpo, headers={**headers, "Upload-Offset": str(offset)})
+
+def test_wrong_offset_returns_409_with_current_offset(api, new_user):
+    _, headers = new_user()
+    sesion_id = _carga(api, headers, 10)
+    assert _put(api, headers, sesion_id, 0, b"abcd").status_code == 200
+
+    r = _put(api, headers, sesion_id, 0, b"ZZZZ")
+    assert r.status_code == 409
+    assert r.headers["Upload-Offset"] == "4"
+    with open(storage.partial_path(sesion_id), "rb") as f:
+        assert f.read() == b"abcd"
+
+def test_oversize_chunk_returns_413(api, new_user):
+    _, headers = new_user()
+    sesion_id = _carga(api, headers, 4)
+    r = _put(api, headers, sesion_id, 0, b"abcdef")
+    assert r.status_code == 413
+    assert api.get(f"/api/v1/uploads/{sesion_id}", headers=headers).headers["Upload-Offset"] == "0"
+    assert _put(api, headers, sesion_id, 0, b"abcd").status_code == 200   # La reserva quedó liberada
+
+def test_resume_after_client_disconnect(api, new_user):
+    _, headers = new_user()
+    sesion_id = _carga(api, headers, 8)
+
+    # El cliente envía una parte del fragmento y corta la conexión
+    import app.main
+    mensajes = [
+        {"type": "http.request", "body": b"abc", "more_body": True},
+        {"type": "http.disconnect"},
+    ]
+
+    async def receive():
+        return mensajes.pop(0)
+
+    async def send(message):
+        pass
+
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "PUT",
+        "scheme": "http", "server": ("testserver", 80), "client": ("127.0.0.1", 1234), "root_path": "",
+        "path": f"/api/v1/uploads/{sesion_id}", "raw_path": f"/api/v1/uploads/{sesion_id}".encode(),
+        "query_string": b"",
+        "headers": [
+            (b"host", b"testserver"),
+            (b"authorization", headers["Authorization"].encode()),
+            (b"upload-offset", b"0"),
+        ],
+    }
+    api.portal.call(app.main.app, scope, receive, send)
+
+    r = api.get(f"/api/v1/uploads/{sesion_id}", headers=headers)
+    assert r.headers["Upload-Offset"] == "3"
+    assert _put(api, headers, sesion_id, 3, b"defgh").status_code == 200
+    documento = api.post(f"/api/v1/uploads/{sesion_id}/complete", headers=headers).json()
+    with open(storage.absolute_path(documento["RutaArchivo"]), "rb") as f:
+        assert f.read() == b"abcdefgh"
+
+def test_complete_requires_all_bytes(api, new_user):
+    _, headers = new_user()
+    sesion_id = _carga(api, headers, 6)
+    assert _put(api, headers, sesion_id, 0, b"abc").status_code == 200
+    assert api.post(f"/api/v1/uploads/{sesion_id}/complete", headers=headers).status_code == 409
+
+    assert _put(api, headers, sesion_id, 3, b"def").status_code == 200
+    r = api.post(f"/api/v1/uploads/{sesion_id}/complete", headers=headers)
+    assert r.status_code == 201
+    assert r.json()["TamanoBytes"] == 6
+    assert api.get(f"/api/v1/uploads/{sesion_id}", headers=headers).status_code == 404
+    with open(storage.absolute_path(r.json()["RutaArchivo"]), "rb") as f:
+        assert f.read() == b"abcdef"
+
+def test_losing_request_never_touches_partial_file(api, new_user):
+    from app.crud import upload as crud_upload
+    from app.db.session import SessionLocal
+
+    login, headers = new_user()
+    sesion_id = _carga(api, headers, 4)
+    user_id = login["user"]["idUsuario"]
+
+    # Otra petición reservó el offset 0 y todavía está recibiendo su cuerpo
+    db = SessionLocal()
+    try:
+        crud_upload.claim_chunk(db, sesion_id, user_id, 0)
+    finally:
+        db.close()
+    r = _put(api, headers, sesion_id, 0, b"XX")
+    assert r.status_code == 409
+    with open(storage.partial_path(sesion_id), "rb") as f:
+        assert f.read() == b""
+
+def test_expired_claim_is_taken_over(api, new_user):
+    from app.crud import upload as crud_upload
+    from app.db.session import SessionLocal
+    from app.models.sesion_carga import SesionCarga
+
+    login, headers = new_user()
+    sesion_id = _carga(api, headers, 4)
+    user_id = login["user"]["idUsuario"]
+
+    # El worker que reservó el fragmento murió: su reserva vence y otro la toma
+    db = SessionLocal()
+    try:
+        muerta = crud_upload.claim_chunk(db, sesion_id, user_id, 0)
+        db.query(SesionCarga).filter(SesionCarga.sesionid == sesion_id).update(
+            {"reservahasta": datetime.now(timezone.utc) - timedelta(seconds=1)}
+        )
+        db.commit()
+        assert _put(api, headers, sesion_id, 0, b"ab").status_code == 200
+        with pytest.raises(HTTPException) as error:
+            crud_upload.record_chunk(db, sesion_id, user_id, 0, 4, muerta)
+    finally:
+        db.close()
+    assert error.value.status_code == 409
+    assert api.get(f"/api/v1/uploads/{sesion_id}", headers=headers).headers["Upload-Offset"] == "2"
@@ -0,0 +1,128 @@
+"""
+Tests del resumen del home: conteos de garantías en SQLite y PostgreSQL
+(QUERY_PLANS_DATABASE_URL o pgserver) y la caché por usuario que lo guarda.
+"""
+import os
+import tempfile
+import threading
+from datetime import date
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.core.cache import UserCache
+from app.crud import product as crud_product
+
+def _postgres_url():
+    url = os.environ.get("QUERY_PLANS_DATABASE_URL")
+    if url:
+        return url
+    pytest.importorskip("pgserver")
+    from benchmarks.harness import embedded_postgres_url
+    return embedded_postgres_url(os.path.join(tempfile.mkdtemp(prefix="misboletas-summary-"), "pgdata"))
+
+@pytest.fixture(scope="module", params=["sqlite", "postgresql"])
+def session_factory(request):
+    from app.db.session import Base
+    from app.db.search import setup_product_search
+    from app import models  # noqa: F401  (registra las tablas)
+
+    if request.param == "sqlite":
+        engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    else:
+        engine = create_engine(_postgres_url())
+    Base.metadata.create_all(engine)
+    setup_product_search(engine)
+    yield sessionmaker(bind=engine)
+    engine.dispose()
+
+def _insert_user(db, productos):
+    user_id = db.execute(text("SELECT COALESCE(MAX(usuarioid), 0) + 1 FROM usuarios")).scalar()
+    db.execute(
+        text("INSERT INTO usuarios (usuarioid, nombreusuario, email, contrasenahash) VALUES (:id, 'Resumen', :email, 'x')"),
+        {"id": user_id, "email": f"resumen{user_id}@pruebas.misboletas.cl"}
+    )
+    for nombre, fecha, meses, tienda, marca, categorias in productos:
+        producto_id = db.execute(
+            text("""
+                INSERT INTO productos (nombreproducto, fechacompra, duraciongarantia, tienda, marca, usuarioid)
+                VALUES (:nombre, :fecha, :meses, :tienda, :marca, :user_id)
+                RETURNING productoid
+            """),
+            {"nombre": nombre, "fecha": fecha, "meses": meses, "tienda": tienda, "marca": marca, "user_id": user_id}
+        ).scalar()
+        for categoria in categorias:
+            db.execute(
+                text("INSERT INTO productocategorias (productoid, categoria) VALUES (:p, :c)"),
+                {"p": producto_id, "c": categoria}
+            )
+    db.commit()
+    return user_id
+
+def test_summary_counts_warranties_and_groups(session_factory):
+    hoy = date.today()
+    db = session_factory()
+    try:
+        user_id = _insert_user(db, [
+            ("TV", hoy, 24, "Falabella", "Samsung", ["Hogar", "Electrónica"]),
+            ("Radio", hoy, 0, "Falabella", "Sony", ["Electrónica"]),          # vence hoy
+            ("Horno", date(hoy.year - 3, hoy.month, 1), 12, "Paris", "", []),
+            ("Silla", hoy, None, "", "Sony", []),                              # sin garantía
+        ])
+        otro = _insert_user(db, [("Ajeno", hoy, 12, "Falabella", "Samsung", ["Hogar"])])
+        resumen = crud_product.get_user_summary(db, user_id)
+    finally:
+        db.close()
+
+    assert otro != user_id
+    assert (resumen.TotalProductos, resumen.GarantiasActivas, resumen.GarantiasVencidas) == (4, 2, 1)
+    assert (resumen.VencenEsteMes, resumen.SinGarantia) == (1, 1)
+    assert [(c.Valor, c.Cantidad) for c in resumen.PorTienda] == [("Falabella", 2), (None, 1), ("Paris", 1)]
+    assert [(c.Valor, c.Cantidad) for c in resumen.PorMarca] == [("Sony", 2), (None, 1), ("Samsung", 1)]
+    assert [(c.Valor, c.Cantidad) for c in resumen.PorCategoria] == [(None, 2), ("Electrónica", 2), ("Hogar", 1)]
+
+def test_summary_of_user_without_products(session_factory):
+    db = session_factory()
+    try:
+        resumen = crud_product.get_user_summary(db, _insert_user(db, []))
+    finally:
+        db.close()
+    assert resumen.TotalProductos == 0 and resumen.PorTienda == []
+
+def test_product_write_invalidates_cached_summary(api, new_user):
+    _, headers = new_user()
+    assert api.get("/api/v1/me/summary", headers=headers).json()["TotalProductos"] == 0
+    api.post("/api/v1/products", json={"NombreProducto": "Lavadora", "Tienda": "Paris"}, headers=headers)
+
+    resumen = api.get("/api/v1/me/summary", headers=headers).json()
+    assert resumen["TotalProductos"] == 1
+    assert resumen["PorTienda"] == [{"Valor": "Paris", "Cantidad": 1}]
+
+def test_cache_keeps_no_state_for_invalidated_users():
+    cache = UserCache(ttl_seconds=60, max_users=10)
+    for user_id in range(1000):
+        cache.get_or_compute(user_id, lambda: "resumen")
+        cache.invalidate(user_id)
+    assert cache._pending == {}
+    assert cache.stats()["usuarios"] == 0
+
+def test_invalidation_during_compute_is_not_cached():
+    cache = UserCache(ttl_seconds=60, max_users=10)
+    calculando, seguir = threading.Event(), threading.Event()
+
+    def lento():
+        calculando.set()
+        seguir.wait(5)
+        return "viejo"
+
+    hilo = threading.Thread(target=cache.get_or_compute, args=(1, lento))
+    hilo.start()
+    calculando.wait(5)
+    cache.invalidate(1)
+    seguir.set()
+    hilo.join(5)
+
+    assert cache.get_or_compute(1, lambda: "nuevo") == "nuevo"
+    assert cache._pending == {}